@@ -0,0 +1,231 @@
+#! /usr/bin/env python
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+try:
+    import lmcipy
+except:
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    import lmcipy
+
+from lmcipy.assembler import assemble_stream
+from lmcipy.channels import IterableInput, ListOutput
+from lmcipy.interpret import interpret_opcodes
+from lmcipy.vector import np, run_vectorized
+
+
+EXAMPLES = os.path.join(ROOT, 'examples')
+WORKLOADS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'workloads')
+
+# name: (path, inputs)
+BENCHMARKS = {
+    'countdown': (os.path.join(EXAMPLES, 'countdown.lmc'), [999]),
+    'fib': (os.path.join(EXAMPLES, 'fib.lmc'), [600]),
+    'square': (os.path.join(EXAMPLES, 'square.lmc'), [31] * 20 + [0]),
+    'quine': (os.path.join(EXAMPLES, 'quine.lmc'), []),
+    'nested': (os.path.join(WORKLOADS, 'nested.lmc'), [100, 200]),
+    'selfmod': (os.path.join(WORKLOADS, 'selfmod.lmc'), [300]),
+}
+
+VECTOR_LANES = 256
+
+# benchmark: {engine: minimum speed-up over the interpreter engine in cycles per second}
+# Expected of every build, see --check-speedup. Fused and accelerated programs run as the
+# interpreter when nothing is fused, runs of a few hundred cycles (fib, quine) are bound
+# by setup of the engines and have no expectation.
+EXPECTED_SPEEDUP = {
+    'countdown': {'fused': 0.8, 'accelerated': 0.8, 'compiled': 2.0},
+    'nested': {'fused': 1.5, 'accelerated': 5.0, 'compiled': 4.0},
+    'selfmod': {'fused': 1.2, 'accelerated': 1.0},
+    'square': {'fused': 1.5, 'accelerated': 1.5, 'compiled': 1.5},
+}
+
+# metric: True when higher value is better
+METRICS = {
+    'cycles_per_sec': True,
+    'speedup': True,
+    'assembly_sec': False,
+    'peak_bytes': False,
+    'startup_sec': False,
+}
+
+
+def engines():
+    return list(lmcipy.ENGINES) + (['vector'] if np is not None else [])
+
+
+def timed(func, repeat):
+    """
+    Call `func` `repeat` times and return the best time and the last result.
+    """
+    best, result = None, None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+
+def run_once(opcodes, labels, inputs, engine):
+    if engine == 'vector':
+        result = run_vectorized(opcodes, [inputs] * VECTOR_LANES)
+        return int(result.cycles.sum())
+
+    return interpret_opcodes(opcodes, labels, engine=engine, inputs=IterableInput(inputs),
+                             outputs=ListOutput()).cycles
+
+
+def bench_program(path, inputs, engine, repeat):
+    with open(path) as f:
+        lines = f.readlines()
+
+    assembly_sec, (opcodes, labels) = timed(lambda: assemble_stream(lines), repeat * 10)
+    run_sec, cycles = timed(lambda: run_once(opcodes, labels, inputs, engine), repeat)
+
+    tracemalloc.start()
+    try:
+        run_once(opcodes, labels, inputs, engine)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    if engine == 'vector':
+        peak //= VECTOR_LANES
+
+    return {
+        'cycles': cycles,
+        'cycles_per_sec': cycles / run_sec,
+        'assembly_sec': assembly_sec,
+        'peak_bytes': peak,
+    }
+
+
+def bench_startup(repeat):
+    """
+    Measure time of starting interpreter and importing the package.
+    """
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, 'src'))
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import lmcipy'], env=env, check=True)
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times)
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare `results` with `baseline` and return list of regressions.
+
+    A metric regresses when it is worse than in `baseline` by more than `threshold`
+    (fraction of baseline value).
+    """
+    regressions = []
+
+    for name, metrics in results['benchmarks'].items():
+        for metric, higher_is_better in METRICS.items():
+            old = baseline.get('benchmarks', {}).get(name, {}).get(metric)
+            new = metrics.get(metric)
+
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old
+            if (change < -threshold) if higher_is_better else (change > threshold):
+                regressions.append((name, metric, old, new, change))
+
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark LMC execution engines.')
+    parser.add_argument('-b', '--benchmark', dest='benchmarks', action='append', choices=sorted(BENCHMARKS),
+                        help='run only selected benchmark (can be repeated)')
+    parser.add_argument('-e', '--engine', dest='engines', action='append', choices=engines(),
+                        help='run only selected engine (can be repeated)')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=3,
+                        help='number of runs, the best one is reported')
+    parser.add_argument('-o', '--output', dest='output', default=None, help='save results as JSON')
+    parser.add_argument('--baseline', dest='baseline', default=None,
+                        help='JSON results to compare with, exits with 1 on regression')
+    parser.add_argument('--threshold', dest='threshold', type=float, default=0.1,
+                        help='allowed relative slowdown before a change counts as regression')
+    parser.add_argument('--check-speedup', dest='check_speedup', action='store_true',
+                        help='exit with 1 when an engine is slower than expected relative to the interpreter')
+    args = parser.parse_args(argv)
+
+    results = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'benchmarks': {},
+    }
+
+    slow = []
+
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        path, inputs = BENCHMARKS[name]
+        interpreter = None
+
+        for engine in args.engines or engines():
+            key = '{}/{}'.format(name, engine)
+            metrics = bench_program(path, inputs, engine, args.repeat)
+            results['benchmarks'][key] = metrics
+
+            if engine == 'interpreter':
+                interpreter = metrics['cycles_per_sec']
+            elif interpreter is not None and engine != 'vector':
+                metrics['speedup'] = metrics['cycles_per_sec'] / interpreter
+
+                expected = EXPECTED_SPEEDUP.get(name, {}).get(engine)
+                if expected is not None and metrics['speedup'] < expected:
+                    slow.append((key, metrics['speedup'], expected))
+
+            print('{:<24} {:>10} cycles {:>12.0f} cycles/s {:>9.1f} us asm {:>9} B peak{}'.format(
+                key, metrics['cycles'], metrics['cycles_per_sec'], metrics['assembly_sec'] * 1e6,
+                metrics['peak_bytes'], ' {:>6.2f}x'.format(metrics['speedup']) if 'speedup' in metrics else ''
+            ))
+
+    startup = bench_startup(args.repeat)
+    results['benchmarks']['startup'] = {'startup_sec': startup}
+    print('{:<24} {:>10.1f} ms'.format('startup', startup * 1e3))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    for key, speedup, expected in slow:
+        print('SLOWER THAN EXPECTED {}: {:.2f}x of interpreter, expected {:.2f}x'.format(key, speedup, expected))
+
+    if args.check_speedup and slow:
+        return 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+        for name, metric, old, new, change in regressions:
+            print('REGRESSION {} {}: {:.6g} -> {:.6g} ({:+.1%})'.format(name, metric, old, new, change))
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,8 @@
 #! /usr/bin/env python
 
 import argparse
+import json
+import signal
 import sys
 import os
 
@@ -8,13 +10,334 @@ try:
     import lmcipy
 except:
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../src"))
-    import lmcipy
 
+# Only the client is imported up front, runs forwarded to a server do not need the rest.
+from lmcipy.client import DEFAULT_SOCKET, connect
+from lmcipy.engines import ENGINES
+
+
+def add_socket_argument(parser):
+    parser.add_argument('-s', '--socket', dest='socket', default=os.environ.get('LMC_SOCKET', DEFAULT_SOCKET),
+                        help='path of the server socket (default $LMC_SOCKET or %(default)s)')
+
+
+def add_budget_arguments(parser):
+    parser.add_argument('--max-cycles', dest='max_cycles', type=int, default=None,
+                        help='fail when the program does not halt within this many cycles')
+    parser.add_argument('--timeout', dest='timeout', type=float, default=None,
+                        help='fail when the program does not halt within this many seconds')
+    parser.add_argument('--max-outputs', dest='max_outputs', type=int, default=None,
+                        help='fail when the program outputs more values')
+    parser.add_argument('--detect-loops', dest='detect_loops', action='store_true',
+                        help='fail as soon as the program provably never halts')
+
+
+def make_budget(args):
+    from lmcipy.budget import Budget
+
+    if args.max_cycles is None and args.timeout is None and args.max_outputs is None and not args.detect_loops:
+        return None
+
+    return Budget(cycles=args.max_cycles, seconds=args.timeout, outputs=args.max_outputs,
+                  detect_loops=args.detect_loops)
+
+
+def read_inputs(stream):
+    return [int(token) for line in stream for token in line.split()]
+
+
+def forward(args, inputs):
+    """
+    Run the program in a server started by ``lmc.py serve`` if it is running. Only runs
+    with inputs from file that need no local features are forwarded, see func:`forwardable`.
+
+    Args:
+        args (obj): Parsed arguments of ``lmc.py``.
+        inputs (list): Input values, already read from ``args.inputs``.
+
+    Returns:
+        bool: Whether the run was forwarded. Runs are not forwarded when the server does
+              not answer, e.g. because its socket is stale.
+    """
+    client = connect(args.socket)
+    if client is None:
+        return False
+
+    try:
+        with client, open(args.file) as f:
+            response = client.run(
+                source=f.read(),
+                inputs=inputs,
+                engine=args.engine,
+                max_cycles=args.max_cycles,
+                timeout=args.timeout,
+                max_outputs=args.max_outputs,
+                detect_loops=args.detect_loops
+            )
+    except OSError:
+        # Includes ConnectionError - the server went away, run locally instead.
+        return False
+
+    from lmcipy.channels import StreamOutput
+
+    outputs = StreamOutput(args.outputs) if args.outputs else StreamOutput(sys.stdout, template="Output: {}\n")
+    for value in response['outputs']:
+        outputs.write(value)
+    outputs.flush()
+
+    if response['error']:
+        sys.exit(response['error'])
+
+    return True
+
+
+def forwardable(args):
+    """
+    Whether the run can be forwarded to a server, see func:`forward`.
+
+    Runs limiting neither cycles nor time run locally, the server would stop them after
+    its own limit while a local run has none.
+    """
+    if args.local or not args.inputs or args.file.endswith('.lmco') or args.machine != 'classic':
+        return False
+
+    if args.max_cycles is None and args.timeout is None:
+        return False
+
+    return not (args.debug or args.profile or args.trace or args.cache_dir)
+
+
+def main_run(argv):
+    parser = argparse.ArgumentParser(description='Little Man Computer interpreter.')
+    parser.add_argument('file', help='LMC source or .lmco object file')
+    parser.add_argument('--debug', dest='debug', action='store_true',
+                        help='step through the program interactively, forwards and backwards')
+    parser.add_argument('--engine', dest='engine', choices=ENGINES, default='interpreter')
+    parser.add_argument('--machine', dest='machine', default='classic',
+                        help='word size and address width, classic (default) or extended machine '
+                             'with 4-digit words and 1000 cells that runs only in the interpreter engine')
+    parser.add_argument('-i', '--inputs', dest='inputs', type=argparse.FileType('r'), default=None,
+                        help='read input values from file ("-" for stdin) instead of prompting')
+    parser.add_argument('-o', '--outputs', dest='outputs', type=argparse.FileType('w'), default=None,
+                        help='write output values to file, one per line')
+    parser.add_argument('--cache-dir', dest='cache_dir', default=None,
+                        help='reuse assembled programs stored in this directory')
+    parser.add_argument('--image', dest='image', default='0',
+                        help='name or index of image to run from .lmco archive')
+    parser.add_argument('--profile', dest='profile', action='store_true',
+                        help='print execution profile with hot spots to stderr')
+    parser.add_argument('--trace', dest='trace', default=None,
+                        help='record executed instructions into binary trace file, see lmctrace.py')
+    parser.add_argument('--trace-sample', dest='trace_sample', type=int, default=1,
+                        help='record only every N-th instruction')
+    parser.add_argument('--trace-start', dest='trace_start', default=None,
+                        help='start recording at cycle N or at address/label given as @ADDR')
+    parser.add_argument('--trace-stop', dest='trace_stop', default=None,
+                        help='stop recording at cycle N or at address/label given as @ADDR')
+    parser.add_argument('--local', dest='local', action='store_true',
+                        help='never forward the run to a running lmc.py serve')
+    add_socket_argument(parser)
+    add_budget_arguments(parser)
+    args = parser.parse_args(argv)
+
+    inputs = args.inputs
+
+    if forwardable(args):
+        # Inputs are read before forwarding, so a local run gets them when the server fails.
+        inputs = read_inputs(args.inputs)
+
+        if forward(args, inputs):
+            return
+
+    # Modules of optional features are imported below only when the feature is used.
+    from lmcipy.assembler import assemble_stream
+    from lmcipy.channels import IterableInput, StreamOutput
+    from lmcipy.interpret import interpret_opcodes, load_opcodes
+    from lmcipy.machine import PROFILES
+
+    # Checked here rather than by choices, runs on the classic machine are forwarded without the import.
+    if args.machine not in PROFILES:
+        parser.error('argument --machine: invalid choice: {!r} (choose from {})'.format(
+            args.machine, ', '.join(sorted(PROFILES))
+        ))
+
+    inputs = IterableInput(inputs) if args.inputs else None
+    if args.outputs:
+        outputs = StreamOutput(args.outputs)
+    elif args.inputs:
+        # Non-interactive run, print outputs in batches instead of one by one.
+        outputs = StreamOutput(sys.stdout, template="Output: {}\n")
+    else:
+        outputs = None
+
+    profile = None
+    if args.profile:
+        from lmcipy.profiler import Profile
+        profile = Profile()
+
+    budget = make_budget(args)
+
+    machine_profile = PROFILES[args.machine]
+
+    if args.debug and (args.engine != 'interpreter' or profile or args.trace or budget):
+        parser.error('--debug cannot be combined with other engines, profiling, tracing or budgets')
+
+    if not machine_profile.classic and (args.debug or args.cache_dir or args.file.endswith('.lmco')):
+        parser.error('--machine {} cannot be combined with --debug, --cache-dir or object files'.format(
+            args.machine
+        ))
+
+    def run(opcodes, labels):
+        if args.debug:
+            from lmcipy.debugger import Debugger, DebuggerShell
+            from lmcipy.machine import MachineState
+
+            machine = MachineState(inputs=inputs, outputs=outputs)
+            machine.labels = labels
+            DebuggerShell(Debugger(load_opcodes(machine=machine, opcodes=opcodes, copy=False))).cmdloop()
+            return
+
+        trace = None
+        if args.trace:
+            from lmcipy.tracing import TraceRecorder, parse_trigger
+
+            trace = TraceRecorder(
+                args.trace,
+                sample=args.trace_sample,
+                start=parse_trigger(args.trace_start, labels) if args.trace_start else None,
+                stop=parse_trigger(args.trace_stop, labels) if args.trace_stop else None
+            )
+
+        try:
+            interpret_opcodes(opcodes, labels, engine=args.engine,
+                              inputs=inputs, outputs=outputs, profile=profile, trace=trace,
+                              budget=budget, machine_profile=machine_profile)
+        finally:
+            if trace is not None:
+                trace.close()
+            if profile is not None:
+                print(profile.report(labels), file=sys.stderr)
+
+    if args.file.endswith('.lmco'):
+        from lmcipy.objfile import ObjectArchive
+
+        with ObjectArchive(args.file) as archive:
+            image = archive[int(args.image)] if args.image.isdigit() else archive.find(args.image)
+            run(image.cells, image.labels)
+        return
+
+    with open(args.file) as f:
+        if args.cache_dir:
+            from lmcipy.cache import AssemblyCache
+            from lmcipy.util import load_program
+
+            opcodes, labels = AssemblyCache(directory=args.cache_dir).assemble(load_program(f))
+        else:
+            opcodes, labels = assemble_stream(f, mnemonics_to_opcodes=machine_profile.mnemonics_to_opcodes)
+
+    run(opcodes, labels)
+
+
+def main_assemble(argv):
+    parser = argparse.ArgumentParser(
+        prog='lmc.py assemble',
+        description='Assemble LMC sources into .lmco object file. Several sources are '
+                    'stored in a single archive, images are named by source path.'
+    )
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('-o', '--output', dest='output', required=True)
+    args = parser.parse_args(argv)
+
+    from lmcipy.assembler import assemble_stream
+    from lmcipy.objfile import encode_image, write_archive
+
+    def images():
+        for path in args.files:
+            with open(path) as f:
+                opcodes, labels = assemble_stream(f)
+            yield encode_image(opcodes, labels, name=path)
+
+    write_archive(args.output, images())
+
+
+def main_batch(argv):
+    parser = argparse.ArgumentParser(
+        prog='lmc.py batch',
+        description='Run many programs over many input vectors in parallel. Jobs are read '
+                    'as JSON lines {"id": ..., "program": "path.lmc", "inputs": [...]}, '
+                    'results are written as JSON lines.'
+    )
+    parser.add_argument('jobs', type=argparse.FileType('r'))
+    parser.add_argument('-o', '--output', dest='output', type=argparse.FileType('w'), default=sys.stdout)
+    parser.add_argument('-j', '--workers', dest='workers', type=int, default=None)
+    parser.add_argument('--engine', dest='engine', choices=ENGINES, default='interpreter')
+    parser.add_argument('--cache-dir', dest='cache_dir', default=None,
+                        help='reuse assembled programs stored in this directory')
+    parser.add_argument('--memoize', dest='memoize', action='store_true',
+                        help='reuse results of jobs with the same program and inputs '
+                             '(stored in --cache-dir when given)')
+    add_budget_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from lmcipy.batch import run_batch
+
+    jobs = [json.loads(line) for line in args.jobs if line.strip()]
+    programs = {}
+
+    for job in jobs:
+        if job['program'] not in programs:
+            with open(job['program']) as f:
+                programs[job['program']] = f.readlines()
+
+    results = run_batch(
+        programs,
+        ((job.get('id', num), job['program'], job.get('inputs', [])) for num, job in enumerate(jobs)),
+        workers=args.workers,
+        engine=args.engine,
+        cache_dir=args.cache_dir,
+        budget=make_budget(args),
+        memoize=args.memoize
+    )
+
+    for result in results:
+        args.output.write(json.dumps(result) + '\n')
+
+
+def main_serve(argv):
+    parser = argparse.ArgumentParser(
+        prog='lmc.py serve',
+        description='Run programs on requests sent over Unix domain socket, keeping assembled '
+                    'programs warm. Requests are JSON lines {"source": "...", "inputs": [...]} or '
+                    '{"program": KEY, ...} with KEY returned by an earlier response.'
+    )
+    add_socket_argument(parser)
+    parser.add_argument('-j', '--workers', dest='workers', type=int, default=1,
+                        help='number of preforked worker processes')
+    parser.add_argument('--cache-dir', dest='cache_dir', default=None,
+                        help='share assembled programs between workers through this directory')
+    add_budget_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from lmcipy.server import Server
+
+    # Terminate workers and remove the socket when stopped by kill.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        Server(args.socket, cache_dir=args.cache_dir, budget=make_budget(args)).serve_forever(workers=args.workers)
+    except KeyboardInterrupt:
+        pass
+
+
+COMMANDS = {
+    'assemble': main_assemble,
+    'batch': main_batch,
+    'serve': main_serve,
+}
 
-parser = argparse.ArgumentParser(description='Little Man Computer interpreter.')
-parser.add_argument('file', type=argparse.FileType('r'))
-parser.add_argument('--debug', dest='debug', action='store_true')
-args = parser.parse_args()
 
-program = lmcipy.util.load_program(args.file.readlines())
-lmcipy.interpret(program=program, debug=True if args.debug else False)
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+    else:
+        main_run(sys.argv[1:])
@@ -0,0 +1,59 @@
+#! /usr/bin/env python
+
+import argparse
+import sys
+import os
+
+try:
+    import lmcipy
+except:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../src"))
+    import lmcipy
+
+from lmcipy.assembler import assemble_stream
+from lmcipy.tracing import export_npz, format_record, read_trace
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Print binary trace recorded by lmc.py --trace.')
+    parser.add_argument('trace', help='trace file')
+    parser.add_argument('-s', '--source', dest='source', default=None,
+                        help='LMC source of traced program, used to show labels')
+    parser.add_argument('--address', dest='address', type=int, default=None,
+                        help='show only instructions at this address')
+    parser.add_argument('--stores', dest='stores', action='store_true',
+                        help='show only instructions that changed memory')
+    parser.add_argument('--npz', dest='npz', default=None,
+                        help='export trace as NumPy arrays into this .npz file instead of printing it')
+    parser.add_argument('--compress', dest='compress', action='store_true',
+                        help='compress the .npz file')
+    args = parser.parse_args(argv)
+
+    if args.npz:
+        if args.address is not None or args.stores or args.source:
+            parser.error('--npz exports whole trace, --address, --stores and --source are not supported')
+
+        count = export_npz(args.trace, args.npz, compress=args.compress)
+        print('Exported {} records into {}.'.format(count, args.npz), file=sys.stderr)
+        return
+
+    labels = {}
+    if args.source:
+        with open(args.source) as f:
+            _, labels = assemble_stream(f)
+
+    try:
+        for record in read_trace(args.trace):
+            if args.address is not None and record.counter != args.address:
+                continue
+            if args.stores and record.address is None:
+                continue
+
+            print(format_record(record, labels))
+    except BrokenPipeError:
+        # Output piped into e.g. head, which exited already.
+        sys.stderr.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
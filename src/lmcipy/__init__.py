@@ -1 +1,28 @@
-from .interpret import interpret
+import sys
+import types
+
+from .engines import ENGINES
+
+
+class _Package(types.ModuleType):
+    """
+    Package importing func:`lmcipy.interpret.interpret` on first use, so that importing
+    e.g. lmcipy.client does not load the engines.
+    """
+
+    def __getattr__(self, name):
+        if name == 'interpret':
+            from .interpret import interpret
+            return interpret
+
+        raise AttributeError("module {!r} has no attribute {!r}".format(self.__name__, name))
+
+    def __setattr__(self, name, value):
+        # Importing submodule lmcipy.interpret binds it to the package, keep the function instead.
+        if name == 'interpret' and isinstance(value, types.ModuleType):
+            value = value.interpret
+
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
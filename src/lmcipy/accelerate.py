@@ -0,0 +1,322 @@
+#! /usr/bin/env python
+
+MAX_BODY_LENGTH = 100
+NEVER = float('inf')
+
+
+class LinearExpression:
+    """
+    Integer expression ``constant + sum(coefficient * cell)`` over values memory cells had
+    at the start of a loop iteration.
+
+    Args:
+        constant (int): Constant term.
+        terms (dict): Coefficients of cells (address: coefficient).
+    """
+    __slots__ = ('constant', 'terms')
+
+    def __init__(self, constant=0, terms=None):
+        self.constant = constant
+        self.terms = terms or {}
+
+    @classmethod
+    def cell(cls, address):
+        return cls(0, {address: 1})
+
+    def combine(self, other, sign):
+        terms = dict(self.terms)
+
+        for address, coefficient in other.terms.items():
+            terms[address] = terms.get(address, 0) + sign * coefficient
+            if not terms[address]:
+                del terms[address]
+
+        return LinearExpression(self.constant + sign * other.constant, terms)
+
+    def at(self, cells, steps, iteration):
+        """
+        Evaluate the expression in `iteration`, given current `cells` and change of each
+        cell per iteration `steps`.
+
+        Returns:
+            int: Value in the first iteration.
+            int: Change of value per iteration.
+        """
+        value, step = self.constant, 0
+
+        for address, coefficient in self.terms.items():
+            value += coefficient * cells[address]
+            step += coefficient * steps.get(address, 0)
+
+        return value + iteration * step, step
+
+
+def first_negative(value, step):
+    """
+    Return first iteration ``k >= 0`` in which ``value + k * step`` is negative.
+    """
+    if value < 0:
+        return 0
+
+    if step >= 0:
+        return NEVER
+
+    return value // -step + 1
+
+
+def first_change(value, step, zero):
+    """
+    Return first iteration ``k >= 0`` in which ``(value + k * step == 0) != zero``.
+    """
+    if (value == 0) != zero:
+        return 0
+
+    if step == 0:
+        return NEVER
+
+    if zero:
+        return 1
+
+    if -value % step == 0 and -value // step > 0:
+        return -value // step
+
+    return NEVER
+
+
+class LoopSummary:
+    """
+    Effect of one iteration of a loop that only does affine updates, see
+    func:`summarize_loop`.
+
+    Args:
+        header (int): Address of the first instruction of the loop.
+        length (int): Number of instructions executed by one iteration.
+        stores (dict): Value stored into each written cell (address: class:`LinearExpression`).
+        accumulator (obj): Signed accumulator at the end of the iteration or ``None`` when
+                           the loop does not touch it.
+        conditions (list): Tuples (kind, expression, outcome) that must keep holding - kind is
+                           ``'zero'`` (expression is zero iff outcome) or ``'sign'``
+                           (expression is non-negative iff outcome).
+    """
+
+    def __init__(self, header, length, stores, accumulator, conditions):
+        self.header = header
+        self.length = length
+        self.stores = stores
+        self.accumulator = accumulator
+        self.conditions = conditions
+
+    def steps(self, cells):
+        """
+        Return change of each written cell per iteration, or ``None`` when some cell is not
+        incremented by a loop invariant - a constant or cells the loop does not write.
+        """
+        steps = {}
+
+        for address, expression in self.stores.items():
+            delta = expression.combine(LinearExpression.cell(address), -1)
+
+            if any(term in self.stores for term in delta.terms):
+                return None
+
+            steps[address], _ = delta.at(cells, {}, 0)
+
+        return steps
+
+    def iterations(self, cells):
+        """
+        Return number of iterations that follow the same path from current `cells`.
+        """
+        steps = self.steps(cells)
+        if steps is None:
+            return 0
+
+        limit = NEVER
+
+        for kind, expression, outcome in self.conditions:
+            value, step = expression.at(cells, steps, 0)
+
+            if kind == 'zero':
+                limit = min(limit, first_change(value, step, outcome))
+            elif outcome:
+                limit = min(limit, first_negative(value, step))
+            else:
+                limit = min(limit, first_negative(-value - 1, -step))
+
+        return limit
+
+
+def summarize_loop(cells, header):
+    """
+    Symbolically execute one iteration of the loop starting at `header`.
+
+    The iteration follows branches as they would be taken with current `cells` and must
+    return to `header` without reaching any instruction twice. Only LDA, ADD, SUB, STA and
+    branches are allowed, the accumulator must be loaded before it is used and no cell
+    executed by the loop may be stored into. Values stay exact only while arithmetic does
+    not overflow and STA stores non-negative values, both are added to the conditions.
+
+    Args:
+        cells (list): Memory cells.
+        header (int): Address of the first instruction of the loop.
+
+    Returns:
+        obj: Instance of class:`LoopSummary` or ``None`` when the loop cannot be summarized.
+    """
+    stores = {}
+    conditions = []
+    accumulator = None
+    visited = set()
+    counter = header
+
+    while True:
+        if counter >= len(cells) or counter in visited or len(visited) >= MAX_BODY_LENGTH:
+            return None
+
+        visited.add(counter)
+        kind, operand = divmod(cells[counter], 100)
+        counter += 1
+
+        if kind == 5:
+            accumulator = stores.get(operand) or LinearExpression.cell(operand)
+
+        elif kind in (1, 2):
+            if accumulator is None:
+                return None
+
+            value = stores.get(operand) or LinearExpression.cell(operand)
+            accumulator = accumulator.combine(value, 1 if kind == 1 else -1)
+            # Result must stay within -999 - 999, i.e. acc - 1000 < 0 and acc + 999 >= 0.
+            conditions.append(('sign', accumulator.combine(LinearExpression(1000), -1), False))
+            conditions.append(('sign', accumulator.combine(LinearExpression(999), 1), True))
+
+        elif kind == 3:
+            if accumulator is None:
+                return None
+
+            conditions.append(('sign', accumulator, True))
+            stores[operand] = accumulator
+
+        elif kind == 6:
+            counter = operand
+
+        elif kind in (7, 8):
+            if accumulator is None:
+                return None
+
+            value, _ = accumulator.at(cells, {}, 0)
+            # Values are taken from the start of the iteration, so cells stored earlier
+            # in this iteration are already part of `accumulator`.
+            kind_name = 'zero' if kind == 7 else 'sign'
+            taken = value == 0 if kind == 7 else value >= 0
+            conditions.append((kind_name, accumulator, taken))
+
+            if taken:
+                counter = operand
+
+        else:
+            return None
+
+        if counter == header:
+            break
+
+    if visited & set(stores):
+        return None
+
+    return LoopSummary(header, len(visited), stores, accumulator, conditions)
+
+
+def find_loop_headers(cells):
+    """
+    Return targets of backward branches.
+
+    Args:
+        cells (list): Memory cells.
+
+    Returns:
+        bytearray: 1 for every address that is target of a backward branch.
+    """
+    headers = bytearray(len(cells))
+
+    for address, cell in enumerate(cells):
+        if 6 <= cell // 100 <= 8 and cell % 100 <= address:
+            headers[cell % 100] = 1
+
+    return headers
+
+
+class LoopAccelerator:
+    """
+    Skipper of counted loops.
+
+    When execution reaches a loop header, one iteration of the loop is summarized (see
+    func:`summarize_loop`). If every cell the loop writes changes by a constant per
+    iteration, all values in the loop are affine functions of the iteration number, so
+    the number of iterations before any branch changes direction can be computed in
+    closed form and the iterations are applied at once.
+
+    Failed attempts are retried after exponentially growing number of visits of the
+    header, so loops that cannot be accelerated cost almost nothing. A successful attempt
+    resets the back-off.
+
+    Args:
+        cells (list): Memory cells, changed in place.
+        stored (func): Write barrier called with address of every changed cell.
+    """
+
+    def __init__(self, cells, stored=None):
+        self.headers = find_loop_headers(cells)
+        self.accelerated = 0
+        self._cells = cells
+        self._stored = stored
+        self._visits = [0] * len(cells)
+        self._next_attempt = [2] * len(cells)
+        self._backoff = [1] * len(cells)
+
+    def accelerate(self, machine, max_cycles=None):
+        """
+        Try to skip iterations of loop starting at `machine.counter`.
+
+        Args:
+            machine (obj): Instance of class:`MachineState` whose counter is at loop header.
+            max_cycles (int or None): Maximum number of cycles to skip.
+
+        Returns:
+            int: Number of skipped cycles, 0 when the loop was not accelerated.
+        """
+        header = machine.counter
+        visits = self._visits[header] = self._visits[header] + 1
+
+        if visits < self._next_attempt[header]:
+            return 0
+
+        cells = self._cells
+        summary = summarize_loop(cells, header)
+        iterations = 0 if summary is None else summary.iterations(cells)
+
+        if max_cycles is not None and iterations:
+            iterations = min(iterations, max_cycles // summary.length)
+
+        if iterations < 2 or iterations == NEVER:
+            self._next_attempt[header] = visits + self._backoff[header]
+            self._backoff[header] *= 2
+            return 0
+
+        self._backoff[header] = 1
+
+        steps = summary.steps(cells)
+
+        if summary.accumulator is not None:
+            value, _ = summary.accumulator.at(cells, steps, iterations - 1)
+            machine.accumulator = abs(value)
+            machine.minus_flag = value < 0
+
+        for address, step in steps.items():
+            cells[address] += iterations * step
+
+            if self._stored is not None:
+                self._stored(address)
+
+        self.accelerated += iterations
+
+        return iterations * summary.length
@@ -0,0 +1,169 @@
+#! /usr/bin/env python
+
+from .machine import CLASSIC
+
+
+CODE = 'code'
+DATA = 'data'
+UNUSED = 'unused'
+
+
+def successors(address, cell):
+    """
+    Return addresses execution may continue at after instruction `cell` at `address`.
+
+    Args:
+        address (int): Address of the instruction.
+        cell (int): Opcode.
+
+    Returns:
+        tuple: Addresses of following instructions, empty for HLT and unknown opcodes.
+    """
+    kind, operand = divmod(cell, 100)
+
+    if kind in (1, 2, 3, 5) or cell in (901, 902):
+        return (address + 1,)
+
+    if kind == 6:
+        return (operand,)
+
+    if kind in (7, 8):
+        return (address + 1, operand) if operand != address + 1 else (operand,)
+
+    return ()
+
+
+class ProgramAnalysis:
+    """
+    Control-flow graph of a program and classification of its cells, see func:`analyze`.
+
+    Args:
+        entry (int): Address of the first executed instruction.
+        edges (dict): Successors of every reachable instruction (address: tuple of addresses).
+        loaded (set): Addresses read by reachable LDA, ADD and SUB.
+        stored (set): Addresses written by reachable STA.
+
+    Attributes:
+        code (set): Addresses of reachable instructions.
+        data (set): Addresses read or written by reachable instructions.
+    """
+
+    def __init__(self, entry, edges, loaded, stored):
+        self.entry = entry
+        self.edges = edges
+        self.loaded = loaded
+        self.stored = stored
+        self.code = set(edges)
+        self.data = loaded | stored
+
+    @property
+    def self_modifying(self):
+        """
+        Whether a reachable STA writes into a reachable instruction. When it does not,
+        the program provably never modifies its code.
+        """
+        return not self.stored.isdisjoint(self.code)
+
+    def kind(self, address):
+        """
+        Classify cell at `address` as `CODE` (executed, possibly also read as data),
+        `DATA` (only read or written) or `UNUSED`.
+        """
+        if address in self.code:
+            return CODE
+
+        return DATA if address in self.data else UNUSED
+
+    def blocks(self):
+        """
+        Return basic blocks of reachable code.
+
+        Returns:
+            list: Sorted tuples (first address, last address).
+        """
+        predecessors = {}
+        for address, targets in self.edges.items():
+            for target in targets:
+                predecessors.setdefault(target, []).append(address)
+
+        def starts_block(address):
+            sources = predecessors.get(address, ())
+
+            if address == self.entry or len(sources) != 1:
+                return True
+
+            # The only predecessor must fall through into `address` and nowhere else.
+            return sources[0] != address - 1 or len(self.edges[address - 1]) != 1
+
+        blocks = []
+        for start in sorted(address for address in self.code if starts_block(address)):
+            end = start
+            while self.edges[end] == (end + 1,) and end + 1 in self.code and not starts_block(end + 1):
+                end += 1
+            blocks.append((start, end))
+
+        return blocks
+
+
+def analyze(cells, entry=0):
+    """
+    Build control-flow graph of program in `cells` executed from `entry`.
+
+    Branch targets are encoded in the instructions, so instructions reachable from `entry`
+    are exactly the instructions that can execute - as long as none of them is overwritten.
+    If no reachable STA targets a reachable instruction, memory holding code never changes
+    and the program provably cannot modify its own code (see func:`ProgramAnalysis.self_modifying`).
+
+    Args:
+        cells (list): Memory cells of a classic machine.
+        entry (int): Address of the first executed instruction.
+
+    Returns:
+        obj: Instance of class:`ProgramAnalysis`.
+    """
+    edges = {}
+    loaded, stored = set(), set()
+    pending = [entry]
+
+    while pending:
+        address = pending.pop()
+
+        if address in edges or not 0 <= address < len(cells):
+            continue
+
+        cell = cells[address]
+        kind, operand = divmod(cell, 100)
+        edges[address] = successors(address, cell)
+        pending.extend(edges[address])
+
+        if kind in (1, 2, 5):
+            loaded.add(operand)
+        elif kind == 3:
+            stored.add(operand)
+
+    return ProgramAnalysis(entry, edges, loaded, stored)
+
+
+def predecode(machine):
+    """
+    Decode program of `machine` into immutable instruction stream if it provably never
+    modifies its code, see func:`analyze`.
+
+    Args:
+        machine (obj): Instance of class:`lmcipy.machine.MachineState` with loaded program.
+
+    Returns:
+        list or None: Functions of every cell taking single argument `machine`, ``None``
+                      when the program may modify its code or the machine is not classic.
+    """
+    if machine.profile is not CLASSIC:
+        return None
+
+    cells = machine.memory[:]
+
+    if not 0 <= machine.counter < len(cells) or analyze(cells, machine.counter).self_modifying:
+        return None
+
+    decode = machine.decode_table
+
+    return [decode[cell] for cell in cells]
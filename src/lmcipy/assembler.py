@@ -0,0 +1,437 @@
+#! /usr/bin/env python
+
+from .machine import MachineState
+
+
+class SyntaxError(Exception):
+    """
+    Error in LMC program syntax.
+
+    Args:
+        line_num (int): Number of line with error.
+        msg (str): Error.
+    """
+
+    def __init__(self, line_num, msg):
+        self.line_num = line_num
+        self.msg = msg
+
+        super().__init__("SyntaxError on line {}: {}".format(line_num + 1, msg))
+
+
+def is_number(token):
+    """
+    Check whether `token` is a decimal number. Unlike ``str.isnumeric`` only ASCII digits
+    are accepted, so every number-like token can be converted by ``int``.
+
+    Args:
+        token (str): Token.
+
+    Returns:
+        True or False
+    """
+    return token.isascii() and token.isdigit()
+
+
+def check_arg(check_func, arg):
+    """
+    Check that `arg` satisfies checking func of opcode.
+
+    Args:
+        check_func (func): Checking fuc of opcode, makes sure that no invalid argument
+                           is supplied.
+        arg (str or int or None): Argument to be checked against check_func.
+
+    Raises:
+        TypeError: Raised when check_func is supplied with wrong number of arguments.
+
+    Returns:
+        True or False
+    """
+    if check_func is None:
+        return True if arg is None else False
+
+    if arg is None:
+        return check_func()
+
+    return check_func(arg)
+
+
+def encode_instruction(mnemonics_to_opcodes, mnem, arg, line_num):
+    """
+    Convert mnemonic and its resolved argument into opcode.
+
+    Args:
+        mnemonics_to_opcodes (dict): Definition of mnemonics, see class:`MachineState`.
+        mnem (str): Mnemonic.
+        arg (int or None): Argument with labels already replaced by addresses.
+        line_num (int): Line number.
+
+    Raises:
+        SyntaxError: Raised for unknown mnemonic or invalid argument.
+
+    Returns:
+        int: Opcode.
+    """
+    if mnem not in mnemonics_to_opcodes:
+        raise SyntaxError(line_num, 'Unknown mnemonic. Mnemonic: {}'.format(mnem))
+
+    func, arg_check = mnemonics_to_opcodes[mnem]
+
+    try:
+        if not check_arg(arg_check, arg):
+            raise SyntaxError(line_num, 'Invalid argument. Argument: {}'.format(arg))
+    except TypeError:
+        raise SyntaxError(line_num, 'Wrong ammount of arguments.')
+
+    return func(*([arg] if arg is not None else []))
+
+
+def tokenize_lines(lines):
+    """
+    Lazily remove comments from `lines` and split them into tokens.
+
+    Args:
+        lines (iterable): Lines of program, e.g. opened file.
+
+    Yields:
+        list: Tokens of single line.
+    """
+    for line in lines:
+        yield line.partition('//')[0].split()
+
+
+def assemble_tokens(program, mnemonics_to_opcodes=MachineState.mnemonics_to_opcodes):
+    """
+    Assemble tokenized program in a single pass.
+
+    Opcodes are emitted line by line. References to labels defined later in the program
+    are left as holes and backpatched once the label is defined, so `program` can be any
+    iterable and is read only once.
+
+    Number-like tokens are always numbers - a label that looks like a number is rejected,
+    as is a label defined twice or a reference to label that is never defined.
+
+    Args:
+        program (iterable): Lists of string tokens, one per line of program.
+        mnemonics_to_opcodes (dict): Definition of mnemonics, see class:`MachineState`.
+
+    Raises:
+        SyntaxError: Raised when trying to generate opcode for invalid line of program.
+
+    Returns:
+        list: List of opcodes.
+        dict: Labels of program (label: address).
+    """
+    opcodes = []
+    labels = {}
+    # label: list of (address, line number, mnemonic) waiting for the label to be defined
+    pending = {}
+
+    for line_num, line in enumerate(program):
+        address = len(opcodes)
+
+        if line and line[0] not in mnemonics_to_opcodes:
+            label, line = line[0], line[1:]
+
+            if is_number(label):
+                raise SyntaxError(line_num, 'Label looks like a number. Label: {}'.format(label))
+
+            if label in labels:
+                raise SyntaxError(line_num, 'Label defined twice. Label: {}'.format(label))
+
+            labels[label] = address
+
+            for use_address, use_line_num, use_mnem in pending.pop(label, ()):
+                opcodes[use_address] = encode_instruction(mnemonics_to_opcodes, use_mnem, address, use_line_num)
+
+        if not line:
+            opcodes.append(0)
+            continue
+
+        if len(line) > 2:
+            raise SyntaxError(line_num, 'Too many tokens. Tokens: {}'.format(line))
+
+        mnem, arg = line[0], line[1] if len(line) == 2 else None
+
+        if arg is None or is_number(arg):
+            opcodes.append(encode_instruction(mnemonics_to_opcodes, mnem, arg if arg is None else int(arg), line_num))
+        elif arg in labels:
+            opcodes.append(encode_instruction(mnemonics_to_opcodes, mnem, labels[arg], line_num))
+        else:
+            if mnem not in mnemonics_to_opcodes:
+                raise SyntaxError(line_num, 'Unknown mnemonic. Mnemonic: {}'.format(mnem))
+
+            pending.setdefault(arg, []).append((address, line_num, mnem))
+            opcodes.append(None)
+
+    for label, uses in pending.items():
+        raise SyntaxError(uses[0][1], 'Unknown label. Label: {}'.format(label))
+
+    return opcodes, labels
+
+
+def assemble_stream(lines, mnemonics_to_opcodes=MachineState.mnemonics_to_opcodes):
+    """
+    Assemble program read from `lines` in a single pass, see func:`assemble_tokens`.
+
+    Args:
+        lines (iterable): Lines of program, e.g. opened file or pipe.
+        mnemonics_to_opcodes (dict): Definition of mnemonics, see class:`MachineState`.
+
+    Raises:
+        SyntaxError: Raised when trying to generate opcode for invalid line of program.
+
+    Returns:
+        list: List of opcodes.
+        dict: Labels of program (label: address).
+    """
+    return assemble_tokens(tokenize_lines(lines), mnemonics_to_opcodes=mnemonics_to_opcodes)
+
+
+# Stages of func:`assemble_tokens` at which an error of a line is found, see func:`IncrementalAssembler.assemble`.
+LABEL_ERROR, REFERENCE_ERROR, LINE_ERROR, UNKNOWN_LABEL_ERROR = range(4)
+
+
+class _Line:
+    """
+    Single line of class:`IncrementalAssembler`.
+    """
+    __slots__ = ('address', 'label', 'mnem', 'arg', 'parse_error', 'opcode', 'error', 'stage')
+
+    def __init__(self, address):
+        self.address = address
+        self.label = self.mnem = self.arg = self.parse_error = self.opcode = self.error = self.stage = None
+
+
+class IncrementalAssembler:
+    """
+    Assembler keeping tokens, label table and label use sites of a program, so that an edit
+    re-tokenizes only the edited line and re-encodes only the lines it affects.
+
+    Every line occupies one memory cell, its address is its line number. Editing a line
+    re-encodes the line itself and lines that use labels the edit defined, removed or
+    redefined. Inserting or deleting a line shifts the following lines, so lines using
+    labels defined after it are re-encoded as well; moving the lines themselves costs
+    a single pass over integers.
+
+    Results and errors match func:`assemble_tokens`, including the error raised by
+    func:`assemble`; all errors are also collected, see func:`diagnostics`.
+
+    Args:
+        lines (iterable): Initial lines of program (strings).
+        mnemonics_to_opcodes (dict): Definition of mnemonics, see class:`MachineState`.
+    """
+
+    def __init__(self, lines=(), mnemonics_to_opcodes=MachineState.mnemonics_to_opcodes):
+        self.mnemonics_to_opcodes = mnemonics_to_opcodes
+        self._lines = []
+        # label: lines defining it, sorted by address; the first definition wins
+        self._definitions = {}
+        # label: lines using it as argument
+        self._uses = {}
+
+        for text in lines:
+            self.insert_line(len(self._lines), text)
+
+    def __len__(self):
+        return len(self._lines)
+
+    @property
+    def labels(self):
+        """
+        Labels of the program (label: address).
+        """
+        return {label: lines[0].address for label, lines in self._definitions.items()}
+
+    def _parse(self, line, tokens):
+        line.label = line.mnem = line.arg = line.parse_error = None
+
+        if tokens and tokens[0] not in self.mnemonics_to_opcodes:
+            line.label, tokens = tokens[0], tokens[1:]
+
+        if len(tokens) > 2:
+            line.parse_error = 'Too many tokens. Tokens: {}'.format(tokens)
+        elif tokens:
+            line.mnem, line.arg = tokens[0], tokens[1] if len(tokens) == 2 else None
+
+    def _encode(self, line):
+        line.opcode, line.error, line.stage = None, None, LABEL_ERROR
+
+        if line.label is not None:
+            if is_number(line.label):
+                line.error = 'Label looks like a number. Label: {}'.format(line.label)
+            elif self._definitions[line.label][0] is not line:
+                line.error = 'Label defined twice. Label: {}'.format(line.label)
+
+        if line.error is None and line.parse_error is not None:
+            line.error, line.stage = line.parse_error, LINE_ERROR
+
+        if line.error is not None:
+            return
+
+        if line.mnem is None:
+            line.opcode = 0
+            return
+
+        line.stage = LINE_ERROR
+        arg = line.arg
+        if arg is not None and not is_number(arg):
+            if line.mnem not in self.mnemonics_to_opcodes:
+                line.error = 'Unknown mnemonic. Mnemonic: {}'.format(line.mnem)
+                return
+
+            if arg not in self._definitions:
+                line.error, line.stage = 'Unknown label. Label: {}'.format(arg), UNKNOWN_LABEL_ERROR
+                return
+
+            line.stage = REFERENCE_ERROR
+            arg = self._definitions[arg][0].address
+
+        try:
+            line.opcode = encode_instruction(self.mnemonics_to_opcodes, line.mnem,
+                                             arg if arg is None else int(arg), line.address)
+        except SyntaxError as e:
+            line.error = e.msg
+
+    def _error_order(self, line):
+        """
+        Sort key of error of `line` by the time func:`assemble_tokens` finds it.
+        """
+        if line.stage == UNKNOWN_LABEL_ERROR:
+            # Found after the last line; a label is reported at its first use.
+            return len(self._lines), line.stage, line.address
+
+        if line.stage == REFERENCE_ERROR:
+            definition = self._definitions[line.arg][0].address
+
+            # Forward reference is encoded when the label is defined.
+            if definition > line.address:
+                return definition, line.stage, line.address
+
+        return line.address, line.stage, line.address
+
+    def _attach(self, line):
+        if line.label is not None and not is_number(line.label):
+            definitions = self._definitions.setdefault(line.label, [])
+            definitions.append(line)
+            definitions.sort(key=lambda definition: definition.address)
+
+        if line.arg is not None and not is_number(line.arg):
+            self._uses.setdefault(line.arg, set()).add(line)
+
+    def _detach(self, line):
+        if line.label is not None and not is_number(line.label):
+            definitions = self._definitions[line.label]
+            definitions.remove(line)
+            if not definitions:
+                del self._definitions[line.label]
+
+        if line.arg is not None and not is_number(line.arg):
+            uses = self._uses[line.arg]
+            uses.discard(line)
+            if not uses:
+                del self._uses[line.arg]
+
+    def _dependents(self, labels):
+        lines = set()
+
+        for label in labels:
+            lines.update(self._uses.get(label, ()))
+            lines.update(self._definitions.get(label, ()))
+
+        return lines
+
+    def _update(self, lines):
+        for line in lines:
+            if line.address is not None:
+                self._encode(line)
+
+    def set_line(self, index, text):
+        """
+        Replace line `index` with `text`.
+
+        Args:
+            index (int): Line number (address).
+            text (str): New content of the line.
+        """
+        line = self._lines[index]
+        old_label = line.label
+        self._detach(line)
+        self._parse(line, next(tokenize_lines([text])))
+        self._attach(line)
+
+        self._update({line} | self._dependents({old_label, line.label} - {None}))
+
+    def insert_line(self, index, text):
+        """
+        Insert new line `text` before line `index`, shifting the following lines.
+
+        Args:
+            index (int): Line number (address) of the new line.
+            text (str): Content of the line.
+        """
+        shifted = self._shift(index, 1)
+        line = _Line(index)
+        self._lines.insert(index, line)
+        self._parse(line, next(tokenize_lines([text])))
+        self._attach(line)
+
+        self._update({line} | self._dependents(shifted | ({line.label} - {None})))
+
+    def delete_line(self, index):
+        """
+        Remove line `index`, shifting the following lines.
+
+        Args:
+            index (int): Line number (address).
+        """
+        line = self._lines.pop(index)
+        self._detach(line)
+        line.address = None
+        shifted = self._shift(index, -1)
+
+        self._update(self._dependents(shifted | ({line.label} - {None})))
+
+    def _shift(self, index, offset):
+        """
+        Move lines from `index` on by `offset` and return labels whose address changed.
+        """
+        shifted = set()
+
+        for line in self._lines[index:]:
+            line.address += offset
+            if line.label is not None:
+                shifted.add(line.label)
+
+        return shifted
+
+    def diagnostics(self):
+        """
+        Return errors of all lines.
+
+        Returns:
+            list: Instances of class:`SyntaxError`, ordered by line.
+        """
+        return [SyntaxError(line.address, line.error) for line in self._lines if line.error is not None]
+
+    def assemble(self):
+        """
+        Return image of the whole program.
+
+        Raises:
+            SyntaxError: The error of func:`diagnostics` raised by func:`assemble_tokens`,
+                         which reports unknown labels only after the last line and
+                         invalid forward references at definition of the label.
+
+        Returns:
+            list: List of opcodes.
+            dict: Labels of program (label: address).
+        """
+        errors = [line for line in self._lines if line.error is not None]
+
+        if errors:
+            line = min(errors, key=self._error_order)
+            raise SyntaxError(line.address, line.error)
+
+        return [line.opcode for line in self._lines], self.labels
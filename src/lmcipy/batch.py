@@ -0,0 +1,138 @@
+#! /usr/bin/env python
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+import os
+
+from .cache import AssemblyCache, ResultCache
+from .channels import IterableInput, ListOutput
+from .interpret import load_opcodes, run_engine
+from .machine import MachineState
+from .util import load_program
+
+
+_programs = {}
+_assembled = {}
+_cache = AssemblyCache()
+_results = None
+
+
+def _init_worker(programs, cache_dir=None, memoize=False):
+    """
+    Store sources of all programs in the worker process. Programs are assembled lazily,
+    at most once per worker.
+
+    Args:
+        programs (dict): Mapping of program names to lists of source lines.
+        cache_dir (str or None): Directory of on-disk assembly and result cache shared by workers.
+        memoize (bool): Whether to reuse results of jobs with the same program and inputs.
+    """
+    global _cache, _results
+
+    _programs.clear()
+    _programs.update(programs)
+    _assembled.clear()
+    _cache = AssemblyCache(directory=cache_dir)
+    _results = ResultCache(directory=cache_dir) if memoize else None
+
+
+def run_job(name, inputs, engine='interpreter', max_cycles=None, budget=None):
+    """
+    Run one program over one input vector.
+
+    Args:
+        name (str): Name of program, see func:`run_batch`.
+        inputs (list): Input values.
+        engine (str): Execution engine, see func:`lmcipy.interpret.run_engine`.
+        max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+        budget (obj): Instance of class:`lmcipy.budget.Budget`, exceeding it is reported
+                      as an error of the job.
+
+    Returns:
+        dict: Result with keys ``outputs``, ``cycles``, ``halted`` and ``error`` (``None`` or
+              description of exception raised by the program).
+    """
+    outputs, cycles, halted, error = [], 0, False, None
+
+    try:
+        if name not in _assembled:
+            _assembled[name] = _cache.assemble(load_program(_programs[name]))
+
+        opcodes, labels = _assembled[name]
+
+        if _results is not None:
+            result = _results.run(opcodes, dict(labels), inputs=inputs, outputs=ListOutput(outputs),
+                                  engine=engine, max_cycles=max_cycles, budget=budget)
+            return {'outputs': outputs, 'cycles': result.cycles, 'halted': result.halted, 'error': None}
+
+        machine = MachineState(inputs=IterableInput(inputs), outputs=ListOutput(outputs))
+        machine.labels = dict(labels)
+        machine = load_opcodes(machine=machine, opcodes=opcodes, copy=False)
+        result = run_engine(machine, engine=engine, max_cycles=max_cycles, budget=budget)
+
+        cycles, halted = result.cycles, result.halted
+    except Exception as e:
+        error = "{}: {}".format(e.__class__.__name__, e)
+
+    return {'outputs': outputs, 'cycles': cycles, 'halted': halted, 'error': error}
+
+
+def _run_chunk(jobs, engine, max_cycles, budget):
+    results = []
+
+    for job_id, name, inputs in jobs:
+        result = run_job(name, inputs, engine=engine, max_cycles=max_cycles, budget=budget)
+        result.update(id=job_id, program=name, inputs=list(inputs))
+        results.append(result)
+
+    return results
+
+
+def run_batch(programs, jobs, workers=None, engine='interpreter', max_cycles=None, chunksize=64,
+              cache_dir=None, budget=None, memoize=False):
+    """
+    Run many (program, input vector) jobs in a pool of worker processes.
+
+    Each worker assembles every distinct program at most once. Results are yielded as soon
+    as their chunk finishes, so their order does not follow order of `jobs`.
+
+    Args:
+        programs (dict): Mapping of program names to lists of source lines.
+        jobs (iterable): Tuples ``(job_id, program_name, inputs)``.
+        workers (int or None): Number of worker processes, defaults to number of CPUs.
+        engine (str): Execution engine, see func:`lmcipy.interpret.run_engine`.
+        max_cycles (int or None): Stop each job after this many cycles.
+        chunksize (int): Number of jobs sent to a worker at once.
+        cache_dir (str or None): Directory of on-disk assembly cache, see class:`AssemblyCache`.
+                                 With `memoize` results are stored there as well.
+        budget (obj): Instance of class:`lmcipy.budget.Budget` limiting each job.
+        memoize (bool): Whether workers reuse results of jobs with the same program and
+                        inputs, see class:`ResultCache`.
+
+    Yields:
+        dict: Result of func:`run_job` extended with ``id``, ``program`` and ``inputs``.
+    """
+    jobs = iter(jobs)
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(programs, cache_dir, memoize)) as executor:
+        # Keep only a bounded number of chunks in flight, so that huge job lists
+        # are streamed instead of being submitted all at once.
+        limit = 4 * workers
+        pending = set()
+
+        while True:
+            while len(pending) < limit:
+                chunk = list(islice(jobs, chunksize))
+                if not chunk:
+                    break
+                pending.add(executor.submit(_run_chunk, chunk, engine, max_cycles, budget))
+
+            if not pending:
+                return
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                yield from future.result()
@@ -0,0 +1,230 @@
+#! /usr/bin/env python
+
+import random
+import time
+
+from .channels import Channel
+from .machine import HaltSignal, InvalidMachineOperationError, RunResult, unchecked
+
+
+HASH_MASK = (1 << 64) - 1
+
+
+class BudgetExceeded(Exception):
+    """
+    Run used up one of its resources.
+
+    Args:
+        resource (str): ``'cycles'``, ``'seconds'`` or ``'outputs'``.
+        limit (int or float): The exceeded limit.
+    """
+
+    def __init__(self, resource, limit):
+        self.resource = resource
+        self.limit = limit
+
+        super().__init__("Budget of {} {} exceeded.".format(limit, resource))
+
+
+class InfiniteLoopError(Exception):
+    """
+    Machine returned to a state it was already in without reading input, so it never halts.
+
+    Args:
+        cycle (int): Cycle in which the repeated state was detected.
+        counter (int): Counter of the repeated state.
+    """
+
+    def __init__(self, cycle, counter):
+        self.cycle = cycle
+        self.counter = counter
+
+        super().__init__("Infinite loop at address {} detected in cycle {}.".format(counter, cycle))
+
+
+class Budget:
+    """
+    Limits of a single run, see func:`lmcipy.interpret.run_engine`.
+
+    Args:
+        cycles (int or None): Maximum number of executed cycles.
+        seconds (float or None): Maximum wall-clock time. Time is checked every
+                                 `check_interval` cycles, so the run may take slightly longer.
+        outputs (int or None): Maximum number of output values.
+        detect_loops (bool): Whether to stop with class:`InfiniteLoopError` once the machine
+                             provably never halts, see class:`LoopDetector`.
+        check_interval (int): Number of cycles run between checks of wall-clock time.
+    """
+
+    def __init__(self, cycles=None, seconds=None, outputs=None, detect_loops=False, check_interval=10000):
+        self.cycles = cycles
+        self.seconds = seconds
+        self.outputs = outputs
+        self.detect_loops = detect_loops
+        self.check_interval = check_interval
+
+
+class LimitedOutput(Channel):
+    """
+    Output channel passing at most `limit` values to `channel`.
+
+    Args:
+        channel (obj): Wrapped output channel.
+        limit (int): Maximum number of values.
+    """
+
+    def __init__(self, channel, limit):
+        self.channel = channel
+        self.limit = limit
+        self.written = 0
+
+    def write(self, value):
+        if self.written >= self.limit:
+            raise BudgetExceeded('outputs', self.limit)
+
+        self.written += 1
+        self.channel.write(value)
+
+    def flush(self):
+        self.channel.flush()
+
+
+class LoopDetector:
+    """
+    Interpreter loop detecting non-termination of the machine.
+
+    State of the machine is finite, so a machine that returns to a state - counter,
+    accumulator, flag and memory - it was already in without reading input between the
+    two visits repeats forever. States are compared with Brent's cycle detection: a state
+    is saved at cycles that are powers of two apart and every following state is compared
+    with it. Memory is represented by a hash updated on every STA, cells are compared
+    only when the hashes match, so detection is exact. Reading input resets the detection.
+
+    Args:
+        machine (obj): Instance of class:`lmcipy.machine.MachineState` that will be run.
+    """
+    keys = [random.Random(index).getrandbits(64) for index in range(100)]
+
+    def __init__(self, machine):
+        self.cycles = 0
+        self._hash = sum(key * cell for key, cell in zip(self.keys, machine.memory[:])) & HASH_MASK
+        self._reset()
+
+    def _reset(self):
+        self._saved = None
+        self._saved_memory = None
+        self._power = 1
+        self._steps = 0
+
+    def run(self, machine, max_cycles=None):
+        """
+        Run `machine` in place like func:`lmcipy.interpret.run`.
+
+        Raises:
+            InfiniteLoopError: Raised when the machine provably never halts.
+            UnknownOpcodeError: Raised when opcode is not found in `machine.opcodes_to_funcs`.
+
+        Returns:
+            obj: Instance of class:`lmcipy.machine.RunResult`.
+        """
+        decode = machine.decode_table
+        memory = machine.memory
+        keys = self.keys
+        cycles = 0
+        halted = False
+        cls = unchecked(machine)
+
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                counter = machine.counter
+                opcode = memory[counter]
+
+                if 300 <= opcode < 400:
+                    address = opcode - 300
+                    self._hash = (self._hash + keys[address] * (machine.accumulator - memory[address])) & HASH_MASK
+
+                cycles += 1
+                machine.counter = counter + 1
+                decode[opcode](machine)
+
+                if opcode == 901:
+                    self._reset()
+                    continue
+
+                state = (machine.counter, machine.accumulator, machine.minus_flag, self._hash)
+
+                if state == self._saved and memory[:] == self._saved_memory[:]:
+                    raise InfiniteLoopError(self.cycles + cycles, machine.counter)
+
+                self._steps += 1
+                if self._steps == self._power:
+                    self._saved = state
+                    self._saved_memory = memory.fork()
+                    self._power *= 2
+                    self._steps = 0
+        except HaltSignal:
+            halted = True
+        except IndexError:
+            raise InvalidMachineOperationError(
+                "Cannot access memory cell number {}".format(machine.counter)
+            ) from None
+        finally:
+            machine.__class__ = cls
+            self.cycles += cycles
+            machine.outputs.flush()
+
+        return RunResult(machine=machine, cycles=cycles, halted=halted)
+
+
+def run_budgeted(machine, budget, run_chunk):
+    """
+    Run `machine` in place within `budget`.
+
+    The machine is run in chunks of at most `budget.check_interval` cycles by `run_chunk`,
+    limits are checked between chunks.
+
+    Args:
+        machine (obj): Instance of class:`lmcipy.machine.MachineState`.
+        budget (obj): Instance of class:`Budget`.
+        run_chunk (func): Function running `machine` in place, takes `max_cycles` and
+                          returns class:`lmcipy.machine.RunResult`. Not used when loops
+                          are detected.
+
+    Raises:
+        BudgetExceeded: Raised when the machine did not halt within `budget`.
+        InfiniteLoopError: Raised when the machine provably never halts.
+
+    Returns:
+        obj: Instance of class:`lmcipy.machine.RunResult`.
+    """
+    if budget.detect_loops:
+        detector = LoopDetector(machine)
+        run_chunk = lambda max_cycles: detector.run(machine, max_cycles=max_cycles)
+
+    outputs = machine.outputs
+    if budget.outputs is not None:
+        machine.outputs = LimitedOutput(outputs, budget.outputs)
+
+    deadline = None if budget.seconds is None else time.monotonic() + budget.seconds
+    cycles = 0
+
+    try:
+        while True:
+            chunk = budget.check_interval
+
+            if budget.cycles is not None:
+                if cycles >= budget.cycles:
+                    raise BudgetExceeded('cycles', budget.cycles)
+
+                chunk = min(chunk, budget.cycles - cycles)
+
+            result = run_chunk(max_cycles=chunk)
+            cycles += result.cycles
+
+            if result.halted:
+                return RunResult(machine=machine, cycles=cycles, halted=True)
+
+            if deadline is not None and time.monotonic() > deadline:
+                raise BudgetExceeded('seconds', budget.seconds)
+    finally:
+        machine.outputs = outputs
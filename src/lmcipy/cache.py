@@ -0,0 +1,348 @@
+#! /usr/bin/env python
+
+from collections import OrderedDict
+from hashlib import sha256
+import json
+import os
+import tempfile
+
+from .channels import IterableInput, ListOutput, make_output
+from .interpret import assemble, interpret_opcodes
+from .machine import MachineState, RunResult
+
+
+# Bump whenever assembler output or format of cache entries changes, entries created
+# by other versions are then ignored and replaced.
+CACHE_VERSION = 2
+
+
+def program_key(program):
+    """
+    Hash token stream of `program`.
+
+    Args:
+        program (list): List of lists of strings representing tokenized lines of program.
+
+    Returns:
+        str: Hex digest identifying `program` and `CACHE_VERSION`.
+    """
+    digest = sha256('lmcipy-assembly-{}\n'.format(CACHE_VERSION).encode())
+
+    for line in program:
+        digest.update('\x1f'.join(line).encode())
+        digest.update(b'\x1e')
+
+    return digest.hexdigest()
+
+
+def run_key(opcodes, inputs, max_cycles=None):
+    """
+    Hash loaded image and input values of a run.
+
+    Args:
+        opcodes (list): Opcodes loaded into memory.
+        inputs (tuple): Input values.
+        max_cycles (int or None): Limit of cycles of the run.
+
+    Returns:
+        str: Hex digest identifying the run and `CACHE_VERSION`.
+    """
+    digest = sha256('lmcipy-run-{}-{}\n'.format(CACHE_VERSION, max_cycles).encode())
+    digest.update(','.join(map(str, opcodes)).encode())
+    digest.update(b'\x1e')
+    digest.update(','.join(map(str, inputs)).encode())
+
+    return digest.hexdigest()
+
+
+def input_values(inputs):
+    """
+    Convert list of input values to integers, strings are split on whitespace as in
+    class:`lmcipy.channels.IterableInput`.
+
+    Args:
+        inputs (list): Integers and strings of whitespace separated integers.
+
+    Raises:
+        ValueError: Raised when a value is not an integer.
+
+    Returns:
+        list: Integers in order of reading.
+    """
+    values = []
+
+    for item in inputs:
+        if isinstance(item, str):
+            values.extend(int(token) for token in item.split())
+        else:
+            values.append(int(item))
+
+    return values
+
+
+class _Cache:
+    """
+    Entries (JSON-serializable dicts) kept in memory in LRU order and optionally also
+    stored on disk as JSON files under `directory`, so that they survive between processes.
+
+    Args:
+        maxsize (int): Maximum number of entries kept in memory.
+        directory (str or None): Directory of on-disk cache, disk is not used when ``None``.
+
+    Attributes:
+        hits (int): Number of lookups answered from memory or disk.
+        misses (int): Number of lookups that were not answered.
+    """
+
+    def __init__(self, maxsize=256, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _load(self, key):
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('version') != CACHE_VERSION:
+            return None
+
+        return entry
+
+    def _save(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write into temporary file first so that concurrent readers never see partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+
+        os.replace(tmp_path, path)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self.directory is not None:
+            entry = self._load(key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        return entry
+
+    def _store(self, key, entry):
+        entry['version'] = CACHE_VERSION
+        self._remember(key, entry)
+
+        if self.directory is not None:
+            self._save(key, entry)
+
+    def clear(self):
+        """
+        Drop all entries kept in memory. Entries on disk are kept.
+        """
+        self._entries.clear()
+
+
+class AssemblyCache(_Cache):
+    """
+    Content-addressed cache of assembled programs.
+
+    Opcodes and labels are kept in memory in LRU order and optionally also stored on disk
+    as JSON files under `directory`, so that they survive between processes.
+
+    Args:
+        maxsize (int): Maximum number of programs kept in memory.
+        directory (str or None): Directory of on-disk cache, disk is not used when ``None``.
+
+    Attributes:
+        hits (int): Number of lookups answered from memory or disk.
+        misses (int): Number of lookups that had to assemble the program.
+    """
+
+    def assemble(self, program):
+        """
+        Assemble `program`, reusing result of previous assembly of the same token stream.
+
+        Args:
+            program (iterable): Lists of strings representing tokenized lines of program.
+
+        Raises:
+            SyntaxError: Raised when trying to generate opcode for invalid line of program.
+
+        Returns:
+            list: List of opcodes converted from `program`.
+            dict: Labels of `program` (label: address).
+        """
+        # Hashed and assembled, so a generator of lines has to be read only once.
+        program = list(program)
+        key = program_key(program)
+        entry = self._lookup(key)
+
+        if entry is None:
+            self.misses += 1
+            opcodes, labels = assemble(program)
+            entry = {'opcodes': list(opcodes), 'labels': labels}
+            self._store(key, entry)
+        else:
+            self.hits += 1
+
+        return list(entry['opcodes']), dict(entry['labels'])
+
+    def get(self, key):
+        """
+        Return program assembled earlier under `key` (see func:`program_key`).
+
+        Args:
+            key (str): Hex digest of the program.
+
+        Returns:
+            tuple or None: Opcodes and labels, ``None`` when the program is not cached.
+        """
+        entry = self._lookup(key)
+
+        if entry is None:
+            return None
+
+        return list(entry['opcodes']), dict(entry['labels'])
+
+
+class ResultCache(_Cache):
+    """
+    Cache of results of runs. Execution is deterministic, so a run is identified by the
+    loaded image and the input values (see func:`run_key`). Outputs, cycle count and final
+    state of the machine are stored; runs that raise are not cached.
+
+    Entries are kept in memory in LRU order and optionally also stored on disk as JSON
+    files under `directory`.
+
+    Args:
+        maxsize (int): Maximum number of results kept in memory.
+        directory (str or None): Directory of on-disk cache, disk is not used when ``None``.
+
+    Attributes:
+        hits (int): Number of runs answered from memory or disk.
+        misses (int): Number of runs that had to be executed.
+    """
+
+    def __init__(self, maxsize=1024, directory=None):
+        super().__init__(maxsize=maxsize, directory=directory)
+
+    @staticmethod
+    def _within(entry, budget):
+        if budget is None:
+            return True
+
+        if budget.cycles is not None and entry['cycles'] > budget.cycles:
+            return False
+
+        return budget.outputs is None or len(entry['outputs']) <= budget.outputs
+
+    def run(self, opcodes, labels=None, inputs=(), outputs=None, engine='interpreter', max_cycles=None,
+            budget=None):
+        """
+        Run `opcodes` like func:`lmcipy.interpret.interpret_opcodes`, reusing result of
+        previous run of the same image with the same inputs.
+
+        Outputs are passed to `outputs` once the run finishes. Only runs with inputs given
+        as list or tuple are identified by their inputs; runs reading from console, from
+        an input channel or from another iterable, which may be lazy or endless, and runs
+        with inputs that are not integers are executed without the cache.
+
+        Args:
+            opcodes (list): Opcodes, e.g. from func:`lmcipy.interpret.assemble`.
+            labels (dict or None): Labels (label: address).
+            inputs (obj): Input values (see func:`lmcipy.channels.make_input`).
+            outputs (obj): Destination of OUT (see func:`lmcipy.channels.make_output`).
+            engine (str): Execution engine, see func:`lmcipy.interpret.run_engine`. Results
+                          do not depend on the engine, so it is not part of the key.
+            max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+            budget (obj): Instance of class:`lmcipy.budget.Budget`. Cached results are used only
+                          when they fit the budget.
+
+        Returns:
+            obj: Instance of class:`lmcipy.machine.RunResult`.
+        """
+        labels = {} if labels is None else labels
+
+        values = None
+        if isinstance(inputs, (list, tuple)):
+            try:
+                values = input_values(inputs)
+            except ValueError:
+                # Invalid value fails the run only when the program reads it.
+                pass
+
+        if values is None:
+            return interpret_opcodes(opcodes, labels, engine=engine, max_cycles=max_cycles, inputs=inputs,
+                                     outputs=outputs, budget=budget)
+
+        inputs = values
+
+        opcodes = list(opcodes)
+        key = run_key(opcodes, inputs, max_cycles)
+        entry = self._lookup(key)
+        outputs = make_output(outputs)
+
+        if entry is not None and self._within(entry, budget):
+            self.hits += 1
+        else:
+            self.misses += 1
+            values = []
+
+            try:
+                result = interpret_opcodes(opcodes, labels, engine=engine, max_cycles=max_cycles,
+                                           inputs=IterableInput(inputs), outputs=ListOutput(values),
+                                           budget=budget)
+            finally:
+                for value in values:
+                    outputs.write(value)
+                outputs.flush()
+
+            machine = result.machine
+            entry = {
+                'outputs': values,
+                'cycles': result.cycles,
+                'halted': result.halted,
+                'counter': machine.counter,
+                'accumulator': machine.accumulator,
+                'minus_flag': machine.minus_flag,
+                'memory': list(machine.memory[:]),
+                'consumed': machine.inputs.position,
+            }
+            self._store(key, entry)
+
+            return result
+
+        for value in entry['outputs']:
+            outputs.write(value)
+        outputs.flush()
+
+        machine_inputs = IterableInput(inputs)
+        machine_inputs.skip(entry['consumed'])
+        machine = MachineState(inputs=machine_inputs, outputs=outputs)
+        machine.counter = entry['counter']
+        machine.accumulator = entry['accumulator']
+        machine.minus_flag = entry['minus_flag']
+        machine.memory[:] = entry['memory']
+        machine.labels = dict(labels)
+
+        return RunResult(machine=machine, cycles=entry['cycles'], halted=entry['halted'])
@@ -0,0 +1,205 @@
+#! /usr/bin/env python
+
+
+class Channel:
+    """
+    Base of input sources and output sinks of the machine.
+
+    INP reads a value with ``machine.inputs.read()`` and OUT passes the accumulator to
+    ``machine.outputs.write(value)``. Sinks may buffer values, engines call ``flush()``
+    once the machine stops.
+
+    Channels are endpoints outside of the machine, so copying a machine (e.g. by
+    func:`lmcipy.util.copy_args`) shares its channels instead of copying them.
+    """
+    __slots__ = ()
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def flush(self):
+        pass
+
+
+class ConsoleInput(Channel):
+    """
+    Interactive input, prompts for every value.
+    """
+    __slots__ = ()
+
+    def read(self):
+        return int(input("Input: "))
+
+
+class IterableInput(Channel):
+    """
+    Input taken from an iterable - list, array, generator or file.
+
+    Integers are used as they are, strings (e.g. lines of file) are split on whitespace
+    and every token is converted to integer.
+
+    Args:
+        source (iterable): Input values.
+
+    Attributes:
+        position (int): Number of values read so far.
+    """
+
+    def __init__(self, source):
+        self._values = self._parse(source)
+        self.position = 0
+
+    @staticmethod
+    def _parse(source):
+        for item in source:
+            if isinstance(item, str):
+                yield from (int(token) for token in item.split())
+            else:
+                yield int(item)
+
+    def read(self):
+        try:
+            value = next(self._values)
+        except StopIteration:
+            raise EOFError("Input exhausted.") from None
+
+        self.position += 1
+
+        return value
+
+    def skip(self, count):
+        """
+        Read and discard `count` values, e.g. values consumed before a snapshot was taken.
+
+        Raises:
+            EOFError: Raised when there are fewer than `count` values left.
+        """
+        for _ in range(count):
+            self.read()
+
+
+class ConsoleOutput(Channel):
+    """
+    Interactive output, prints every value immediately.
+    """
+    __slots__ = ()
+
+    def write(self, value):
+        print("Output:", value)
+
+
+class ListOutput(Channel):
+    """
+    Output appended to a list.
+
+    Args:
+        values (list or None): List to append to, new list is created when omitted.
+    """
+
+    def __init__(self, values=None):
+        self.values = [] if values is None else values
+        self.write = self.values.append
+
+
+class StreamOutput(Channel):
+    """
+    Output written to a text stream in batches.
+
+    Args:
+        stream (obj): Writable text stream.
+        template (str): Format of single value.
+        buffer_size (int): Number of values collected before they are written.
+    """
+
+    def __init__(self, stream, template="{}\n", buffer_size=4096):
+        self.stream = stream
+        self.template = template
+        self.buffer_size = buffer_size
+        self._buffer = []
+
+    def write(self, value):
+        self._buffer.append(value)
+
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.stream.write(''.join(self.template.format(value) for value in self._buffer))
+            self._buffer = []
+
+        self.stream.flush()
+
+
+class CallbackOutput(Channel):
+    """
+    Output passed to a callback in batches.
+
+    Args:
+        callback (func): Function called with list of values.
+        buffer_size (int): Number of values collected before `callback` is called.
+    """
+
+    def __init__(self, callback, buffer_size=4096):
+        self.callback = callback
+        self.buffer_size = buffer_size
+        self._buffer = []
+
+    def write(self, value):
+        self._buffer.append(value)
+
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.callback(self._buffer)
+            self._buffer = []
+
+
+def make_input(source):
+    """
+    Convert `source` into input channel.
+
+    Args:
+        source (obj): ``None`` for console, channel or iterable of values (see class:`IterableInput`).
+
+    Returns:
+        obj: Input channel.
+    """
+    if source is None:
+        return ConsoleInput()
+
+    if isinstance(source, Channel):
+        return source
+
+    return IterableInput(source)
+
+
+def make_output(sink):
+    """
+    Convert `sink` into output channel.
+
+    Args:
+        sink (obj): ``None`` for console, channel, list, writable stream or callback
+                    receiving lists of values.
+
+    Returns:
+        obj: Output channel.
+    """
+    if sink is None:
+        return ConsoleOutput()
+
+    if isinstance(sink, Channel):
+        return sink
+
+    if isinstance(sink, list):
+        return ListOutput(sink)
+
+    if hasattr(sink, 'write'):
+        return StreamOutput(sink)
+
+    if callable(sink):
+        return CallbackOutput(sink)
+
+    raise TypeError("Cannot use {!r} as output.".format(sink))
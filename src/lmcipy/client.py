@@ -0,0 +1,105 @@
+#! /usr/bin/env python
+
+import json
+import os
+import socket
+import tempfile
+
+
+# The client depends only on the standard library, so it can be copied into other tools as it is.
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'lmcipy-{}.sock'.format(os.getuid()))
+
+
+class Client:
+    """
+    Connection to a running server, see class:`lmcipy.server.Server`.
+
+    Requests and responses are JSON objects, one per line.
+
+    Args:
+        path (str): Path of the server socket.
+        timeout (float or None): Timeout of socket operations in seconds.
+
+    Raises:
+        OSError: Raised when the server is not running.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET, timeout=None):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            self._socket.settimeout(timeout)
+            self._socket.connect(path)
+        except OSError:
+            self._socket.close()
+            raise
+
+        self._file = self._socket.makefile('rwb')
+
+    def request(self, request):
+        """
+        Send `request` and wait for the response.
+
+        Args:
+            request (dict): Request, see func:`lmcipy.server.Server.handle`.
+
+        Raises:
+            ConnectionError: Raised when the server closed the connection.
+
+        Returns:
+            dict: Response.
+        """
+        self._file.write(json.dumps(request).encode() + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+
+        if not line:
+            raise ConnectionError("Server closed the connection.")
+
+        return json.loads(line)
+
+    def run(self, source=None, program=None, inputs=(), **options):
+        """
+        Run program given by its `source` or by `program` - key returned for an earlier request.
+
+        Args:
+            source (str or None): Source of the program.
+            program (str or None): Key of program the server already assembled.
+            inputs (iterable): Input values.
+            options: ``engine``, ``max_cycles``, ``timeout``, ``max_outputs`` and ``detect_loops``.
+
+        Returns:
+            dict: Response with keys ``program``, ``outputs``, ``cycles``, ``halted``,
+                  ``error``, ``warm`` and ``elapsed``.
+        """
+        request = dict(options, inputs=list(inputs))
+
+        if source is not None:
+            request['source'] = source
+        if program is not None:
+            request['program'] = program
+
+        return self.request(request)
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def connect(path=DEFAULT_SOCKET, timeout=None):
+    """
+    Connect to server listening on `path`.
+
+    Returns:
+        obj: Instance of class:`Client` or ``None`` when no server is running.
+    """
+    try:
+        return Client(path, timeout=timeout)
+    except OSError:
+        return None
@@ -0,0 +1,391 @@
+#! /usr/bin/env python
+
+import sys
+
+from .machine import (
+    RunResult,
+    HaltSignal,
+    InvalidMachineOperationError,
+    UnknownOpcodeError,
+    opc_inp,
+    unchecked,
+)
+
+
+HALT = -1
+MAX_BLOCK_LENGTH = 100
+# Instructions are stepped until execution entered them this many times, so code that
+# runs only once (or is rewritten before it runs again) is never compiled.
+COMPILE_THRESHOLD = 3
+# Blocks rewritten into more distinct versions than this are stepped instead of compiled.
+MAX_BLOCK_VERSIONS = 16
+NO_LIMIT = sys.maxsize
+
+
+def find_leaders(cells):
+    """
+    Find addresses that start a basic block: the entry point, targets of branches
+    (``6XX``, ``7XX``, ``8XX``) and instructions following a branch or halt.
+
+    Args:
+        cells (list): Memory cells holding the program.
+
+    Returns:
+        set: Addresses of block leaders.
+    """
+    leaders = {0}
+
+    for address, opcode in enumerate(cells):
+        kind, operand = divmod(opcode, 100)
+
+        if kind in (6, 7, 8):
+            leaders.add(operand)
+
+        if kind in (0, 6, 7, 8):
+            leaders.add(address + 1)
+
+    return leaders
+
+
+def generate_block_source(cells, start, leaders):
+    """
+    Generate source of a function that executes the block starting at `start`.
+
+    A block is a basic block extended over not taken conditional branches, it ends before
+    the next leader, after an unconditional branch or halt. A block branching back to its
+    own start is compiled into a loop that keeps running while at least another pass fits
+    into the cycle limit.
+
+    The generated function takes the accumulator, minus flag and the limit of executed
+    cycles and keeps the accumulator and minus flag in local variables in between. It
+    returns a tuple ``(next_counter, accumulator, minus_flag, executed_cycles, event)``
+    where `event` is ``None``, `HALT` or the address of a memory cell that was stored into
+    while being part of compiled code.
+
+    Args:
+        cells (list): Memory cells holding the program.
+        start (int): Address of the first instruction of the block.
+        leaders (set): Addresses that start a new block.
+
+    Returns:
+        str: Python source of function ``block``.
+        int: Number of instructions in the block.
+    """
+    body = []
+    emit = lambda *code: body.extend(code)
+    # When True, the minus flag is known to be False at this point of the block.
+    non_negative = False
+    loops = False
+    address = start
+
+    def leave(counter, executed, event='None'):
+        return 'return {}, acc, neg, base + {}, {}'.format(counter, executed, event)
+
+    def loop_back(executed):
+        # Another pass may take up to `length` cycles, set once the whole block is known.
+        return ['base += {}'.format(executed),
+                'if base + length > limit:',
+                '    return {}, acc, neg, base, None'.format(start)]
+
+    while True:
+        opcode = cells[address]
+        kind, operand = divmod(opcode, 100)
+        executed = address - start + 1
+        counter = address + 1
+        emit('# {}: {:03d}'.format(address, opcode))
+
+        if kind == 0:
+            emit(leave(counter, executed, 'HALT'))
+            break
+
+        elif kind == 1 and non_negative:
+            emit('r = acc + cells[{}]'.format(operand),
+                 'if r > 999:', '    _overflow({}, acc, False, r)'.format(counter),
+                 'acc = r')
+
+        elif kind in (1, 2):
+            emit('r = {}{} cells[{}]'.format(
+                'acc' if non_negative else '(-acc if neg else acc)',
+                ' +' if kind == 1 else ' -',
+                operand
+            ))
+            # Overflow leaves the accumulator unchanged, like the interpreter.
+            emit('if r > 999 or r < -999:', '    _overflow({}, acc, r < 0, r)'.format(counter))
+            emit('if r < 0:', '    neg = True', '    acc = -r',
+                 'else:', '    neg = False', '    acc = r')
+            non_negative = False
+
+        elif kind == 3:
+            emit('cells[{}] = acc'.format(operand),
+                 'if code[{}]:'.format(operand),
+                 '    ' + leave(counter, executed, operand))
+
+        elif kind == 5:
+            emit('acc = cells[{}]'.format(operand), 'neg = False')
+            non_negative = True
+
+        elif kind == 6:
+            if operand == start:
+                loops = True
+                emit(*loop_back(executed))
+            else:
+                emit(leave(operand, executed))
+            break
+
+        elif kind in (7, 8):
+            taken = 'acc == 0' if kind == 7 else 'not neg'
+
+            if operand == start:
+                loops = True
+                emit('if {}:'.format(taken), *('    ' + line for line in loop_back(executed) + ['continue']))
+            else:
+                emit('if {}:'.format(taken), '    ' + leave(operand, executed))
+
+        elif opcode == 901:
+            emit('machine.counter = {}'.format(counter),
+                 'machine.accumulator = acc',
+                 'machine.minus_flag = neg',
+                 'opc_inp(machine)',
+                 'acc = machine.accumulator')
+
+        elif opcode == 902:
+            emit('machine.counter = {}'.format(counter),
+                 'machine.accumulator = acc',
+                 'machine.minus_flag = neg',
+                 'machine.outputs.write(acc)')
+
+        else:
+            emit('_unknown({}, {}, acc, neg)'.format(counter, opcode))
+            break
+
+        address += 1
+
+        if address >= len(cells) or executed >= MAX_BLOCK_LENGTH:
+            emit(leave(address, executed))
+            break
+
+        # Fall through of a not taken branch stays in the block even when it is a leader.
+        if address in leaders and kind not in (7, 8):
+            emit(leave(address, executed))
+            break
+
+    lines = ['def block(acc, neg, limit):', '    base = 0']
+
+    if loops:
+        lines.extend(['    length = {}'.format(executed), '    while True:'])
+        lines.extend('        ' + line for line in body)
+    else:
+        lines.extend('    ' + line for line in body)
+
+    return '\n'.join(lines) + '\n', executed
+
+
+class CompiledProgram:
+    """
+    Program in memory of a machine compiled into native Python functions, one per block.
+
+    Blocks are compiled lazily once execution entered them often enough. Storing into a memory cell
+    that is part of a compiled block invalidates every block containing that cell, so
+    self-modifying programs are recompiled as they rewrite themselves. Compiled blocks are
+    kept by their start and content, so a block rewritten back into an earlier version
+    reuses its function. Instructions entered fewer than `COMPILE_THRESHOLD` times and
+    blocks rewritten into more than `MAX_BLOCK_VERSIONS` versions are stepped instead.
+
+    Args:
+        machine (obj): Instance of class:`MachineState` with loaded program. The machine
+                       is run in place.
+    """
+
+    def __init__(self, machine):
+        self.machine = machine
+        self._cells = machine.memory.cells()
+        self._leaders = find_leaders(self._cells)
+        self._blocks = {}
+        self._versions = {}
+        self._entries = [0] * len(self._cells)
+        self._covering = [set() for _ in self._cells]
+        self._code = bytearray(len(self._cells))
+        self._namespace = {
+            'cells': self._cells,
+            'code': self._code,
+            'machine': machine,
+            'opc_inp': opc_inp,
+            'HALT': HALT,
+            '_overflow': self._overflow,
+            '_unknown': self._unknown,
+        }
+
+    def _leave(self, counter, acc, neg):
+        self.machine.counter, self.machine.accumulator, self.machine.minus_flag = counter, acc, neg
+
+    def _overflow(self, counter, acc, neg, value):
+        # Same state as left by the interpreter - flag of the result, accumulator before it.
+        self._leave(counter, acc, neg)
+        raise InvalidMachineOperationError("Value {} not in range 0 - 999.".format(abs(value)))
+
+    def _unknown(self, counter, opcode, acc, neg):
+        self._leave(counter, acc, neg)
+        raise UnknownOpcodeError(opcode)
+
+    def compile_block(self, start):
+        """
+        Compile block starting at `start` or reuse its version compiled earlier.
+
+        Args:
+            start (int): Address of the first instruction of the block.
+
+        Returns:
+            func: Compiled block, see func:`generate_block_source`, or ``None`` when
+                  the instruction at `start` has to be stepped.
+            int: Number of instructions in the block.
+        """
+        if start >= len(self._cells):
+            raise InvalidMachineOperationError("Cannot access memory cell number {}".format(start))
+
+        cells = self._cells
+        # Versions of the block by their length and content.
+        versions = self._versions.setdefault(start, {})
+
+        for length, contents in versions.items():
+            block = contents.get(tuple(cells[start:start + length]))
+
+            if block is not None:
+                break
+        else:
+            self._entries[start] += 1
+
+            if self._entries[start] < COMPILE_THRESHOLD:
+                return None, 1
+
+            if sum(map(len, versions.values())) >= MAX_BLOCK_VERSIONS:
+                return None, 1
+
+            source, length = generate_block_source(cells, start, self._leaders)
+            namespace = dict(self._namespace)
+            exec(compile(source, '<lmc block {}>'.format(start), 'exec'), namespace)
+            block = namespace['block']
+            versions.setdefault(length, {})[tuple(cells[start:start + length])] = block
+
+        covering, code = self._covering, self._code
+
+        for address in range(start, start + length):
+            covering[address].add(start)
+            code[address] = 1
+
+        self._blocks[start] = block, length
+
+        return self._blocks[start]
+
+    def invalidate(self, address):
+        """
+        Drop all compiled blocks that contain `address`.
+
+        Args:
+            address (int): Address of modified memory cell.
+        """
+        covering, code = self._covering, self._code
+
+        for start in covering[address]:
+            _, length = self._blocks.pop(start)
+
+            for covered in range(start, start + length):
+                if covered != address:
+                    covering[covered].discard(start)
+                    code[covered] = 1 if covering[covered] else 0
+
+        self._covering[address] = set()
+        self._code[address] = 0
+        self._entries[address] = 0
+
+    def step(self):
+        """
+        Execute single instruction without compiling it.
+
+        Raises:
+            HaltSignal: Raised when the instruction halts the machine.
+        """
+        machine = self.machine
+        opcode = self._cells[machine.counter]
+        func = machine.decode_table[opcode]
+        machine.counter += 1
+        func(machine)
+
+        if opcode // 100 == 3:
+            # Rewritten instructions start cold again.
+            self._entries[opcode % 100] = 0
+
+            if self._code[opcode % 100]:
+                self.invalidate(opcode % 100)
+
+    def run(self, max_cycles=None):
+        """
+        Run the machine until halt.
+
+        Args:
+            max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+
+        Raises:
+            UnknownOpcodeError: Raised when an unknown opcode is executed.
+
+        Returns:
+            obj: Instance of class:`RunResult`.
+        """
+        cls = unchecked(self.machine)
+
+        try:
+            return self._run(max_cycles)
+        finally:
+            self.machine.__class__ = cls
+            self.machine.outputs.flush()
+
+    def _run(self, max_cycles):
+        machine = self.machine
+        blocks = self._blocks
+        counter, acc, neg = machine.counter, machine.accumulator, machine.minus_flag
+        limit = NO_LIMIT if max_cycles is None else max_cycles
+        cycles = 0
+
+        while cycles < limit:
+            block, length = blocks.get(counter) or self.compile_block(counter)
+
+            if block is None or cycles + length > limit:
+                machine.counter, machine.accumulator, machine.minus_flag = counter, acc, neg
+                steps = 1 if block is None else limit - cycles
+
+                try:
+                    for _ in range(steps):
+                        cycles += 1
+                        self.step()
+                except HaltSignal:
+                    return RunResult(machine=machine, cycles=cycles, halted=True)
+
+                counter, acc, neg = machine.counter, machine.accumulator, machine.minus_flag
+                continue
+
+            counter, acc, neg, executed, event = block(acc, neg, limit - cycles)
+            cycles += executed
+
+            if event is not None:
+                if event == HALT:
+                    machine.counter, machine.accumulator, machine.minus_flag = counter, acc, neg
+                    return RunResult(machine=machine, cycles=cycles, halted=True)
+
+                self.invalidate(event)
+
+        machine.counter, machine.accumulator, machine.minus_flag = counter, acc, neg
+
+        return RunResult(machine=machine, cycles=cycles, halted=False)
+
+
+def run_compiled(machine, max_cycles=None):
+    """
+    Compile program loaded in `machine` and run it in place.
+
+    Args:
+        machine (obj): Instance of class:`MachineState` with loaded program.
+        max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+
+    Returns:
+        obj: Instance of class:`RunResult`.
+    """
+    return CompiledProgram(machine).run(max_cycles=max_cycles)
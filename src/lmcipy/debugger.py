@@ -0,0 +1,413 @@
+#! /usr/bin/env python
+
+from array import array
+import cmd
+
+from .channels import Channel
+from .machine import CLASSIC, HaltSignal, InvalidMachineOperationError, UnknownOpcodeError, unchecked
+from .profiler import locate, opcode_class
+
+
+# Undo entry of one cycle packed into 64 bits: previous counter (7 bits), accumulator
+# (10 bits), minus flag (1 bit), address of stored cell (7 bits) and its old value (10 bits).
+NO_STORE = 127
+
+
+def resolve(target, labels):
+    """
+    Convert `target` - address or label - into address.
+
+    Args:
+        target (int or str): Address, digits of address or label.
+        labels (dict): Labels (label: address).
+
+    Raises:
+        ValueError: Raised for unknown label or address out of memory.
+
+    Returns:
+        int: Address.
+    """
+    if isinstance(target, str):
+        if target.isdigit():
+            target = int(target)
+        elif target in labels:
+            target = labels[target]
+        else:
+            raise ValueError("Unknown label {}.".format(target))
+
+    if not 0 <= target <= 99:
+        raise ValueError("Address {} not in range 0 - 99.".format(target))
+
+    return target
+
+
+class _ReplayInput(Channel):
+    """
+    Input remembering read values, so that re-executing INP after stepping back reads
+    the same value again.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.values = []
+        self.position = 0
+
+    def read(self):
+        if self.position == len(self.values):
+            self.values.append(self.channel.read())
+
+        self.position += 1
+
+        return self.values[self.position - 1]
+
+
+class _ReplayOutput(Channel):
+    """
+    Output passing every value to `channel` only once, re-executing OUT after stepping
+    back does not repeat it.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.written = 0
+        self.emitted = 0
+
+    def write(self, value):
+        if self.written == self.emitted:
+            self.channel.write(value)
+            self.emitted += 1
+
+        self.written += 1
+
+    def flush(self):
+        self.channel.flush()
+
+
+class Debugger:
+    """
+    Debugger stepping a machine forwards and backwards.
+
+    Every executed cycle appends a single 64-bit undo entry to `history` - counter,
+    accumulator and minus flag before the cycle and the old value of the cell stored by
+    STA - so stepping back restores the previous state exactly without copies of the
+    machine. Input values are remembered and replayed when an INP is executed again,
+    values already passed to the output channel are not written twice.
+
+    Args:
+        machine (obj): Instance of class:`lmcipy.machine.MachineState` with loaded program.
+                       The machine is run in place, its channels are wrapped.
+
+    Raises:
+        ValueError: Raised for machine of extended profile, undo entries fit only classic words.
+
+    Attributes:
+        breakpoints (set): Addresses at which func:`resume` and func:`reverse` stop.
+        halted (bool): Whether the last executed cycle halted the machine.
+        history (array): Undo entries, one per executed cycle.
+    """
+
+    def __init__(self, machine):
+        if machine.profile is not CLASSIC:
+            raise ValueError("Debugger supports only the classic machine profile.")
+
+        machine.inputs = _ReplayInput(machine.inputs)
+        machine.outputs = _ReplayOutput(machine.outputs)
+        self.machine = machine
+        self.breakpoints = set()
+        self.halted = False
+        self.history = array('Q')
+
+    @property
+    def cycles(self):
+        """
+        Number of cycles executed since the start.
+        """
+        return len(self.history)
+
+    @property
+    def history_bytes(self):
+        """
+        Size of the undo log in bytes.
+        """
+        return len(self.history) * self.history.itemsize
+
+    def add_breakpoint(self, target):
+        """
+        Stop at address or label `target`, see func:`resolve`.
+        """
+        self.breakpoints.add(resolve(target, self.machine.labels))
+
+    def remove_breakpoint(self, target):
+        """
+        Remove breakpoint at address or label `target`.
+        """
+        self.breakpoints.discard(resolve(target, self.machine.labels))
+
+    def _forward(self):
+        machine = self.machine
+        counter = machine.counter
+
+        if counter >= len(machine.memory):
+            raise InvalidMachineOperationError("Cannot access memory cell number {}".format(counter))
+
+        opcode = machine.memory[counter]
+
+        if 300 <= opcode < 400:
+            address = opcode - 300
+            old_value = machine.memory[address]
+        else:
+            address, old_value = NO_STORE, 0
+
+        self.history.append(
+            counter | machine.accumulator << 7 | machine.minus_flag << 17 | address << 18 | old_value << 25
+        )
+        position, written = machine.inputs.position, machine.outputs.written
+
+        try:
+            machine.counter = counter + 1
+            machine.decode_table[opcode](machine)
+        except HaltSignal:
+            self.halted = True
+        except BaseException:
+            # Leave the machine as it was before the failed cycle.
+            self._backward()
+            machine.inputs.position, machine.outputs.written = position, written
+            raise
+
+    def _backward(self):
+        machine = self.machine
+        entry = self.history.pop()
+        address = entry >> 18 & 127
+
+        if address != NO_STORE:
+            machine.memory.store(address, entry >> 25)
+
+        machine.counter = entry & 127
+        machine.accumulator = entry >> 7 & 1023
+        machine.minus_flag = bool(entry >> 17 & 1)
+        self.halted = False
+
+        opcode = machine.memory[machine.counter]
+        if opcode == 901:
+            machine.inputs.position -= 1
+        elif opcode == 902:
+            machine.outputs.written -= 1
+
+    def step(self, count=1):
+        """
+        Execute `count` cycles or less when the machine halts.
+
+        Raises:
+            InvalidMachineOperationError: Raised for invalid operation, the machine is left
+                                          before the failed cycle.
+            UnknownOpcodeError: Raised when an unknown opcode is executed.
+
+        Returns:
+            int: Number of executed cycles.
+        """
+        executed = 0
+        cls = unchecked(self.machine)
+
+        try:
+            while executed < count and not self.halted:
+                self._forward()
+                executed += 1
+        finally:
+            self.machine.__class__ = cls
+            self.machine.outputs.flush()
+
+        return executed
+
+    def step_back(self, count=1):
+        """
+        Undo `count` cycles or less when the start of the run is reached.
+
+        Returns:
+            int: Number of undone cycles.
+        """
+        undone = 0
+
+        while undone < count and self.history:
+            self._backward()
+            undone += 1
+
+        return undone
+
+    def resume(self, max_cycles=None, stop=()):
+        """
+        Execute cycles until the counter reaches a breakpoint or an address in `stop`,
+        the machine halts or `max_cycles` cycles are executed. At least one cycle is
+        executed, so resuming from a breakpoint moves past it.
+
+        Returns:
+            int: Number of executed cycles.
+        """
+        machine = self.machine
+        breakpoints = self.breakpoints.union(stop)
+        executed = 0
+        cls = unchecked(machine)
+
+        try:
+            while not self.halted and (max_cycles is None or executed < max_cycles):
+                self._forward()
+                executed += 1
+
+                if machine.counter in breakpoints:
+                    break
+        finally:
+            machine.__class__ = cls
+            machine.outputs.flush()
+
+        return executed
+
+    def reverse(self, stop=()):
+        """
+        Undo cycles until the counter is at a breakpoint or an address in `stop`, or the
+        start of the run is reached. At least one cycle is undone.
+
+        Returns:
+            int: Number of undone cycles.
+        """
+        machine = self.machine
+        breakpoints = self.breakpoints.union(stop)
+        undone = 0
+
+        while self.history:
+            self._backward()
+            undone += 1
+
+            if machine.counter in breakpoints:
+                break
+
+        return undone
+
+    def run_to(self, target, max_cycles=None):
+        """
+        Execute cycles until the counter reaches address or label `target`, see func:`resume`.
+        """
+        return self.resume(max_cycles=max_cycles, stop=(resolve(target, self.machine.labels),))
+
+    def reverse_to(self, target):
+        """
+        Undo cycles until the counter is at address or label `target`, see func:`reverse`.
+        """
+        return self.reverse(stop=(resolve(target, self.machine.labels),))
+
+    def location(self):
+        """
+        Describe current instruction and registers as single line.
+
+        Returns:
+            str: Line.
+        """
+        machine = self.machine
+        labels = machine.labels
+        opcode = machine.memory[machine.counter] if machine.counter < len(machine.memory) else None
+        mnemonic = '---' if opcode is None else opcode_class(opcode)
+
+        if mnemonic in ('HLT', 'INP', 'OUT', '---'):
+            instruction = mnemonic
+        elif mnemonic == '???':
+            instruction = '??? {}'.format(opcode)
+        else:
+            instruction = '{} {}'.format(mnemonic, locate(opcode % 100, labels))
+
+        return '{:>10}  {:>3} {:<12} {:<18} ACC={}{:03}{}'.format(
+            self.cycles, machine.counter, locate(machine.counter, labels), instruction,
+            '-' if machine.minus_flag else ' ', machine.accumulator, '  halted' if self.halted else ''
+        )
+
+
+class DebuggerShell(cmd.Cmd):
+    """
+    Interactive command line of class:`Debugger`. An empty line repeats the last command.
+
+    Args:
+        debugger (obj): Instance of class:`Debugger`.
+    """
+    intro = 'LMC debugger, type help or ? to list commands.'
+    prompt = '(lmc) '
+
+    def __init__(self, debugger, stdin=None, stdout=None):
+        super().__init__(stdin=stdin, stdout=stdout)
+        self.debugger = debugger
+
+        if stdin is not None:
+            self.use_rawinput = False
+
+    def _print(self, line):
+        self.stdout.write(line + '\n')
+
+    @staticmethod
+    def _count(arg):
+        return int(arg) if arg.strip() else 1
+
+    def onecmd(self, line):
+        try:
+            return super().onecmd(line)
+        except (ValueError, EOFError, InvalidMachineOperationError, UnknownOpcodeError) as e:
+            self._print('*** {}'.format(e))
+
+    def postcmd(self, stop, line):
+        if not stop and line.split()[:1] != ['help']:
+            self._print(self.debugger.location())
+
+        return stop
+
+    def cmdloop(self, intro=None):
+        return super().cmdloop('{}\n{}'.format(self.intro, self.debugger.location()) if intro is None else intro)
+
+    def do_step(self, arg):
+        """step [N]: execute N cycles (default 1)."""
+        self.debugger.step(self._count(arg))
+
+    def do_back(self, arg):
+        """back [N]: undo N cycles (default 1)."""
+        self.debugger.step_back(self._count(arg))
+
+    def do_continue(self, arg):
+        """continue: run until a breakpoint or halt."""
+        self.debugger.resume()
+
+    def do_reverse(self, arg):
+        """reverse: run backwards until a breakpoint or the start."""
+        self.debugger.reverse()
+
+    def do_until(self, arg):
+        """until TARGET: run until address or label TARGET is reached."""
+        self.debugger.run_to(arg.strip())
+
+    def do_break(self, arg):
+        """break [TARGET]: set breakpoint at address or label TARGET, list breakpoints without it."""
+        if arg.strip():
+            self.debugger.add_breakpoint(arg.strip())
+        else:
+            self._print(' '.join(map(str, sorted(self.debugger.breakpoints))))
+
+    def do_delete(self, arg):
+        """delete TARGET: remove breakpoint at address or label TARGET."""
+        self.debugger.remove_breakpoint(arg.strip())
+
+    def do_memory(self, arg):
+        """memory [ADDRESS [COUNT]]: print COUNT memory cells (default 10) starting at ADDRESS or label."""
+        args = arg.split()
+        start = resolve(args[0], self.debugger.machine.labels) if args else 0
+        count = int(args[1]) if len(args) > 1 else 10
+
+        for address in range(start, min(start + count, 100)):
+            self._print('{:>3} {:<12} {:03}'.format(
+                address, locate(address, self.debugger.machine.labels), self.debugger.machine.memory[address]
+            ))
+
+    def do_quit(self, arg):
+        """quit: stop debugging."""
+        return True
+
+    do_s = do_step
+    do_b = do_back
+    do_c = do_continue
+    do_rc = do_reverse
+    do_u = do_until
+    do_x = do_memory
+    do_q = do_quit
+    do_EOF = do_quit
@@ -0,0 +1,4 @@
+#! /usr/bin/env python
+
+# Kept apart from lmcipy.interpret, so that listing engines does not import them.
+ENGINES = ('interpreter', 'compiled', 'fused', 'accelerated')
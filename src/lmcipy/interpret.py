@@ -1,39 +1,25 @@
 #! /usr/bin/env python
 
-from functools import partial
-
-from .util import copy_args, tokenize
-from .machine import MachineState, HaltSignal
-
-
-class SyntaxError(Exception):
-    """
-    Error in LMC program syntax.
-
-    Args:
-        line_num (int): Number of line with error.
-        msg (str): Error.
-    """
-
-    def __init__(self, line_num, msg):
-        self.line_num = line_num
-        self.msg = msg
-
-        super().__init__("SyntaxError on line {}: {}".format(line_num + 1, msg))
-
-
-class UnknownOpcodeError(Exception):
-    """
-    Opcode unknown.
-
-    Args:
-        opcode (int): Opcode.
-    """
-
-    def __init__(self, opcode):
-        self.opcode = opcode
-
-        super().__init__("Opcode {} is not specified".format(self.opcode))
+from copy import deepcopy
+
+from .util import copy_args
+from .analysis import predecode
+from .assembler import SyntaxError, assemble_tokens, encode_instruction, is_number
+from .budget import run_budgeted
+from .channels import make_input, make_output
+from .compiler import CompiledProgram, run_compiled
+from .engines import ENGINES
+from .optimize import FusedProgram, run_fused
+from .machine import (
+    CLASSIC,
+    MachineState,
+    RunResult,
+    HaltSignal,
+    InvalidMachineOperationError,
+    UnknownOpcodeError,
+    opc_unknown,
+    unchecked,
+)
 
 
 @copy_args('machine')
@@ -63,7 +49,6 @@ def process_labels(machine, program):
     return machine, [process(line, line_num) for line_num, line in enumerate(program)]
 
 
-@copy_args('machine')
 def generate_opcodes(machine, program):
     """
     Translate syntactical mnemonics into opcodes.
@@ -78,43 +63,26 @@ def generate_opcodes(machine, program):
     Returns:
         list: List of opcodes converted from `program`.
     """
-    def check_arg(check_func, arg):
-        """
-        Check that `arg` satisfies checking func of opcode.
-
-        Args:
-            check_func (func): Checking fuc of opcode, makes sure that no invalid argument
-                               is supplied.
-            arg (str or int or None): Argument to be checked against check_func.
-
-        Raises:
-            TypeError: Raised when check_func is supplied with wrong number of arguments.
-
-        Returns:
-            True or False
-        """
-        if check_func is None:
-            return True if arg is None else False
-
-        if arg is None:
-            return check_func()
-
-        return check_func(arg)
-
-    def resolve_arg(arg):
+    def resolve_arg(arg, line_num):
         """
         Converte numerical arguments to ``int`` and replaces labels with their address.
 
         Args:
             arg (str): Mnemonics argument.
+            line_num (int): Line number.
+
+        Raises:
+            SyntaxError: Raised when `arg` is neither number nor known label.
 
         Returns:
-            None or int or str: Argument ready for use in generating opcode.
+            None or int: Argument ready for use in generating opcode.
         """
         if arg is None:
             return None
-        elif arg.isnumeric():
+        elif is_number(arg):
             return int(arg)
+        elif arg not in machine.labels:
+            raise SyntaxError(line_num, 'Unknown label. Label: {}'.format(arg))
 
         return machine.labels[arg]
 
@@ -136,16 +104,8 @@ def generate_opcodes(machine, program):
             raise SyntaxError(line_num, 'Too many tokens. Tokens: {}'.format(line))
 
         mnem, arg = line[0], line[1] if len(line) == 2 else None
-        func, arg_check = machine.mnemonics_to_opcodes[mnem]
-        resolved_arg = resolve_arg(arg)
 
-        try:
-            if not check_arg(arg_check, resolved_arg):
-                raise SyntaxError(line_num, 'Invalid argument. Argument: {}'.format(resolved_arg))
-        except TypeError:
-            raise SyntaxError(line_num, 'Wrong ammount of arguments.')
-
-        return func(*([resolved_arg] if resolved_arg is not None else []))
+        return encode_instruction(machine.mnemonics_to_opcodes, mnem, resolve_arg(arg, line_num), line_num)
 
 
     return [generate(line, line_num) if line else 0 for line_num, line in enumerate(program)]
@@ -153,11 +113,11 @@ def generate_opcodes(machine, program):
 
 def opcode_func_deconstruct(machine, opcode):
     """
-    Find and return funcion that belongs to opcode and partialy apply its argument.
+    Find and return funcion that belongs to opcode with its argument already applied.
 
     Args:
         machine (obj): Instance of class:`MachineState`.
-        opcode (int): Opcode.
+        opcode (int or str): Opcode.
 
     Raises:
         UnknownOpcodeError: Raised when opcode is not found in `machine.opcodes_to_funcs`.
@@ -165,24 +125,30 @@ def opcode_func_deconstruct(machine, opcode):
     Returns:
         func: Function that represents opcode behaviour with curried argument.
     """
-    if len(opcode) < 3:
-        return machine.opcodes_to_funcs['0']
+    func = machine.decode_table[int(opcode)]
 
-    if opcode[0] in ('9', '0'):
-        return machine.opcodes_to_funcs[opcode]
+    if getattr(func, 'func', None) is opc_unknown:
+        raise UnknownOpcodeError(int(opcode))
 
-    def get_func():
-        res = [func for p_opcode, func in machine.opcodes_to_funcs.items()
-               if opcode[0] == p_opcode[0]]
-        if not res or len(res) > 1:
-            raise Exception("Invalid opcode {}".format(opcode))
+    return func
 
-        return res[0]
 
-    func = get_func()
-    arg = int(opcode[1:3])
+def execute(machine, opcode):
+    """
+    Perform action defined for `opcode` directly on `machine`.
+
+    Args:
+        machine (obj): Instance of class:`MachineState`.
+        opcode (int): Opcode.
+
+    Raises:
+        HaltSignal: Raised when `opcode` halts the machine.
+        UnknownOpcodeError: Raised when opcode is not found in `machine.opcodes_to_funcs`.
+    """
+    func = machine.decode_table[opcode]
+    machine.counter += 1
 
-    return partial(func, value=arg)
+    func(machine)
 
 
 @copy_args('machine')
@@ -200,11 +166,8 @@ def eval_opcode(machine, opcode):
     Returns:
         obj: Instance of class :`MachineState` opcode action was performed on.
     """
-    func = opcode_func_deconstruct(machine, str(opcode))
-    machine.counter += 1
-
     try:
-        func(machine=machine)
+        execute(machine, opcode)
     except HaltSignal:
         return None
 
@@ -228,45 +191,286 @@ def load_opcodes(machine, opcodes):
     return machine
 
 
-def run(machine, debug=False):
+def run(machine, debug=False, max_cycles=None, profile=None, trace=None, copy=True):
     """
-    Recursive function that runs opcodes from `machine.memory` until halt.
+    Run opcodes from `machine.memory` until halt.
+
+    The machine is stepped in a loop, so the number of executed cycles is limited only
+    by `max_cycles`, not by the depth of the Python stack. A copy of `machine` is run
+    unless ``copy=False`` is passed, in which case `machine` itself is stepped in place.
 
     Args:
         machine (obj): Instance of class:`MachineState`.
         debug (bool): Whether to print debug information for each cycle.
+        max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+        profile (obj): Instance of class:`lmcipy.profiler.Profile` to record execution into,
+                       see func:`lmcipy.profiler.run_profiled`.
+        trace (obj): Instance of class:`lmcipy.tracing.TraceRecorder` to record executed
+                     instructions with, see func:`lmcipy.tracing.run_traced`.
+        copy (bool): Whether to run a deep copy of `machine` instead of `machine` itself.
 
     Raises:
         UnknownOpcodeError: Raised when opcode is not found in `machine.opcodes_to_funcs`.
+        ValueError: Raised when `trace` is combined with `debug` or `profile`.
+
+    Returns:
+        obj: Instance of class:`RunResult`.
     """
-    if machine is None:
-        return
+    # Copied here rather than by func:`copy_args`, which accepts the machine only as keyword.
+    if copy:
+        machine = deepcopy(machine)
+
+    if trace is not None:
+        if debug or profile is not None:
+            raise ValueError("Tracing cannot be combined with debug output or profiling.")
 
-    if debug:
-        print(machine)
+        # Tracing and profiling are imported only when used, they are not needed to start plain runs.
+        from .tracing import run_traced
 
-    run(
-        machine=eval_opcode(machine=machine,
-                            opcode=machine.memory[machine.counter]),
-        debug=debug
-    )
+        return run_traced(machine, trace, max_cycles=max_cycles)
 
+    if profile is not None:
+        from .profiler import run_profiled
 
-@copy_args('program')
-def interpret(program, debug=False):
+        return run_profiled(machine, profile, debug=debug, max_cycles=max_cycles)
+
+    # Programs that provably never store into their code run from predecoded instructions.
+    return run_predecoded(machine, None if debug else predecode(machine), debug=debug, max_cycles=max_cycles)
+
+
+def run_predecoded(machine, stream, debug=False, max_cycles=None):
+    """
+    Run `machine` in place like func:`run`, from instructions already predecoded by
+    func:`lmcipy.analysis.predecode`. Runs resumed many times, e.g. by
+    func:`lmcipy.budget.run_budgeted`, analyze the program only once.
+
+    Args:
+        machine (obj): Instance of class:`MachineState`.
+        stream (list or None): Predecoded instructions of `machine`, ``None`` to decode
+                               every instruction from memory.
+        debug (bool): Whether to print debug information for each cycle.
+        max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+
+    Raises:
+        UnknownOpcodeError: Raised when opcode is not found in `machine.opcodes_to_funcs`.
+
+    Returns:
+        obj: Instance of class:`RunResult`.
+    """
+    decode = machine.decode_table
+    memory = machine.memory
+    cycles = 0
+    cls = unchecked(machine)
+
+    try:
+        if stream is not None:
+            while max_cycles is None or cycles < max_cycles:
+                cycles += 1
+                func = stream[machine.counter]
+                machine.counter += 1
+                func(machine)
+
+        while max_cycles is None or cycles < max_cycles:
+            if debug:
+                print(machine)
+
+            cycles += 1
+            func = decode[memory[machine.counter]]
+            machine.counter += 1
+            func(machine)
+    except HaltSignal:
+        return RunResult(machine=machine, cycles=cycles, halted=True)
+    except IndexError:
+        # Only fetch can index memory out of range - counter ran past the last cell.
+        raise InvalidMachineOperationError(
+            "Cannot access memory cell number {}".format(machine.counter)
+        ) from None
+    finally:
+        machine.__class__ = cls
+        machine.outputs.flush()
+
+    return RunResult(machine=machine, cycles=cycles, halted=False)
+
+
+def assemble(program, machine_profile=None):
+    """
+    Translate `program` into opcodes in a single pass, see func:`lmcipy.assembler.assemble_tokens`.
+
+    Args:
+        program (list): List of lists of strings representing tokenized lines of program.
+        machine_profile (obj): Instance of class:`lmcipy.machine.MachineProfile` defining
+                               encoding of instructions, classic LMC when omitted.
+
+    Raises:
+        SyntaxError: Raised when trying to generate opcode for invalid line of program.
+
+    Returns:
+        list: List of opcodes converted from `program`.
+        dict: Labels of `program` (label: address).
+    """
+    if machine_profile is None:
+        return assemble_tokens(program)
+
+    return assemble_tokens(program, mnemonics_to_opcodes=machine_profile.mnemonics_to_opcodes)
+
+
+def run_engine(machine, engine='interpreter', debug=False, max_cycles=None, profile=None, trace=None,
+               budget=None):
+    """
+    Run `machine` in place with selected execution engine.
+
+    Args:
+        machine (obj): Instance of class:`MachineState` with loaded program.
+        engine (str): Execution engine, one of `ENGINES`. ``'interpreter'`` executes one
+                      opcode at a time, ``'compiled'`` compiles basic blocks into Python
+                      functions (see mod:`lmcipy.compiler`), ``'fused'`` executes common
+                      instruction sequences as superinstructions (see mod:`lmcipy.optimize`)
+                      and ``'accelerated'`` additionally skips iterations of counted loops
+                      (see mod:`lmcipy.accelerate`).
+        debug (bool): Whether to print debug information for each cycle.
+        max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+        profile (obj): Instance of class:`lmcipy.profiler.Profile` to record execution into.
+        trace (obj): Instance of class:`lmcipy.tracing.TraceRecorder` to record executed
+                     instructions with.
+        budget (obj): Instance of class:`lmcipy.budget.Budget` limiting the run, see
+                      func:`lmcipy.budget.run_budgeted`.
+
+    Raises:
+        UnknownOpcodeError: Raised when opcode is not found in `machine.opcodes_to_funcs`.
+        BudgetExceeded: Raised when the machine did not halt within `budget`.
+        InfiniteLoopError: Raised when `budget` detects loops and the machine never halts.
+        ValueError: Raised for unknown `engine`, for `debug`, `profile`, `trace` or loop
+                    detection with engine other than ``'interpreter'``, for `trace`
+                    combined with `debug`, `profile` or `budget`, for `budget`
+                    combined with `max_cycles` and for machines of extended profiles
+                    with anything but the plain interpreter.
+
+    Returns:
+        obj: Instance of class:`RunResult`.
+    """
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine {}, expected one of {}.".format(engine, ', '.join(ENGINES)))
+
+    if debug and engine != 'interpreter':
+        raise ValueError("Debug output is supported only by the interpreter engine.")
+
+    if profile is not None and engine != 'interpreter':
+        raise ValueError("Profiling is supported only by the interpreter engine.")
+
+    if trace is not None and engine != 'interpreter':
+        raise ValueError("Tracing is supported only by the interpreter engine.")
+
+    if machine.profile is not CLASSIC and (engine != 'interpreter' or profile is not None or trace is not None
+                                           or (budget is not None and budget.detect_loops)):
+        raise ValueError("Machine profile {} is supported only by the plain interpreter engine.".format(
+            machine.profile.name
+        ))
+
+    if budget is not None:
+        if max_cycles is not None or trace is not None:
+            raise ValueError("Budget cannot be combined with max_cycles or tracing.")
+
+        if budget.detect_loops and (engine != 'interpreter' or debug or profile is not None):
+            raise ValueError("Loop detection is supported only by the plain interpreter engine.")
+
+        # The engine is set up once and resumed for every chunk of the budget.
+        if budget.detect_loops:
+            run_chunk = None
+        elif engine == 'compiled':
+            run_chunk = CompiledProgram(machine).run
+        elif engine in ('fused', 'accelerated'):
+            run_chunk = FusedProgram(machine, accelerate=engine == 'accelerated').run
+        elif debug or profile is not None:
+            run_chunk = lambda max_cycles: run(machine=machine, debug=debug, max_cycles=max_cycles,
+                                               profile=profile, copy=False)
+        else:
+            stream = predecode(machine)
+            run_chunk = lambda max_cycles: run_predecoded(machine, stream, max_cycles=max_cycles)
+
+        return run_budgeted(machine, budget, run_chunk)
+
+    if engine == 'compiled':
+        return run_compiled(machine, max_cycles=max_cycles)
+
+    if engine in ('fused', 'accelerated'):
+        return run_fused(machine, max_cycles=max_cycles, accelerate=engine == 'accelerated')
+
+    return run(machine=machine, debug=debug, max_cycles=max_cycles, profile=profile, trace=trace, copy=False)
+
+
+def interpret_opcodes(opcodes, labels=None, debug=False, max_cycles=None, engine='interpreter',
+                      inputs=None, outputs=None, profile=None, trace=None, budget=None, machine_profile=None):
+    """
+    Load already assembled `opcodes` into new machine and evaluate them.
+
+    Args:
+        opcodes (list): List of opcodes, e.g. from func:`assemble` or object image.
+        labels (dict or None): Labels (label: address).
+
+    See func:`interpret` for the rest of arguments.
+
+    Returns:
+        obj: Instance of class:`RunResult`.
+    """
+    machine = (machine_profile or CLASSIC).new_machine(inputs=make_input(inputs), outputs=make_output(outputs))
+    machine.labels = {} if labels is None else labels
+    machine = load_opcodes(machine=machine, opcodes=opcodes, copy=False)
+
+    return run_engine(machine, engine=engine, debug=debug, max_cycles=max_cycles, profile=profile,
+                      trace=trace, budget=budget)
+
+
+def interpret(program, debug=False, max_cycles=None, engine='interpreter', inputs=None, outputs=None,
+              cache=None, profile=None, trace=None, budget=None, result_cache=None, machine_profile=None):
     """
     Convert `program` into opcode and evaluate them.
 
     Args:
         program (list): List of lists of strings representing tokenized lines of program.
+        inputs (obj): Values read by INP - ``None`` for console, channel, list, array, file
+                      or any other iterable (see func:`lmcipy.channels.make_input`).
+        outputs (obj): Destination of OUT - ``None`` for console, channel, list, writable
+                       stream or callback (see func:`lmcipy.channels.make_output`).
+        cache (obj): Instance of class:`lmcipy.cache.AssemblyCache` used to assemble `program`.
         debug (bool): Whether to print debug information for each cycle.
+        max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+        engine (str): Execution engine, see func:`run_engine`.
+        profile (obj): Instance of class:`lmcipy.profiler.Profile` to record execution into.
+        trace (obj): Instance of class:`lmcipy.tracing.TraceRecorder` to record executed
+                     instructions with.
+        budget (obj): Instance of class:`lmcipy.budget.Budget` limiting the run.
+        result_cache (obj): Instance of class:`lmcipy.cache.ResultCache` reusing results of
+                            previous runs with the same inputs. Runs with `debug`, `profile`
+                            or `trace` are always executed.
+        machine_profile (obj): Instance of class:`lmcipy.machine.MachineProfile` - word size
+                               and address width of the machine, classic LMC when omitted.
+                               Extended profiles are run only by the plain interpreter and
+                               bypass `cache` and `result_cache`.
 
     Raises:
         SyntaxError: Raised when trying to generate opcode for invalid line of program.
         UnknownOpcodeError: Raised when opcode is not found in `machine.opcodes_to_funcs`.
+        BudgetExceeded: Raised when the machine did not halt within `budget`.
+        InfiniteLoopError: Raised when `budget` detects loops and the machine never halts.
+        ValueError: Raised for invalid combination of `engine`, `debug`, `profile`, `trace`
+                    and `budget`, see func:`run_engine`.
+
+    Returns:
+        obj: Instance of class:`RunResult`.
     """
-    machine = MachineState()
-    machine, program = process_labels(machine=machine, program=program)
-    opcodes = generate_opcodes(machine=machine, program=program)
-    machine = load_opcodes(machine=machine, opcodes=opcodes)
-    run(machine=machine, debug=debug)
+    if machine_profile is not None and not machine_profile.classic:
+        opcodes, labels = assemble(program, machine_profile=machine_profile)
+
+        return interpret_opcodes(opcodes, labels, debug=debug, max_cycles=max_cycles, engine=engine,
+                                 inputs=inputs, outputs=outputs, profile=profile, trace=trace,
+                                 budget=budget, machine_profile=machine_profile)
+
+    opcodes, labels = assemble(program) if cache is None else cache.assemble(program)
+
+    if result_cache is not None and not debug and profile is None and trace is None:
+        return result_cache.run(opcodes, labels, inputs=inputs, outputs=outputs, engine=engine,
+                                max_cycles=max_cycles, budget=budget)
+
+    return interpret_opcodes(opcodes, labels, debug=debug, max_cycles=max_cycles, engine=engine,
+                             inputs=inputs, outputs=outputs, profile=profile, trace=trace,
+                             budget=budget)
@@ -1,5 +1,11 @@
 #! /usr/bin/env python
 
+from array import array
+from functools import partial
+
+from .channels import ConsoleInput, ConsoleOutput
+
+
 class HaltSignal(Exception):
     pass
 
@@ -9,12 +15,36 @@ class InvalidMachineOperationError(Exception):
     """
 
 
+class InvalidAttributeError(InvalidMachineOperationError, AttributeError):
+    """
+    Assignment to attribute that machine state does not have. Also an ``AttributeError``
+    as raised by objects without ``__dict__``.
+    """
+
+
+class UnknownOpcodeError(Exception):
+    """
+    Opcode unknown.
+
+    Args:
+        opcode (int): Opcode.
+    """
+
+    def __init__(self, opcode):
+        self.opcode = opcode
+
+        super().__init__("Opcode {} is not specified".format(self.opcode))
+
+
 def opc_add(machine, value):
     accumulator = (machine.accumulator * (-1)) if machine.minus_flag else machine.accumulator
 
     res = accumulator + machine.memory[value]
     machine.minus_flag = False if res >= 0 else True
 
+    if res > 999 or res < -999:
+        raise InvalidMachineOperationError("Value {} not in range 0 - 999.".format(abs(res)))
+
     machine.accumulator = abs(res)
 
 
@@ -24,11 +54,14 @@ def opc_sub(machine, value):
     res = accumulator - machine.memory[value]
     machine.minus_flag = False if res >= 0 else True
 
+    if res > 999 or res < -999:
+        raise InvalidMachineOperationError("Value {} not in range 0 - 999.".format(abs(res)))
+
     machine.accumulator = abs(res)
 
 
 def opc_sta(machine, value):
-    machine.memory[value] = machine.accumulator
+    machine.memory.store(value, machine.accumulator)
 
 
 def opc_lda(machine, value):
@@ -51,17 +84,75 @@ def opc_brp(machine, value):
 
 
 def opc_inp(machine):
-    machine.accumulator = int(input("Input: "))
+    value = machine.inputs.read()
+
+    if value < 0 or value > 999:
+        raise InvalidMachineOperationError("Value {} not in range 0 - 999.".format(value))
+
+    machine.accumulator = value
 
 
 def opc_out(machine):
-    print("Output:", machine.accumulator)
+    machine.outputs.write(machine.accumulator)
 
 
 def opc_halt(machine):
     raise HaltSignal()
 
 
+def opc_unknown(machine, opcode):
+    raise UnknownOpcodeError(opcode)
+
+
+def build_decode_table(opcodes_to_funcs):
+    """
+    Decode every opcode 0 - 999 once, so that executing an instruction is a single list index.
+
+    Args:
+        opcodes_to_funcs (dict): Mapping of opcode patterns ('1XX', '901', ...) to functions.
+
+    Returns:
+        list: Functions taking single argument `machine`, indexed by opcode. Operands are
+              already bound, unknown opcodes are bound to func:`opc_unknown`.
+    """
+    def decode(opcode):
+        key = str(opcode)
+
+        if len(key) < 3:
+            return opcodes_to_funcs['0']
+
+        if key in opcodes_to_funcs:
+            return opcodes_to_funcs[key]
+
+        if key[0] + 'XX' in opcodes_to_funcs:
+            return partial(opcodes_to_funcs[key[0] + 'XX'], value=int(key[1:3]))
+
+        return partial(opc_unknown, opcode=opcode)
+
+    return [decode(opcode) for opcode in range(1000)]
+
+
+class RunResult:
+    """
+    Outcome of running a machine.
+
+    Args:
+        machine (obj): Instance of class:`MachineState` in its final state.
+        cycles (int): Number of executed cycles (instructions), including the final HLT.
+        halted (bool): Whether the machine stopped by executing HLT.
+    """
+
+    def __init__(self, machine, cycles, halted):
+        self.machine = machine
+        self.cycles = cycles
+        self.halted = halted
+
+    def __repr__(self):
+        return "{}(cycles={}, halted={})".format(self.__class__.__name__, self.cycles, self.halted)
+
+
+# No longer used by class:`MachineState`, whose registers are plain slots since validation
+# moved out of the hot path. Kept only for backward compatibility of the public API.
 class RestrictedAttribute:
     """
     Descriptor that restrict values to be set to values that pass `validate_func`.
@@ -90,32 +181,228 @@ class RestrictedAttribute:
 
 class MachineMemory:
     """
-    LMC memory 'array' - list that limits access to cells 0 - 99 and limits
-    values stored to 0 - 999. Also limits operations to ``__setitem__``.
+    LMC memory 'array' - 100 cells backed by ``array('H')`` that limits access to cells 0 - 99
+    and limits values stored to 0 - 999. Also limits operations to ``__setitem__``.
+
+    Values are validated by ``__setitem__``, which is used when loading programs. Engines
+    store accumulator, which is always valid, with unchecked func:`store`.
+
+    Memory can be forked copy-on-write: forks share the underlying array until one
+    of them is written to. Once the array was handed out by func:`cells`, engines may
+    still write into it directly, so forks get their own copy.
 
     Raises:
         InvalidMachineOperationError: When accessing invalid memory cells or storing invalid values.
     """
+    __slots__ = ('_data', '_shared', '_exposed')
+
+    size = 100
+
     def __init__(self):
-        self._data = [0] * 99
+        self._data = array('H', [0]) * self.size
+        self._shared = False
+        self._exposed = False
 
     def __getitem__(self, index):
+        if index.__class__ is slice:
+            return self._data[index].tolist()
+
         return self._data[index]
 
     def __setitem__(self, index, value):
-        check_value = lambda v: v >= 0 and v <= 999
-        check_index = lambda i: isinstance(i, slice) or (i >= 0 and i <= 99)
+        if isinstance(index, slice):
+            value = list(value)
+
+            if len(range(*index.indices(self.size))) != len(value):
+                raise InvalidMachineOperationError("Cannot store {} values into memory cells {}.".format(
+                    len(value), index
+                ))
+
+            if not all(0 <= v <= 999 for v in value):
+                raise InvalidMachineOperationError("Value {} not in range 0 - 999.".format(value))
+
+            if self._shared:
+                self._data = self._data[:]
+                self._shared = False
+
+            self._data[index] = array('H', value)
+            return
 
-        if not check_index(index):
+        if not 0 <= index < self.size:
             raise InvalidMachineOperationError("Cannot access memory cell number {}".format(index))
 
-        if not all(check_value(v) for v in (value if isinstance(value, list) else list([value]))):
+        if not 0 <= value <= 999:
             raise InvalidMachineOperationError("Value {} not in range 0 - 999.".format(value))
 
+        self.store(index, value)
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+        return str(self._data.tolist())
+
+    def store(self, index, value):
+        """
+        Store `value` into cell `index` without validation.
+
+        Args:
+            index (int): Memory cell 0 - 99.
+            value (int): Value 0 - 999.
+        """
+        if self._shared:
+            self._data = self._data[:]
+            self._shared = False
+
         self._data[index] = value
 
+    def cells(self):
+        """
+        Return the underlying array of cells for engines that access memory directly.
+
+        Stores into the array bypass validation, so only values already known to be valid
+        may be written. A shared array is copied first and later forks copy the array
+        instead of sharing it, so forks are not affected.
+
+        Returns:
+            array: Memory cells.
+        """
+        if self._shared:
+            self._data = self._data[:]
+            self._shared = False
+
+        self._exposed = True
+
+        return self._data
+
+    def fork(self):
+        """
+        Return copy of memory that shares cells with this one until either is written to.
+
+        Returns:
+            obj: Instance of class:`MachineMemory`.
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone._exposed = False
+
+        if self._exposed:
+            clone._data, clone._shared = self._data[:], False
+        else:
+            clone._data = self._data
+            clone._shared = self._shared = True
+
+        return clone
+
+
+class PagedMemory:
+    """
+    Sparse memory of extended machine profiles, see class:`MachineProfile`.
+
+    Cells are split into pages of `page_size` cells that are allocated on the first store,
+    so a large address space costs only the pages actually touched. Reading an untouched
+    cell returns 0. Like class:`MachineMemory` values are validated by ``__setitem__``
+    and stored unchecked by func:`store`, and memory can be forked copy-on-write page by page.
+
+    Args:
+        size (int): Number of cells.
+        max_value (int): Maximum value of a cell.
+        page_size (int): Number of cells of a page.
+
+    Raises:
+        InvalidMachineOperationError: When accessing invalid memory cells or storing invalid values.
+    """
+    __slots__ = ('size', 'max_value', 'page_size', '_typecode', '_pages', '_owned')
+
+    def __init__(self, size, max_value, page_size=256):
+        self.size = size
+        self.max_value = max_value
+        self.page_size = page_size
+        self._typecode = 'H' if max_value <= 0xFFFF else 'L'
+        self._pages = {}
+        # pages not shared with any fork
+        self._owned = set()
+
+    @property
+    def pages(self):
+        """
+        Number of allocated pages.
+        """
+        return len(self._pages)
+
+    def __getitem__(self, index):
+        if index.__class__ is slice:
+            return [self[cell] for cell in range(*index.indices(self.size))]
+
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+
+        page = self._pages.get(index // self.page_size)
+
+        return 0 if page is None else page[index % self.page_size]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            cells = range(*index.indices(self.size))
+
+            if len(cells) != len(value):
+                raise InvalidMachineOperationError("Cannot store {} values into memory cells {}.".format(
+                    len(value), index
+                ))
+
+            if not all(0 <= v <= self.max_value for v in value):
+                raise InvalidMachineOperationError("Value {} not in range 0 - {}.".format(value, self.max_value))
+
+            for cell, cell_value in zip(cells, value):
+                self.store(cell, cell_value)
+            return
+
+        if not 0 <= index < self.size:
+            raise InvalidMachineOperationError("Cannot access memory cell number {}".format(index))
+
+        if not 0 <= value <= self.max_value:
+            raise InvalidMachineOperationError("Value {} not in range 0 - {}.".format(value, self.max_value))
+
+        self.store(index, value)
+
+    def __len__(self):
+        return self.size
+
     def __str__(self):
-        return str(self._data)
+        return str(self[:])
+
+    def store(self, index, value):
+        """
+        Store `value` into cell `index` without validation.
+
+        Args:
+            index (int): Memory cell.
+            value (int): Value 0 - `max_value`.
+        """
+        number, offset = divmod(index, self.page_size)
+
+        if number not in self._owned:
+            page = self._pages.get(number)
+            self._pages[number] = array(self._typecode, [0]) * self.page_size if page is None else page[:]
+            self._owned.add(number)
+
+        self._pages[number][offset] = value
+
+    def fork(self):
+        """
+        Return copy of memory that shares pages with this one until either stores into them.
+
+        Returns:
+            obj: Instance of class:`PagedMemory`.
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone.size, clone.max_value, clone.page_size = self.size, self.max_value, self.page_size
+        clone._typecode = self._typecode
+        clone._pages = dict(self._pages)
+        clone._owned = set()
+        self._owned = set()
+
+        return clone
 
 
 class MachineState():
@@ -124,29 +411,60 @@ class MachineState():
     of mnemonics and opcodes.
 
     Note:
-        Instead of various checks in the functions that modify `MachineState`, the checks are done
-        here which makes rest of code simpler.
+        Registers are plain slots without per-assignment validation. Values are checked once
+        when a program is assembled and loaded, and by the opcodes that can produce invalid
+        values (ADD, SUB and INP). Names of assigned attributes are checked, except while
+        an engine runs the machine, see func:`unchecked`.
+
+    Args:
+        inputs (obj): Input channel read by INP, console when omitted (see mod:`lmcipy.channels`).
+        outputs (obj): Output channel written by OUT, console when omitted.
 
     Raises:
-        InvalidMachineOperationError: When accessing invalid attributes.
+        InvalidAttributeError: When setting invalid attributes.
     """
-    counter = RestrictedAttribute(lambda x: x >= 0 and x <= 99)
-    accumulator = RestrictedAttribute(lambda x: x >= 0 and x <= 999)
-    minus_flag = RestrictedAttribute(lambda x: x in (True, False))
+    __slots__ = ('counter', 'accumulator', 'minus_flag', 'memory', 'labels', 'inputs', 'outputs')
 
-    def __init__(self):
+    # class:`MachineProfile` of the machine, subclasses created by func:`MachineProfile.new_machine`
+    # override it together with mnemonics and decode table.
+    profile = None
+
+    def __init__(self, inputs=None, outputs=None):
         self.counter = 0
         self.accumulator = 0
         self.minus_flag = False
-        self.memory = MachineMemory()
+        self.memory = self.profile.new_memory()
         self.labels = {}
+        self.inputs = ConsoleInput() if inputs is None else inputs
+        self.outputs = ConsoleOutput() if outputs is None else outputs
 
     def __setattr__(self, name, value):
-        if name not in ('counter', 'accumulator', 'minus_flag', 'memory', 'labels'):
-            raise InvalidMachineOperationError("Name {} not allowed in {}.".format(
+        try:
+            object.__setattr__(self, name, value)
+        except AttributeError:
+            raise InvalidAttributeError("Name {} not allowed in {}.".format(
                 name, self.__class__.__name__
-            ))
-        super().__setattr__(name, value)
+            )) from None
+
+    def snapshot(self):
+        """
+        Return independent copy of the machine. Memory is forked copy-on-write, so a
+        snapshot is cheap until either machine stores into memory. Channels are shared.
+
+        Returns:
+            obj: Instance of class:`MachineState`.
+        """
+        cls = getattr(self.__class__, '_checked', self.__class__)
+        clone = cls.__new__(cls)
+        clone.inputs = self.inputs
+        clone.outputs = self.outputs
+        clone.counter = self.counter
+        clone.accumulator = self.accumulator
+        clone.minus_flag = self.minus_flag
+        clone.memory = self.memory.fork()
+        clone.labels = dict(self.labels)
+
+        return clone
 
 
     def __str__(self):
@@ -184,4 +502,227 @@ class MachineState():
         '902': opc_out,
         '0': opc_halt
     }
+    decode_table = build_decode_table(opcodes_to_funcs)
+
+
+# class of machine: its subclass assigning attributes without checking their names
+_UNCHECKED = {}
+
+
+def unchecked(machine):
+    """
+    Switch `machine` to a subclass of its class without func:`MachineState.__setattr__`,
+    which costs a Python call on every assignment of a register. Engines switch the
+    machine for the duration of a run and restore the returned class when they stop.
+
+    Args:
+        machine (obj): Instance of class:`MachineState`.
+
+    Returns:
+        type: Class of `machine` to restore.
+    """
+    cls = machine.__class__
+    fast = _UNCHECKED.get(cls)
+
+    if fast is None:
+        fast = type(cls.__name__, (cls,), {'__slots__': (), '__setattr__': object.__setattr__, '_checked': cls})
+        _UNCHECKED[cls] = _UNCHECKED[fast] = fast
+
+    machine.__class__ = fast
+
+    return cls
+
+
+def make_opcodes_to_funcs(max_value):
+    """
+    Return opcode functions of machine whose words hold values 0 - `max_value`.
+
+    Args:
+        max_value (int): Maximum value of accumulator and memory cells.
+
+    Returns:
+        dict: Functions of opcode classes (see func:`MachineProfile.decode`), operands
+              are passed as keyword argument `value`.
+    """
+    def add(machine, value):
+        accumulator = (machine.accumulator * (-1)) if machine.minus_flag else machine.accumulator
+
+        res = accumulator + machine.memory[value]
+        machine.minus_flag = res < 0
+
+        if res > max_value or res < -max_value:
+            raise InvalidMachineOperationError("Value {} not in range 0 - {}.".format(abs(res), max_value))
+
+        machine.accumulator = abs(res)
+
+    def sub(machine, value):
+        accumulator = (machine.accumulator * (-1)) if machine.minus_flag else machine.accumulator
+
+        res = accumulator - machine.memory[value]
+        machine.minus_flag = res < 0
+
+        if res > max_value or res < -max_value:
+            raise InvalidMachineOperationError("Value {} not in range 0 - {}.".format(abs(res), max_value))
+
+        machine.accumulator = abs(res)
+
+    def inp(machine):
+        value = machine.inputs.read()
+
+        if value < 0 or value > max_value:
+            raise InvalidMachineOperationError("Value {} not in range 0 - {}.".format(value, max_value))
+
+        machine.accumulator = value
+
+    return {
+        1: add, 2: sub, 3: opc_sta, 5: opc_lda, 6: opc_bra, 7: opc_brz, 8: opc_brp,
+        'INP': inp, 'OUT': opc_out, 'HLT': opc_halt,
+    }
+
+
+class _DecodeTable(dict):
+    """
+    Decode table of extended profiles, opcodes are decoded on first use.
+    """
+
+    def __init__(self, decode):
+        super().__init__()
+        self._decode = decode
+
+    def __missing__(self, opcode):
+        func = self[opcode] = self._decode(opcode)
+
+        return func
+
+
+class MachineProfile:
+    """
+    Word size and address width of a machine.
+
+    An instruction is a single digit of opcode class followed by the operand in the
+    remaining `word_digits` - 1 digits, e.g. ``1XXX`` is ADD with 4-digit words.
+    Operands address cells 0 - 10 ** `address_digits` - 1, INP and OUT are ``90..01`` and
+    ``90..02``. The classic LMC - 3-digit words and 100 cells - is class:`MachineState`
+    itself and keeps its predecoded table and dense memory, other profiles use
+    class:`PagedMemory` and decode opcodes lazily.
+
+    Args:
+        name (str): Name of the profile.
+        word_digits (int): Number of decimal digits of a word, at most 9.
+        address_digits (int): Number of decimal digits of an address, less than `word_digits`.
+        page_size (int): Number of cells of a memory page, see class:`PagedMemory`.
+
+    Raises:
+        ValueError: Raised for invalid combination of digits.
+    """
+
+    def __init__(self, name, word_digits=3, address_digits=2, page_size=256):
+        if not 0 < address_digits < word_digits <= 9:
+            raise ValueError("Invalid profile {} - {} digit words and {} digit addresses.".format(
+                name, word_digits, address_digits
+            ))
+
+        self.name = name
+        self.word_digits = word_digits
+        self.address_digits = address_digits
+        self.page_size = page_size
+        self.size = 10 ** address_digits
+        self.max_value = 10 ** word_digits - 1
+        self.opcode_base = 10 ** (word_digits - 1)
+
+        base, size, max_value = self.opcode_base, self.size, self.max_value
+        address = lambda x: 0 <= x < size
+        self.mnemonics_to_opcodes = {
+            'ADD': (lambda x: base + x, address),
+            'SUB': (lambda x: 2 * base + x, address),
+            'STA': (lambda x: 3 * base + x, address),
+            'LDA': (lambda x: 5 * base + x, address),
+            'BRA': (lambda x: 6 * base + x, address),
+            'BRZ': (lambda x: 7 * base + x, address),
+            'BRP': (lambda x: 8 * base + x, address),
+            'INP': (lambda: 9 * base + 1, None),
+            'OUT': (lambda: 9 * base + 2, None),
+            'HLT': (lambda: 0, None),
+            'DAT': (lambda x=0: x, lambda x=0: 0 <= x <= max_value),
+        }
+        self._machine_class = None
+
+    def __repr__(self):
+        return "{}({!r}, word_digits={}, address_digits={})".format(
+            self.__class__.__name__, self.name, self.word_digits, self.address_digits
+        )
+
+    @property
+    def classic(self):
+        """
+        Whether the profile is the classic LMC.
+        """
+        return self.word_digits == 3 and self.address_digits == 2
+
+    def decode(self, opcode, opcodes_to_funcs):
+        """
+        Return function executing `opcode`, see func:`build_decode_table`.
+
+        Args:
+            opcode (int): Opcode.
+            opcodes_to_funcs (dict): Functions of opcode classes, see func:`make_opcodes_to_funcs`.
+
+        Returns:
+            func: Function taking single argument `machine`.
+        """
+        kind, operand = divmod(opcode, self.opcode_base)
+
+        if 0 <= opcode < self.opcode_base:
+            return opcodes_to_funcs['HLT']
+
+        if kind == 9 and operand in (1, 2):
+            return opcodes_to_funcs['INP' if operand == 1 else 'OUT']
+
+        if kind in opcodes_to_funcs and operand < self.size:
+            return partial(opcodes_to_funcs[kind], value=operand)
+
+        return partial(opc_unknown, opcode=opcode)
+
+    def new_memory(self):
+        """
+        Return empty memory of the profile.
+
+        Returns:
+            obj: Instance of class:`MachineMemory` or class:`PagedMemory`.
+        """
+        if self.classic:
+            return MachineMemory()
+
+        return PagedMemory(self.size, self.max_value, page_size=self.page_size)
+
+    def new_machine(self, inputs=None, outputs=None):
+        """
+        Return new machine of the profile.
+
+        Args:
+            inputs (obj): Input channel, see class:`MachineState`.
+            outputs (obj): Output channel, see class:`MachineState`.
+
+        Returns:
+            obj: Instance of class:`MachineState`.
+        """
+        if self._machine_class is None:
+            if self.classic:
+                self._machine_class = MachineState
+            else:
+                opcodes_to_funcs = make_opcodes_to_funcs(self.max_value)
+                self._machine_class = type('MachineState', (MachineState,), {
+                    '__slots__': (),
+                    'profile': self,
+                    'mnemonics_to_opcodes': self.mnemonics_to_opcodes,
+                    'decode_table': _DecodeTable(lambda opcode: self.decode(opcode, opcodes_to_funcs)),
+                })
+
+        return self._machine_class(inputs=inputs, outputs=outputs)
+
+
+CLASSIC = MachineState.profile = MachineProfile('classic')
+EXTENDED = MachineProfile('extended', word_digits=4, address_digits=3)
 
+# name: profile
+PROFILES = {profile.name: profile for profile in (CLASSIC, EXTENDED)}
@@ -0,0 +1,328 @@
+#! /usr/bin/env python
+
+from array import array
+import mmap
+import struct
+import sys
+
+
+IMAGE_MAGIC = b'LMCO'
+ARCHIVE_MAGIC = b'LMCA'
+FORMAT_VERSION = 1
+IMAGE_CELLS = 100
+
+# magic, version, number of cells, number of symbols, number of line map entries, name length
+IMAGE_HEADER = struct.Struct('<4sHHHHH')
+# magic, version, reserved, number of images, offset of index
+ARCHIVE_HEADER = struct.Struct('<4sHHQQ')
+# offset of image, size of image
+ARCHIVE_ENTRY = struct.Struct('<QQ')
+# address, length of name
+SYMBOL = struct.Struct('<HB')
+
+
+class ObjectFormatError(Exception):
+    """
+    Invalid or unsupported object file.
+    """
+
+
+def _words(data, typecode, count):
+    """
+    Read `count` little-endian words from `data` without copying when possible.
+    """
+    size = array(typecode).itemsize
+
+    if sys.byteorder == 'little':
+        return data[:count * size].cast(typecode)
+
+    words = array(typecode, bytes(data[:count * size]))
+    words.byteswap()
+
+    return words
+
+
+def encode_image(opcodes, labels, line_map=None, name=''):
+    """
+    Encode assembled program into object image.
+
+    Layout of image (all numbers little-endian): header `IMAGE_HEADER`, 100 cells of opcodes
+    as 16-bit words, symbol table (`SYMBOL` followed by UTF-8 name for each label), source
+    line map (32-bit line number for each cell) and UTF-8 name of image.
+
+    Args:
+        opcodes (list): Opcodes, e.g. from func:`lmcipy.interpret.generate_opcodes`.
+        labels (dict): Labels (label: address).
+        line_map (list or None): Source line number of each opcode. Every line of program is
+                                 assembled into single cell, so it defaults to address of cell.
+        name (str): Name of image, e.g. path of source file.
+
+    Raises:
+        ObjectFormatError: Raised when program does not fit the image.
+
+    Returns:
+        bytes: Encoded image.
+    """
+    if len(opcodes) > IMAGE_CELLS:
+        raise ObjectFormatError("Program has {} cells, at most {} fit the image.".format(
+            len(opcodes), IMAGE_CELLS
+        ))
+
+    line_map = list(range(len(opcodes)) if line_map is None else line_map)
+    cells = array('H', opcodes) + array('H', [0]) * (IMAGE_CELLS - len(opcodes))
+    lines = array('I', line_map)
+    name = name.encode()
+
+    if sys.byteorder != 'little':
+        cells.byteswap()
+        lines.byteswap()
+
+    symbols = b''.join(
+        SYMBOL.pack(address, len(label.encode())) + label.encode()
+        for label, address in labels.items()
+    )
+
+    return b''.join([
+        IMAGE_HEADER.pack(IMAGE_MAGIC, FORMAT_VERSION, IMAGE_CELLS, len(labels), len(lines), len(name)),
+        cells.tobytes(),
+        symbols,
+        lines.tobytes(),
+        name,
+    ])
+
+
+class ObjectImage:
+    """
+    View of a single encoded image. Nothing but the header is decoded until requested,
+    cells are read directly from the underlying buffer.
+
+    Args:
+        data (obj): Bytes-like object or memoryview holding the image.
+
+    Raises:
+        ObjectFormatError: Raised when `data` is not a supported image.
+    """
+
+    def __init__(self, data):
+        data = memoryview(data)
+
+        if len(data) < IMAGE_HEADER.size:
+            raise ObjectFormatError("Image is truncated.")
+
+        magic, version, cells, symbols, lines, name_length = IMAGE_HEADER.unpack_from(data)
+
+        if magic != IMAGE_MAGIC:
+            raise ObjectFormatError("Not an LMC object image.")
+
+        if version != FORMAT_VERSION:
+            raise ObjectFormatError("Unsupported object format version {}.".format(version))
+
+        self._data = data
+        self._cell_count = cells
+        self._symbol_count = symbols
+        self._line_count = lines
+        self._name_length = name_length
+        self._symbols_offset = IMAGE_HEADER.size + 2 * cells
+
+    @property
+    def cells(self):
+        """
+        Opcodes of all cells, a zero-copy view on little-endian machines.
+        """
+        return _words(self._data[IMAGE_HEADER.size:], 'H', self._cell_count)
+
+    @property
+    def opcodes(self):
+        return list(self.cells)
+
+    def _symbols_end(self):
+        offset = self._symbols_offset
+
+        for _ in range(self._symbol_count):
+            _, length = SYMBOL.unpack_from(self._data, offset)
+            offset += SYMBOL.size + length
+
+        return offset
+
+    @property
+    def labels(self):
+        """
+        Symbol table (label: address).
+        """
+        labels = {}
+        offset = self._symbols_offset
+
+        for _ in range(self._symbol_count):
+            address, length = SYMBOL.unpack_from(self._data, offset)
+            offset += SYMBOL.size
+            labels[bytes(self._data[offset:offset + length]).decode()] = address
+            offset += length
+
+        return labels
+
+    @property
+    def line_map(self):
+        """
+        Source line number of each assembled cell.
+        """
+        offset = self._symbols_end()
+
+        return list(_words(self._data[offset:], 'I', self._line_count))
+
+    @property
+    def name(self):
+        offset = self._symbols_end() + 4 * self._line_count
+
+        return bytes(self._data[offset:offset + self._name_length]).decode()
+
+    def load(self, machine):
+        """
+        Load cells and symbol table into `machine`.
+
+        Args:
+            machine (obj): Instance of class:`lmcipy.machine.MachineState`.
+
+        Returns:
+            obj: `machine`.
+        """
+        machine.memory[0:self._cell_count] = self.cells
+        machine.labels = self.labels
+
+        return machine
+
+
+def write_object(path, opcodes, labels, line_map=None, name=''):
+    """
+    Write single image into file `path`, see func:`encode_image`.
+    """
+    with open(path, 'wb') as f:
+        f.write(encode_image(opcodes, labels, line_map=line_map, name=name))
+
+
+def write_archive(path, images):
+    """
+    Write many images into single archive.
+
+    Images are streamed into the file one by one. Index of image offsets is written after
+    the last image and its position is stored in the header, so readers can find any image
+    without reading the others.
+
+    Args:
+        path (str): Path of archive.
+        images (iterable): Encoded images, see func:`encode_image`.
+
+    Returns:
+        int: Number of written images.
+    """
+    index = []
+
+    with open(path, 'wb') as f:
+        f.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, FORMAT_VERSION, 0, 0, 0))
+
+        for image in images:
+            # Keep images 8-byte aligned, so cells can be viewed as words in place.
+            f.write(b'\0' * (-f.tell() % 8))
+            index.append((f.tell(), len(image)))
+            f.write(image)
+
+        f.write(b'\0' * (-f.tell() % 8))
+        index_offset = f.tell()
+        f.write(b''.join(ARCHIVE_ENTRY.pack(offset, size) for offset, size in index))
+
+        f.seek(0)
+        f.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, FORMAT_VERSION, 0, len(index), index_offset))
+
+    return len(index)
+
+
+class ObjectArchive:
+    """
+    Memory-mapped archive of images (or single image file) opened for reading.
+
+    Images are returned as views into the mapped file, nothing is parsed or copied until an
+    image is requested.
+
+    Args:
+        path (str): Path of archive or image written by func:`write_archive` or
+                    func:`write_object`.
+
+    Raises:
+        ObjectFormatError: Raised when file is not supported archive or image.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._data = memoryview(self._mmap)
+        magic = bytes(self._data[:4])
+
+        self._single = magic == IMAGE_MAGIC
+
+        if self._single:
+            self._count = 1
+            return
+
+        if magic != ARCHIVE_MAGIC or len(self._data) < ARCHIVE_HEADER.size:
+            self.close()
+            raise ObjectFormatError("{} is not an LMC object file.".format(path))
+
+        _, version, _, count, index_offset = ARCHIVE_HEADER.unpack_from(self._data)
+
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ObjectFormatError("Unsupported object format version {}.".format(version))
+
+        self._count = count
+        self._index_offset = index_offset
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not -self._count <= index < self._count:
+            raise IndexError("Archive has {} images.".format(self._count))
+
+        if index < 0:
+            index += self._count
+
+        if self._single:
+            return ObjectImage(self._data)
+
+        offset, size = ARCHIVE_ENTRY.unpack_from(self._data, self._index_offset + index * ARCHIVE_ENTRY.size)
+
+        return ObjectImage(self._data[offset:offset + size])
+
+    def __iter__(self):
+        return (self[index] for index in range(self._count))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def find(self, name):
+        """
+        Return first image named `name`.
+
+        Raises:
+            KeyError: Raised when there is no such image.
+        """
+        for image in self:
+            if image.name == name:
+                return image
+
+        raise KeyError(name)
+
+    def close(self):
+        """
+        Release the mapping. Images returned by the archive must not be used afterwards.
+        """
+        self._data.release()
+
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Some image is still referenced, the mapping is closed once it is collected.
+            pass
@@ -0,0 +1,361 @@
+#! /usr/bin/env python
+
+from .accelerate import LoopAccelerator
+from .analysis import analyze
+from .machine import HaltSignal, InvalidMachineOperationError, RunResult, unchecked
+
+
+MAX_FUSED_LENGTH = 3
+
+# name: opcode classes (opcode // 100) of fused instructions, longest patterns first
+PATTERNS = (
+    ('LDA_ADD_STA', (5, 1, 3)),
+    ('LDA_SUB_STA', (5, 2, 3)),
+    ('LDA_SUB_BRZ', (5, 2, 7)),
+    ('LDA_SUB_BRP', (5, 2, 8)),
+    ('ADD_STA', (1, 3)),
+    ('SUB_STA', (2, 3)),
+    ('LDA_BRZ', (5, 7)),
+)
+
+# opcode class of the first instruction: patterns starting with it, longest first
+_PATTERNS_BY_FIRST = {}
+for _name, _classes in PATTERNS:
+    _PATTERNS_BY_FIRST.setdefault(_classes[0], []).append((_name, _classes))
+
+
+def find_superinstructions(cells):
+    """
+    Find sequences of instructions that can be executed as single superinstruction.
+
+    Cells are scanned left to right and the longest matching pattern wins, so fused
+    sequences never overlap. A sequence is fused regardless of branches into its middle,
+    cells inside a sequence are still executable one by one.
+
+    Args:
+        cells (list): Memory cells.
+
+    Returns:
+        list: List of (address of the first instruction, pattern name, operands).
+    """
+    kinds = [cell // 100 for cell in cells]
+    found = []
+    end = 0
+
+    for address, kind in enumerate(kinds):
+        if address < end or kind not in _PATTERNS_BY_FIRST:
+            continue
+
+        for name, classes in _PATTERNS_BY_FIRST[kind]:
+            if tuple(kinds[address:address + len(classes)]) == classes:
+                end = address + len(classes)
+                found.append((address, name, tuple(cell % 100 for cell in cells[address:end])))
+                break
+
+    return found
+
+
+class FusedProgram:
+    """
+    Program in memory of a machine predecoded into a table of handlers, one per cell,
+    with the first cell of every recognised sequence replaced by a superinstruction.
+
+    Superinstructions update registers, memory and counter exactly as the fused
+    instructions would and count as that many cycles. When the fused result would be
+    invalid (ADD overflow), only the first instruction is executed the ordinary way.
+
+    When the program provably never stores into its code (see func:`lmcipy.analysis.analyze`),
+    the table is immutable and stores are plain. Otherwise every store goes through a write
+    barrier that redecodes the stored cell and unfuses the sequence containing it, so
+    self-modifying programs stay correct.
+
+    Programs without any recognised sequence run the table like the interpreter runs its
+    predecoded stream, so that they are not slowed down by counting fused cycles.
+
+    Args:
+        machine (obj): Instance of class:`MachineState` with loaded program. The machine
+                       is run in place.
+        accelerate (bool): Whether to skip iterations of counted loops in closed form,
+                           see class:`lmcipy.accelerate.LoopAccelerator`.
+    """
+
+    def __init__(self, machine, accelerate=False):
+        self.machine = machine
+        self._cells = machine.memory.cells()
+        self.immutable = 0 <= machine.counter < len(self._cells) and \
+            not analyze(self._cells, machine.counter).self_modifying
+        # write barrier, ``None`` when the program never stores into its code
+        self._barrier = None if self.immutable else self.stored
+        self._singles = list(machine.decode_table)
+        if self._barrier is None:
+            # Code never changes, only stores present in it are ever executed.
+            for opcode in {cell for cell in self._cells if 300 <= cell < 400}:
+                self._singles[opcode] = self._make_store(opcode - 300)
+        else:
+            self._singles[300:400] = [self._make_barrier_store()] * 100
+        self._table = [self._singles[cell] for cell in self._cells]
+        # address of the first cell of the fused sequence containing the cell, or None
+        self._covering = [None] * len(self._cells)
+        self._lengths = {}
+
+        for start, name, operands in find_superinstructions(self._cells):
+            self._table[start] = getattr(self, '_fuse_' + name.lower())(start, *operands)
+            self._lengths[start] = len(operands)
+
+            for address in range(start, start + len(operands)):
+                self._covering[address] = start
+
+        self.accelerator = LoopAccelerator(self._cells, self._barrier) if accelerate else None
+
+    @property
+    def fused(self):
+        """
+        Addresses of currently fused sequences (address of the first cell: length).
+        """
+        return dict(self._lengths)
+
+    def stored(self, address):
+        """
+        Write barrier, called after cell `address` was stored into.
+
+        Args:
+            address (int): Address of modified memory cell.
+        """
+        cells, table, singles = self._cells, self._table, self._singles
+        table[address] = singles[cells[address]]
+        start = self._covering[address]
+
+        if start is not None:
+            for covered in range(start, start + self._lengths.pop(start)):
+                self._covering[covered] = None
+
+            table[start] = singles[cells[start]]
+
+    def _make_store(self, address):
+        cells = self._cells
+
+        def store(machine):
+            cells[address] = machine.accumulator
+
+        return store
+
+    def _make_barrier_store(self):
+        cells, stored = self._cells, self._barrier
+
+        # Shared by all addresses, the operand is taken from the executed instruction,
+        # so that runs of self-modifying programs do not start by building 100 handlers.
+        def store(machine):
+            address = cells[machine.counter - 1] - 300
+            cells[address] = machine.accumulator
+            stored(address)
+
+        return store
+
+    def _fuse_lda_add_sta(self, start, x, y, z):
+        cells, stored, fallback = self._cells, self._barrier, self._singles[500 + x]
+
+        def lda_add_sta(machine):
+            result = cells[x] + cells[y]
+
+            if result > 999:
+                return fallback(machine)
+
+            machine.accumulator = result
+            machine.minus_flag = False
+            cells[z] = result
+            machine.counter = start + 3
+            if stored is not None:
+                stored(z)
+
+            return 2
+
+        return lda_add_sta
+
+    def _fuse_lda_sub_sta(self, start, x, y, z):
+        cells, stored = self._cells, self._barrier
+
+        def lda_sub_sta(machine):
+            result = cells[x] - cells[y]
+            machine.minus_flag = result < 0
+            machine.accumulator = result = abs(result)
+            cells[z] = result
+            machine.counter = start + 3
+            if stored is not None:
+                stored(z)
+
+            return 2
+
+        return lda_sub_sta
+
+    def _fuse_lda_sub_brz(self, start, x, y, target):
+        cells = self._cells
+
+        def lda_sub_brz(machine):
+            result = cells[x] - cells[y]
+            machine.minus_flag = result < 0
+            machine.accumulator = abs(result)
+            machine.counter = target if result == 0 else start + 3
+
+            return 2
+
+        return lda_sub_brz
+
+    def _fuse_lda_sub_brp(self, start, x, y, target):
+        cells = self._cells
+
+        def lda_sub_brp(machine):
+            result = cells[x] - cells[y]
+            machine.minus_flag = result < 0
+            machine.accumulator = abs(result)
+            machine.counter = target if result >= 0 else start + 3
+
+            return 2
+
+        return lda_sub_brp
+
+    def _fuse_add_sta(self, start, y, z):
+        cells, stored, fallback = self._cells, self._barrier, self._singles[100 + y]
+
+        def add_sta(machine):
+            result = (-machine.accumulator if machine.minus_flag else machine.accumulator) + cells[y]
+
+            if not -999 <= result <= 999:
+                return fallback(machine)
+
+            machine.minus_flag = result < 0
+            machine.accumulator = result = abs(result)
+            cells[z] = result
+            machine.counter = start + 2
+            if stored is not None:
+                stored(z)
+
+            return 1
+
+        return add_sta
+
+    def _fuse_sub_sta(self, start, y, z):
+        cells, stored, fallback = self._cells, self._barrier, self._singles[200 + y]
+
+        def sub_sta(machine):
+            result = (-machine.accumulator if machine.minus_flag else machine.accumulator) - cells[y]
+
+            if not -999 <= result <= 999:
+                return fallback(machine)
+
+            machine.minus_flag = result < 0
+            machine.accumulator = result = abs(result)
+            cells[z] = result
+            machine.counter = start + 2
+            if stored is not None:
+                stored(z)
+
+            return 1
+
+        return sub_sta
+
+    def _fuse_lda_brz(self, start, x, target):
+        cells = self._cells
+
+        def lda_brz(machine):
+            machine.accumulator = value = cells[x]
+            machine.minus_flag = False
+            machine.counter = target if value == 0 else start + 2
+
+            return 1
+
+        return lda_brz
+
+    def run(self, max_cycles=None):
+        """
+        Run the machine until halt.
+
+        Args:
+            max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+
+        Raises:
+            UnknownOpcodeError: Raised when an unknown opcode is executed.
+
+        Returns:
+            obj: Instance of class:`RunResult`.
+        """
+        machine = self.machine
+        table, singles, cells = self._table, self._singles, self._cells
+        # Superinstructions run several cycles at once, the last cycles before
+        # `max_cycles` are executed one instruction at a time.
+        limit = None if max_cycles is None else max_cycles - (MAX_FUSED_LENGTH - 1)
+        cycles = 0
+        cls = unchecked(machine)
+
+        try:
+            if not self._lengths and self.accelerator is None:
+                # Nothing fused, run the table without counting extra cycles as the interpreter does.
+                while max_cycles is None or cycles < max_cycles:
+                    cycles += 1
+                    handler = table[machine.counter]
+                    machine.counter += 1
+                    handler(machine)
+
+            if self.accelerator is not None:
+                accelerate, headers = self.accelerator.accelerate, self.accelerator.headers
+
+                while limit is None or cycles < limit:
+                    counter = machine.counter
+
+                    if headers[counter]:
+                        skipped = accelerate(machine, None if limit is None else limit - cycles)
+
+                        if skipped:
+                            cycles += skipped
+                            continue
+
+                    handler = table[counter]
+                    cycles += 1
+                    machine.counter = counter + 1
+                    extra = handler(machine)
+
+                    if extra:
+                        cycles += extra
+
+            while limit is None or cycles < limit:
+                counter = machine.counter
+                handler = table[counter]
+                cycles += 1
+                machine.counter = counter + 1
+                extra = handler(machine)
+
+                if extra:
+                    cycles += extra
+
+            while cycles < max_cycles:
+                counter = machine.counter
+                handler = singles[cells[counter]]
+                cycles += 1
+                machine.counter = counter + 1
+                handler(machine)
+        except HaltSignal:
+            return RunResult(machine=machine, cycles=cycles, halted=True)
+        except IndexError:
+            # Only fetch can index out of range - counter ran past the last cell.
+            raise InvalidMachineOperationError(
+                "Cannot access memory cell number {}".format(machine.counter)
+            ) from None
+        finally:
+            machine.__class__ = cls
+            machine.outputs.flush()
+
+        return RunResult(machine=machine, cycles=cycles, halted=False)
+
+
+def run_fused(machine, max_cycles=None, accelerate=False):
+    """
+    Predecode and fuse program loaded in `machine` and run it in place.
+
+    Args:
+        machine (obj): Instance of class:`MachineState` with loaded program.
+        max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+        accelerate (bool): Whether to skip iterations of counted loops, see class:`FusedProgram`.
+
+    Returns:
+        obj: Instance of class:`RunResult`.
+    """
+    return FusedProgram(machine, accelerate=accelerate).run(max_cycles=max_cycles)
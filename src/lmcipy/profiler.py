@@ -0,0 +1,255 @@
+#! /usr/bin/env python
+
+from collections import Counter
+import time
+
+from .machine import HaltSignal, InvalidMachineOperationError, RunResult, unchecked
+
+
+OPCODE_CLASSES = {
+    0: 'HLT', 1: 'ADD', 2: 'SUB', 3: 'STA', 5: 'LDA', 6: 'BRA', 7: 'BRZ', 8: 'BRP',
+}
+
+
+def opcode_class(opcode):
+    """
+    Return mnemonic of the class `opcode` belongs to.
+
+    Args:
+        opcode (int): Opcode.
+
+    Returns:
+        str: Mnemonic, ``'???'`` for unknown opcodes.
+    """
+    if opcode == 901:
+        return 'INP'
+
+    if opcode == 902:
+        return 'OUT'
+
+    return OPCODE_CLASSES.get(opcode // 100, '???')
+
+
+def locate(address, labels):
+    """
+    Describe `address` relative to the closest preceding label, e.g. ``LOOP+2``.
+
+    Args:
+        address (int): Memory address.
+        labels (dict): Labels (label: address).
+
+    Returns:
+        str: Location, plain address when there is no preceding label.
+    """
+    best = None
+
+    for label, label_address in labels.items():
+        if label_address <= address and (best is None or label_address > best[1]):
+            best = label, label_address
+
+    if best is None:
+        return str(address)
+
+    label, label_address = best
+
+    return label if label_address == address else '{}+{}'.format(label, address - label_address)
+
+
+class Profile:
+    """
+    Execution profile collected by func:`run_profiled`.
+
+    A single profile can be used for several runs, counts are accumulated.
+
+    Attributes:
+        hits (list): Number of executions of each memory address.
+        opcodes (list): Number of executions of each opcode.
+        taken (list): Number of taken BRZ/BRP branches at each address.
+        not_taken (list): Number of not taken BRZ/BRP branches at each address.
+        edges (obj): ``collections.Counter`` of taken jumps (source address, target address).
+        cycles (int): Number of executed cycles.
+        wall_time (float): Seconds spent running.
+    """
+
+    def __init__(self, size=100):
+        self.hits = [0] * size
+        self.opcodes = [0] * 1000
+        self.taken = [0] * size
+        self.not_taken = [0] * size
+        self.edges = Counter()
+        self.cycles = 0
+        self.wall_time = 0.0
+
+    @property
+    def time_per_cycle(self):
+        """
+        Average wall-clock seconds per cycle.
+        """
+        return self.wall_time / self.cycles if self.cycles else 0.0
+
+    def classes(self):
+        """
+        Return number of executions of each opcode class, most frequent first.
+
+        Returns:
+            list: List of (mnemonic, count).
+        """
+        counts = Counter()
+
+        for opcode, count in enumerate(self.opcodes):
+            if count:
+                counts[opcode_class(opcode)] += count
+
+        return counts.most_common()
+
+    def hot_spots(self, labels=None, limit=10):
+        """
+        Rank addresses by number of executions.
+
+        Args:
+            labels (dict or None): Labels (label: address) used to describe addresses.
+            limit (int or None): Maximum number of returned addresses.
+
+        Returns:
+            list: List of (address, location, hits, share of all cycles).
+        """
+        labels = labels or {}
+        ranked = sorted((address for address, hits in enumerate(self.hits) if hits),
+                        key=lambda address: (-self.hits[address], address))
+
+        return [
+            (address, locate(address, labels), self.hits[address], self.hits[address] / self.cycles)
+            for address in ranked[:limit]
+        ]
+
+    def loops(self, labels=None):
+        """
+        Find loops, i.e. taken backward jumps, ranked by cycles spent in them.
+
+        Cycles of a loop are all executions of addresses between jump target and the jump,
+        so nested loops are counted in their outer loops as well.
+
+        Args:
+            labels (dict or None): Labels (label: address) used to describe addresses.
+
+        Returns:
+            list: List of (start location, end location, iterations, cycles).
+        """
+        labels = labels or {}
+        loops = [
+            (start, end, count, sum(self.hits[start:end + 1]))
+            for (end, start), count in self.edges.items()
+            if start <= end
+        ]
+        loops.sort(key=lambda loop: (-loop[3], loop[0]))
+
+        return [
+            (locate(start, labels), locate(end, labels), iterations, cycles)
+            for start, end, iterations, cycles in loops
+        ]
+
+    def report(self, labels=None, limit=10):
+        """
+        Render the profile as human-readable text.
+
+        Args:
+            labels (dict or None): Labels (label: address) used to describe addresses.
+            limit (int or None): Maximum number of addresses in hot-spot table.
+
+        Returns:
+            str: Report.
+        """
+        lines = [
+            'Cycles: {}'.format(self.cycles),
+            'Wall time: {:.6f} s ({:.3f} us/cycle)'.format(self.wall_time, self.time_per_cycle * 1e6),
+            '',
+            'Hot spots:',
+            '  {:>4}  {:<16} {:>10} {:>7}  {}'.format('addr', 'location', 'hits', 'share', 'branches'),
+        ]
+
+        for address, location, hits, share in self.hot_spots(labels, limit):
+            taken, not_taken = self.taken[address], self.not_taken[address]
+            branches = '{} taken / {} not'.format(taken, not_taken) if taken or not_taken else ''
+            lines.append('  {:>4}  {:<16} {:>10} {:>6.1%}  {}'.format(
+                address, location, hits, share, branches
+            ).rstrip())
+
+        lines += ['', 'Opcode classes:']
+        lines += ['  {:<4} {:>10}'.format(name, count) for name, count in self.classes()]
+
+        loops = self.loops(labels)
+        if loops:
+            lines += ['', 'Loops:']
+            lines += [
+                '  {} .. {}: {} iterations, {} cycles'.format(start, end, iterations, cycles)
+                for start, end, iterations, cycles in loops
+            ]
+
+        return '\n'.join(lines)
+
+
+def run_profiled(machine, profile, debug=False, max_cycles=None):
+    """
+    Run `machine` in place like func:`lmcipy.interpret.run`, recording every cycle
+    into `profile`.
+
+    Args:
+        machine (obj): Instance of class:`lmcipy.machine.MachineState`.
+        profile (obj): Instance of class:`Profile`.
+        debug (bool): Whether to print debug information for each cycle.
+        max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+
+    Raises:
+        UnknownOpcodeError: Raised when opcode is not found in `machine.opcodes_to_funcs`.
+
+    Returns:
+        obj: Instance of class:`lmcipy.machine.RunResult`.
+    """
+    decode = machine.decode_table
+    memory = machine.memory
+    hits, opcodes, taken, not_taken, edges = (
+        profile.hits, profile.opcodes, profile.taken, profile.not_taken, profile.edges
+    )
+    cycles = 0
+    halted = False
+    start = time.perf_counter()
+    cls = unchecked(machine)
+
+    try:
+        while max_cycles is None or cycles < max_cycles:
+            if debug:
+                print(machine)
+
+            pc = machine.counter
+            opcode = memory[pc]
+            cycles += 1
+            hits[pc] += 1
+            opcodes[opcode] += 1
+            machine.counter = pc + 1
+
+            if 600 <= opcode < 900:
+                # Decided by the condition, a branch to the next cell leaves the counter as is.
+                jump = opcode < 700 or (machine.accumulator == 0 if opcode < 800 else machine.minus_flag is False)
+                decode[opcode](machine)
+
+                if jump:
+                    edges[pc, machine.counter] += 1
+                    if opcode >= 700:
+                        taken[pc] += 1
+                else:
+                    not_taken[pc] += 1
+            else:
+                decode[opcode](machine)
+    except HaltSignal:
+        halted = True
+    except IndexError:
+        raise InvalidMachineOperationError(
+            "Cannot access memory cell number {}".format(machine.counter)
+        ) from None
+    finally:
+        machine.__class__ = cls
+        profile.cycles += cycles
+        profile.wall_time += time.perf_counter() - start
+        machine.outputs.flush()
+
+    return RunResult(machine=machine, cycles=cycles, halted=halted)
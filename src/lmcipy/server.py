@@ -0,0 +1,226 @@
+#! /usr/bin/env python
+
+import json
+import os
+import signal
+import socket
+import time
+
+from .budget import Budget
+from .cache import AssemblyCache, program_key
+from .channels import IterableInput, ListOutput
+from .client import DEFAULT_SOCKET
+from .interpret import load_opcodes, run_engine
+from .machine import MachineState
+from .util import load_program
+
+
+# Seconds a request may run when neither the request nor the server limits its cycles or time.
+DEFAULT_TIMEOUT = 10.0
+
+
+class Server:
+    """
+    Long-lived process running programs on request, so that callers do not pay for
+    interpreter startup, imports and assembly on every run.
+
+    The server listens on a Unix domain socket. Every connection sends requests as JSON
+    objects, one per line, and receives one JSON response line per request, see
+    func:`handle`. Assembled programs stay in an class:`lmcipy.cache.AssemblyCache`
+    between requests.
+
+    Args:
+        path (str): Path of the socket, a stale socket file is replaced.
+        cache_dir (str or None): Directory of on-disk assembly cache shared by workers.
+        maxsize (int): Maximum number of programs kept in memory.
+        budget (obj): Instance of class:`lmcipy.budget.Budget` used for requests without limits.
+                      Its cycles and time limit also apply to requests that limit neither.
+                      A worker serves one connection at a time, so when the budget bounds
+                      neither cycles nor time, requests stop after `DEFAULT_TIMEOUT` seconds
+                      instead of blocking the worker forever.
+
+    Attributes:
+        requests (int): Number of handled requests.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET, cache_dir=None, maxsize=256, budget=None):
+        self.path = path
+        self.cache = AssemblyCache(maxsize=maxsize, directory=cache_dir)
+        if budget is None:
+            budget = Budget()
+        if budget.cycles is None and budget.seconds is None:
+            budget = Budget(seconds=DEFAULT_TIMEOUT, outputs=budget.outputs, detect_loops=budget.detect_loops,
+                            check_interval=budget.check_interval)
+
+        self.budget = budget
+        self.requests = 0
+        self._listener = None
+
+    def _program(self, request):
+        if 'source' in request:
+            program = load_program(request['source'].splitlines())
+            key = program_key(program)
+            warm = self.cache.get(key) is not None
+
+            return key, self.cache.assemble(program), warm
+
+        assembled = self.cache.get(request.get('program', ''))
+        if assembled is None:
+            raise ValueError("Unknown program {}, send its source.".format(request.get('program')))
+
+        return request['program'], assembled, True
+
+    def _budget(self, request):
+        limits = ('max_cycles', 'timeout', 'max_outputs', 'detect_loops')
+
+        if all(request.get(limit) in (None, False) for limit in limits):
+            return self.budget
+
+        cycles, seconds = request.get('max_cycles'), request.get('timeout')
+        if cycles is None and seconds is None:
+            cycles, seconds = self.budget.cycles, self.budget.seconds
+
+        return Budget(cycles=cycles, seconds=seconds, outputs=request.get('max_outputs'),
+                      detect_loops=bool(request.get('detect_loops')))
+
+    def handle(self, request):
+        """
+        Run single request.
+
+        Args:
+            request (dict): Program as ``source`` (text of program) or ``program`` (key
+                            returned by earlier response), ``inputs`` (list of values) and
+                            optional ``engine``, ``max_cycles``, ``timeout``, ``max_outputs``
+                            and ``detect_loops`` as in ``lmc.py``.
+
+        Returns:
+            dict: Response with keys ``program`` (key of the program), ``outputs``, ``cycles``,
+                  ``halted``, ``error`` (``None`` or description of raised exception),
+                  ``warm`` (whether the program was already assembled) and ``elapsed``
+                  (seconds spent by the request).
+        """
+        start = time.perf_counter()
+        self.requests += 1
+        response = {'program': None, 'outputs': [], 'cycles': 0, 'halted': False, 'error': None, 'warm': False}
+
+        try:
+            key, (opcodes, labels), response['warm'] = self._program(request)
+            response['program'] = key
+
+            machine = MachineState(inputs=IterableInput(request.get('inputs', ())),
+                                   outputs=ListOutput(response['outputs']))
+            machine.labels = labels
+            machine = load_opcodes(machine=machine, opcodes=opcodes, copy=False)
+            result = run_engine(machine, engine=request.get('engine', 'interpreter'), budget=self._budget(request))
+
+            response['cycles'], response['halted'] = result.cycles, result.halted
+        except Exception as e:
+            response['error'] = "{}: {}".format(e.__class__.__name__, e)
+
+        response['elapsed'] = time.perf_counter() - start
+
+        return response
+
+    def handle_connection(self, connection):
+        """
+        Answer requests sent over `connection` until the client disconnects.
+        """
+        with connection, connection.makefile('rwb') as stream:
+            for line in stream:
+                try:
+                    response = self.handle(json.loads(line))
+                except ValueError as e:
+                    response = {'error': "Invalid request: {}".format(e)}
+
+                stream.write(json.dumps(response).encode() + b'\n')
+                stream.flush()
+
+    def listen(self):
+        """
+        Bind the socket. Called by func:`serve_forever` unless the server already listens.
+        """
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        self._listener.listen(128)
+
+    def _accept(self):
+        listener = self._listener
+
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                # Listener was closed by func:`close`.
+                return
+
+            try:
+                self.handle_connection(connection)
+            except OSError:
+                pass
+
+    def serve_forever(self, workers=1):
+        """
+        Serve connections until func:`close` is called or the process is interrupted.
+
+        Args:
+            workers (int): Number of processes accepting connections. With more than one
+                           worker the server preforks, every worker keeps its own warm
+                           programs, `cache_dir` lets them share assembled programs.
+        """
+        if self._listener is None:
+            self.listen()
+
+        if workers <= 1:
+            try:
+                self._accept()
+            finally:
+                self.close()
+            return
+
+        children = []
+
+        try:
+            for _ in range(workers):
+                pid = os.fork()
+
+                if pid == 0:
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    try:
+                        self._accept()
+                    finally:
+                        os._exit(0)
+
+                children.append(pid)
+
+            for _ in children:
+                os.wait()
+        finally:
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+            self.close()
+
+    def close(self):
+        """
+        Stop accepting connections and remove the socket.
+        """
+        if self._listener is None:
+            return
+
+        listener, self._listener = self._listener, None
+
+        try:
+            listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        listener.close()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
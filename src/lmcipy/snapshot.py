@@ -0,0 +1,188 @@
+#! /usr/bin/env python
+
+import struct
+
+from .channels import Channel, IterableInput, make_input, make_output
+from .machine import CLASSIC, MachineMemory, MachineState
+from .objfile import ObjectImage, encode_image
+
+
+SNAPSHOT_MAGIC = b'LMCS'
+SNAPSHOT_VERSION = 1
+
+# magic, version, counter, accumulator, minus flag, executed cycles, consumed inputs
+SNAPSHOT_HEADER = struct.Struct('<4sHHHBxQQ')
+
+
+class SnapshotFormatError(Exception):
+    """
+    Invalid or unsupported snapshot.
+    """
+
+
+class Snapshot:
+    """
+    Frozen state of a machine - registers, memory, labels and number of consumed inputs.
+
+    Memory is forked copy-on-write from the captured machine, so taking a snapshot and
+    creating machines from it does not copy any cells until they are stored into.
+    Channels are not part of the snapshot, they are supplied when the machine is recreated.
+
+    Args:
+        counter (int): Counter.
+        accumulator (int): Accumulator.
+        minus_flag (bool): Minus flag.
+        memory (obj): Instance of class:`lmcipy.machine.MachineMemory`, owned by the snapshot.
+        labels (dict): Labels (label: address).
+        cycles (int): Number of cycles executed before the snapshot was taken.
+        input_position (int): Number of input values consumed before the snapshot was taken.
+    """
+
+    def __init__(self, counter, accumulator, minus_flag, memory, labels, cycles=0, input_position=0):
+        self.counter = counter
+        self.accumulator = accumulator
+        self.minus_flag = minus_flag
+        self.memory = memory
+        self.labels = labels
+        self.cycles = cycles
+        self.input_position = input_position
+
+    @classmethod
+    def capture(cls, machine, cycles=0):
+        """
+        Take snapshot of `machine`, e.g. of a machine stopped by `max_cycles`.
+
+        Args:
+            machine (obj): Instance of class:`lmcipy.machine.MachineState`.
+            cycles (int): Number of cycles `machine` executed so far.
+
+        Raises:
+            ValueError: Raised for machine of extended profile, snapshots hold only classic
+                        memory and words.
+
+        Returns:
+            obj: Instance of class:`Snapshot`.
+        """
+        if machine.profile is not CLASSIC:
+            raise ValueError("Snapshot supports only the classic machine profile.")
+
+        return cls(
+            counter=machine.counter,
+            accumulator=machine.accumulator,
+            minus_flag=machine.minus_flag,
+            memory=machine.memory.fork(),
+            labels=dict(machine.labels),
+            cycles=cycles,
+            input_position=getattr(machine.inputs, 'position', 0),
+        )
+
+    def _machine(self, inputs, outputs):
+        machine = MachineState(inputs=inputs, outputs=make_output(outputs))
+        machine.counter = self.counter
+        machine.accumulator = self.accumulator
+        machine.minus_flag = self.minus_flag
+        machine.memory = self.memory.fork()
+        machine.labels = dict(self.labels)
+
+        return machine
+
+    def restore(self, inputs=None, outputs=None):
+        """
+        Recreate the machine with the same input stream it was run with.
+
+        Args:
+            inputs (obj): Complete input of the original run (see func:`lmcipy.channels.make_input`).
+                          Values consumed before the snapshot are skipped. Channels other than
+                          class:`lmcipy.channels.IterableInput` are used as they are.
+            outputs (obj): Destination of OUT (see func:`lmcipy.channels.make_output`).
+
+        Raises:
+            EOFError: Raised when `inputs` has fewer values than were consumed.
+
+        Returns:
+            obj: Instance of class:`lmcipy.machine.MachineState`.
+        """
+        channel = make_input(inputs)
+
+        if isinstance(channel, IterableInput) and not isinstance(inputs, Channel):
+            channel.skip(self.input_position)
+
+        return self._machine(channel, outputs)
+
+    def fork(self, inputs=None, outputs=None):
+        """
+        Create new machine continuing from the snapshot with different input.
+
+        Args:
+            inputs (obj): Values read after the snapshot (see func:`lmcipy.channels.make_input`).
+            outputs (obj): Destination of OUT (see func:`lmcipy.channels.make_output`).
+
+        Returns:
+            obj: Instance of class:`lmcipy.machine.MachineState`.
+        """
+        channel = make_input(inputs)
+
+        if isinstance(channel, IterableInput) and not isinstance(inputs, Channel):
+            # Keep numbering of consumed values continuous, so snapshots of the fork can be restored.
+            channel.position = self.input_position
+
+        return self._machine(channel, outputs)
+
+    def to_bytes(self):
+        """
+        Serialize the snapshot: `SNAPSHOT_HEADER` followed by object image of memory and
+        labels (see func:`lmcipy.objfile.encode_image`).
+
+        Returns:
+            bytes: Serialized snapshot.
+        """
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.counter, self.accumulator, self.minus_flag,
+            self.cycles, self.input_position
+        )
+
+        return header + encode_image(self.memory[:], self.labels)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Deserialize snapshot created by func:`to_bytes`.
+
+        Raises:
+            SnapshotFormatError: Raised when `data` is not a supported snapshot.
+
+        Returns:
+            obj: Instance of class:`Snapshot`.
+        """
+        if len(data) < SNAPSHOT_HEADER.size:
+            raise SnapshotFormatError("Snapshot is truncated.")
+
+        magic, version, counter, accumulator, minus_flag, cycles, input_position = \
+            SNAPSHOT_HEADER.unpack_from(data)
+
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotFormatError("Not an LMC snapshot.")
+
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotFormatError("Unsupported snapshot version {}.".format(version))
+
+        image = ObjectImage(memoryview(data)[SNAPSHOT_HEADER.size:])
+        memory = MachineMemory()
+        memory[0:len(image.cells)] = image.cells
+
+        return cls(counter, accumulator, bool(minus_flag), memory, image.labels, cycles, input_position)
+
+    def save(self, path):
+        """
+        Write serialized snapshot into file `path`.
+        """
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read snapshot written by func:`save`.
+        """
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
@@ -0,0 +1,490 @@
+#! /usr/bin/env python
+
+from collections import namedtuple
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .machine import HaltSignal, InvalidMachineOperationError, RunResult, unchecked
+from .profiler import locate, opcode_class
+
+
+TRACE_MAGIC = b'LMCT'
+TRACE_VERSION = 1
+
+# magic, version, size of record
+TRACE_HEADER = struct.Struct('<4sHH')
+# cycle, counter, opcode, accumulator, minus flag, stored address, previous value of stored cell
+RECORD = struct.Struct('<QHHHBxHH')
+NO_STORE = 0xFFFF
+
+# Columns of columnar traces, see func:`columns`.
+COLUMNS = ('cycle', 'counter', 'opcode', 'accumulator', 'minus_flag', 'address', 'value', 'old_value')
+
+
+TraceRecord = namedtuple(
+    'TraceRecord', ['cycle', 'counter', 'opcode', 'accumulator', 'minus_flag', 'address', 'old_value']
+)
+TraceRecord.__doc__ = """
+Single executed instruction. `accumulator` and `minus_flag` are values after the
+instruction, `address` and `old_value` describe memory cell overwritten by STA
+(``None`` for other instructions).
+"""
+
+
+class TraceFormatError(Exception):
+    """
+    Invalid or unsupported trace file.
+    """
+
+
+def parse_trigger(spec, labels=None):
+    """
+    Parse trigger of tracing.
+
+    Args:
+        spec (str): Cycle number (e.g. ``'1000'``) or ``'@'`` followed by address or label
+                    (e.g. ``'@12'``, ``'@LOOP'``).
+        labels (dict or None): Labels (label: address).
+
+    Raises:
+        ValueError: Raised for invalid `spec` or unknown label.
+
+    Returns:
+        tuple: ``('cycle', number)`` or ``('address', address)``.
+    """
+    if not spec.startswith('@'):
+        return 'cycle', int(spec)
+
+    target = spec[1:]
+
+    if target.isdigit():
+        return 'address', int(target)
+
+    if labels and target in labels:
+        return 'address', labels[target]
+
+    raise ValueError("Unknown trace trigger {}.".format(spec))
+
+
+def _record_dtype():
+    if np is None:
+        raise ImportError("Columnar traces require NumPy.")
+
+    # Same layout as `RECORD`, so records are viewed in place without unpacking.
+    return np.dtype({
+        'names': ['cycle', 'counter', 'opcode', 'accumulator', 'minus_flag', 'address', 'old_value'],
+        'formats': ['<u8', '<u2', '<u2', '<u2', 'u1', '<u2', '<u2'],
+        'offsets': [0, 8, 10, 12, 14, 16, 18],
+        'itemsize': RECORD.size,
+    })
+
+
+def columns(data, names=COLUMNS):
+    """
+    Convert packed records (see `RECORD`) into columns without creating objects per record.
+
+    Columns are `COLUMNS`: ``cycle`` (uint64), ``counter``, ``opcode`` and ``accumulator``
+    (uint16), ``minus_flag`` (bool) and ``address``, ``value`` and ``old_value`` (uint16)
+    of the cell written by STA. ``address`` is `NO_STORE` and ``value`` and ``old_value``
+    are 0 for other instructions.
+
+    Args:
+        data (bytes-like): Packed records.
+        names (iterable): Names of returned columns.
+
+    Raises:
+        ImportError: Raised when NumPy is not installed.
+
+    Returns:
+        dict: NumPy arrays (column: array).
+    """
+    records = np.frombuffer(data, dtype=_record_dtype())
+    result = {}
+
+    for name in names:
+        if name == 'minus_flag':
+            result[name] = records[name].astype(bool)
+        elif name == 'value':
+            result[name] = np.where(records['address'] != NO_STORE, records['accumulator'], 0).astype(np.uint16)
+        else:
+            result[name] = records[name].copy()
+
+    return result
+
+
+class TraceRecorder:
+    """
+    Recorder of executed instructions into fixed-size binary records (see `RECORD`).
+
+    Records are kept in a ring buffer holding last `capacity` records or, when `path` or
+    `sink` is given, streamed in chunks of `capacity` records into a trace file or, as
+    columns (see func:`columns`), into `sink`.
+
+    Args:
+        path (str or None): Path of trace file.
+        capacity (int): Size of ring buffer or chunk in records.
+        sample (int): Record only every `sample`-th instruction.
+        start (tuple or None): Trigger starting the recording (see func:`parse_trigger`),
+                               recording starts immediately when ``None``.
+        stop (tuple or None): Trigger stopping the recording, the instruction matching
+                              the trigger is the last recorded one.
+        sink (callable or None): Called with columns of every chunk of records, requires NumPy.
+
+    Attributes:
+        recorded (int): Number of recorded instructions.
+    """
+
+    def __init__(self, path=None, capacity=65536, sample=1, start=None, stop=None, sink=None):
+        if capacity < 1 or sample < 1:
+            raise ValueError("Capacity and sample must be positive.")
+
+        if sink is not None:
+            # Fail before the run when NumPy is missing.
+            _record_dtype()
+
+        self.capacity = capacity
+        self.sample = sample
+        self.start = start
+        self.stop = stop
+        self.recorded = 0
+        self.active = start is None
+        self.stopped = False
+
+        self._buffer = bytearray(capacity * RECORD.size)
+        self._seen = 0
+        self._file = None
+        self._sink = sink
+        self._streaming = path is not None or sink is not None
+        self._closed = False
+
+        if path is not None:
+            self._file = open(path, 'wb')
+            self._file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, RECORD.size))
+
+    @staticmethod
+    def _matches(trigger, cycle, counter):
+        kind, value = trigger
+
+        return cycle >= value if kind == 'cycle' else counter == value
+
+    def record(self, cycle, counter, opcode, machine, old_value=None):
+        """
+        Record instruction `opcode` at address `counter` executed in `cycle` on `machine`.
+
+        Args:
+            old_value (int or None): Value of cell overwritten by STA.
+        """
+        if not self.active:
+            if self.stopped or not self._matches(self.start, cycle, counter):
+                return
+
+            self.active = True
+
+        if self.stop is not None and self._matches(self.stop, cycle, counter):
+            self.active = False
+            self.stopped = True
+
+        self._seen += 1
+        if (self._seen - 1) % self.sample:
+            return
+
+        address = opcode - 300 if old_value is not None else NO_STORE
+        slot = self.recorded % self.capacity
+
+        RECORD.pack_into(
+            self._buffer, slot * RECORD.size,
+            cycle, counter, opcode, machine.accumulator, machine.minus_flag,
+            address, 0 if old_value is None else old_value
+        )
+        self.recorded += 1
+
+        if self._streaming and slot == self.capacity - 1:
+            self._emit(self._buffer)
+
+    def _emit(self, data):
+        if self._file is not None:
+            self._file.write(data)
+
+        if self._sink is not None and data:
+            self._sink(columns(data))
+
+    def _ordered(self):
+        if self._streaming:
+            raise ValueError("Records of streamed trace are read by func:`read_trace` or passed to sink.")
+
+        count = min(self.recorded, self.capacity)
+        split = (self.recorded % self.capacity) * RECORD.size
+
+        if count < self.capacity:
+            return self._buffer[:count * RECORD.size]
+
+        return self._buffer[split:] + self._buffer[:split]
+
+    def records(self):
+        """
+        Return records kept in the ring buffer, oldest first.
+
+        Returns:
+            list: List of class:`TraceRecord`.
+        """
+        return [_decode(fields) for fields in RECORD.iter_unpack(self._ordered())]
+
+    def arrays(self):
+        """
+        Return records kept in the ring buffer as columns, oldest first, see func:`columns`.
+
+        Returns:
+            dict: NumPy arrays (column: array).
+        """
+        return columns(self._ordered())
+
+    def save(self, path):
+        """
+        Write records kept in the ring buffer into trace file `path`.
+        """
+        with open(path, 'wb') as f:
+            f.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, RECORD.size))
+            f.write(self._ordered())
+
+    def close(self):
+        """
+        Write pending records of streamed trace and close the file.
+        """
+        if self._streaming and not self._closed:
+            self._closed = True
+            self._emit(self._buffer[:self.recorded % self.capacity * RECORD.size])
+
+            if self._file is not None:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _decode(fields):
+    cycle, counter, opcode, accumulator, minus_flag, address, old_value = fields
+
+    if address == NO_STORE:
+        address = old_value = None
+
+    return TraceRecord(cycle, counter, opcode, accumulator, bool(minus_flag), address, old_value)
+
+
+def _open_trace(path):
+    f = open(path, 'rb')
+    header = f.read(TRACE_HEADER.size)
+
+    try:
+        if len(header) < TRACE_HEADER.size:
+            raise TraceFormatError("{} is truncated.".format(path))
+
+        magic, version, size = TRACE_HEADER.unpack(header)
+
+        if magic != TRACE_MAGIC:
+            raise TraceFormatError("{} is not an LMC trace.".format(path))
+
+        if version != TRACE_VERSION or size != RECORD.size:
+            raise TraceFormatError("Unsupported trace version {}.".format(version))
+    except TraceFormatError:
+        f.close()
+        raise
+
+    return f
+
+
+def _read_chunks(f, chunk_records):
+    while True:
+        chunk = f.read(RECORD.size * chunk_records)
+        # Incomplete record at the end of interrupted recording is dropped.
+        chunk = chunk[:len(chunk) - len(chunk) % RECORD.size]
+
+        if not chunk:
+            break
+
+        yield chunk
+
+
+def read_trace(path):
+    """
+    Read records of trace file `path`.
+
+    Raises:
+        TraceFormatError: Raised when `path` is not a supported trace file.
+
+    Yields:
+        obj: Instance of class:`TraceRecord`.
+    """
+    with _open_trace(path) as f:
+        for chunk in _read_chunks(f, 4096):
+            for fields in RECORD.iter_unpack(chunk):
+                yield _decode(fields)
+
+
+def iter_trace_arrays(path, chunk_records=65536):
+    """
+    Read trace file `path` in chunks of columns, see func:`columns`. Memory use is bounded
+    by `chunk_records` regardless of the length of the trace.
+
+    Args:
+        path (str): Path of trace file.
+        chunk_records (int): Maximal number of records in chunk.
+
+    Raises:
+        TraceFormatError: Raised when `path` is not a supported trace file.
+        ImportError: Raised when NumPy is not installed.
+
+    Yields:
+        dict: NumPy arrays (column: array).
+    """
+    _record_dtype()
+
+    with _open_trace(path) as f:
+        for chunk in _read_chunks(f, chunk_records):
+            yield columns(chunk)
+
+
+def read_trace_arrays(path):
+    """
+    Read whole trace file `path` as columns, see func:`iter_trace_arrays`.
+
+    Returns:
+        dict: NumPy arrays (column: array).
+    """
+    _record_dtype()
+
+    with _open_trace(path) as f:
+        return columns(f.read())
+
+
+def export_npz(path, output, chunk_records=65536, compress=False):
+    """
+    Convert trace file `path` into NumPy archive `output` with one array per column
+    (see func:`columns`), loadable by ``numpy.load``.
+
+    Columns are streamed into the archive in chunks of `chunk_records` records, so traces
+    of arbitrarily long runs are converted without loading them into memory.
+
+    Args:
+        path (str): Path of trace file.
+        output (str): Path of ``.npz`` file.
+        chunk_records (int): Number of records converted at once.
+        compress (bool): Whether to compress the archive like ``numpy.savez_compressed``.
+
+    Raises:
+        TraceFormatError: Raised when `path` is not a supported trace file.
+        ImportError: Raised when NumPy is not installed.
+
+    Returns:
+        int: Number of exported records.
+    """
+    empty = columns(b'')
+
+    with _open_trace(path) as f:
+        f.seek(0, 2)
+        count = (f.tell() - TRACE_HEADER.size) // RECORD.size
+
+    # Imported here, zipfile alone takes longer to import than the rest of the package.
+    import zipfile
+
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+
+    with zipfile.ZipFile(output, 'w', compression=compression, allowZip64=True) as archive:
+        # Only one member can be written at a time, so the trace is read once per column.
+        for name in COLUMNS:
+            with _open_trace(path) as f, archive.open(name + '.npy', 'w', force_zip64=True) as member:
+                np.lib.format.write_array_header_1_0(member, {
+                    'descr': np.lib.format.dtype_to_descr(empty[name].dtype),
+                    'fortran_order': False,
+                    'shape': (count,),
+                })
+
+                for chunk in _read_chunks(f, chunk_records):
+                    member.write(columns(chunk, (name,))[name].tobytes())
+
+    return count
+
+
+def format_record(record, labels=None):
+    """
+    Render `record` as single human-readable line.
+
+    Args:
+        record (obj): Instance of class:`TraceRecord`.
+        labels (dict or None): Labels (label: address) used to describe addresses.
+
+    Returns:
+        str: Line.
+    """
+    labels = labels or {}
+    mnemonic = opcode_class(record.opcode)
+
+    if mnemonic in ('HLT', 'INP', 'OUT', '???'):
+        instruction = mnemonic if mnemonic != '???' else '??? {}'.format(record.opcode)
+    else:
+        instruction = '{} {}'.format(mnemonic, locate(record.opcode % 100, labels))
+
+    line = '{:>10}  {:>3} {:<12} {:<18} ACC={}{:03}'.format(
+        record.cycle, record.counter, locate(record.counter, labels), instruction,
+        '-' if record.minus_flag else ' ', record.accumulator
+    )
+
+    if record.address is not None:
+        line += '  [{}] {} -> {}'.format(record.address, record.old_value, record.accumulator)
+
+    return line
+
+
+def run_traced(machine, recorder, max_cycles=None):
+    """
+    Run `machine` in place like func:`lmcipy.interpret.run`, recording executed
+    instructions with `recorder`.
+
+    Args:
+        machine (obj): Instance of class:`lmcipy.machine.MachineState`.
+        recorder (obj): Instance of class:`TraceRecorder`.
+        max_cycles (int or None): Stop after this many cycles even if the machine did not halt.
+
+    Raises:
+        UnknownOpcodeError: Raised when opcode is not found in `machine.opcodes_to_funcs`.
+
+    Returns:
+        obj: Instance of class:`lmcipy.machine.RunResult`.
+    """
+    decode = machine.decode_table
+    memory = machine.memory
+    record = recorder.record
+    cycles = 0
+    halted = False
+    cls = unchecked(machine)
+
+    try:
+        while max_cycles is None or cycles < max_cycles:
+            counter = machine.counter
+            opcode = memory[counter]
+            old_value = memory[opcode - 300] if 300 <= opcode < 400 else None
+            cycles += 1
+            machine.counter = counter + 1
+
+            try:
+                decode[opcode](machine)
+            finally:
+                # Failing and halting instructions are recorded as well.
+                record(cycles, counter, opcode, machine, old_value)
+    except HaltSignal:
+        halted = True
+    except IndexError:
+        raise InvalidMachineOperationError(
+            "Cannot access memory cell number {}".format(machine.counter)
+        ) from None
+    finally:
+        machine.__class__ = cls
+        machine.outputs.flush()
+
+    return RunResult(machine=machine, cycles=cycles, halted=halted)
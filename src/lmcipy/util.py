@@ -7,6 +7,9 @@ from copy import deepcopy
 def copy_args(*args):
     """
     Forces function to use deepcopies of all arguments, partially imitating pass-by-value.
+
+    Callers that do not need their arguments preserved can pass ``copy=False`` to the
+    decorated function, which then receives the arguments as they are.
     """
     top_decorator_args = args
 
@@ -14,6 +17,9 @@ def copy_args(*args):
 
         @wraps(func)
         def wrapper(*args, **kwargs):
+            if not kwargs.pop('copy', True):
+                return func(*args, **kwargs)
+
             if not top_decorator_args:
                     return func(*deepcopy(args), **deepcopy(kwargs))
 
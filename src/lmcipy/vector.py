@@ -0,0 +1,277 @@
+#! /usr/bin/env python
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MEMORY_SIZE = 100
+
+# Instruction classes beyond opcode hundreds - counter past the last cell and stopped lane.
+KIND_COUNTER = 10
+KIND_STOPPED = 11
+
+ERROR_NONE = 0
+ERROR_UNKNOWN_OPCODE = 1
+ERROR_OVERFLOW = 2
+ERROR_INPUT_EXHAUSTED = 3
+ERROR_INVALID_INPUT = 4
+ERROR_COUNTER = 5
+
+ERRORS = {
+    ERROR_NONE: None,
+    ERROR_UNKNOWN_OPCODE: 'Unknown opcode.',
+    ERROR_OVERFLOW: 'Accumulator out of range 0 - 999.',
+    ERROR_INPUT_EXHAUSTED: 'Input exhausted.',
+    ERROR_INVALID_INPUT: 'Input value not in range 0 - 999.',
+    ERROR_COUNTER: 'Counter out of memory.',
+}
+
+
+class VectorResult:
+    """
+    Final state of all machines (lanes) run by func:`run_vectorized`.
+
+    Args:
+        counter (array): Counter of each lane.
+        accumulator (array): Accumulator of each lane.
+        minus_flag (array): Minus flag of each lane.
+        memory (array): N x 100 memory of all lanes.
+        cycles (array): Number of cycles executed by each lane.
+        halted (array): Whether lane executed HLT.
+        error (array): Error code of each lane, see `ERRORS`.
+        outputs (list): List of output values of each lane.
+    """
+
+    def __init__(self, counter, accumulator, minus_flag, memory, cycles, halted, error, outputs):
+        self.counter = counter
+        self.accumulator = accumulator
+        self.minus_flag = minus_flag
+        self.memory = memory
+        self.cycles = cycles
+        self.halted = halted
+        self.error = error
+        self.outputs = outputs
+
+    def __len__(self):
+        return len(self.counter)
+
+    def error_message(self, lane):
+        """
+        Return description of error of `lane` or ``None``.
+        """
+        return ERRORS[int(self.error[lane])]
+
+
+def _input_buffer(inputs):
+    lengths = np.array([len(values) for values in inputs], dtype=np.int64)
+    buffer = np.zeros((len(inputs), max(int(lengths.max(initial=0)), 1)), dtype=np.int64)
+
+    for lane, values in enumerate(inputs):
+        buffer[lane, :len(values)] = values
+
+    return buffer, lengths
+
+
+def run_vectorized(opcodes, inputs, max_cycles=None):
+    """
+    Run one program on many machines (lanes) at once, one lane per input vector.
+
+    All lanes are stepped together. Each step fetches the opcode of every lane, counts
+    lanes per instruction class and applies each class present to all lanes at once, with
+    results selected per lane by the class mask - there is no sorting or regrouping of
+    lanes, so lanes can take different branches, halt at different times and consume their
+    own inputs. Lanes that stopped are dropped from the arrays being stepped once they make
+    up a noticeable part of them. Arithmetic follows func:`lmcipy.machine.opc_add` and
+    func:`lmcipy.machine.opc_sub`: the accumulator holds magnitude of the result and
+    `minus_flag` its sign. A lane that fails stops with error code instead of raising.
+
+    On ``square.lmc`` with 20 random inputs per lane this is about 4x (1,000 lanes) to 9x
+    (20,000 lanes) faster than running func:`lmcipy.interpret.interpret_opcodes` once per
+    input vector. Lanes taking the same path gain more, about 18x with equal inputs.
+
+    Args:
+        opcodes (list): Assembled program, see func:`lmcipy.interpret.assemble`.
+        inputs (list): Sequence of input vectors, one per lane. Vectors can differ in length.
+        max_cycles (int or None): Stop after this many cycles even if some lanes did not halt.
+
+    Raises:
+        ImportError: Raised when NumPy is not installed.
+
+    Returns:
+        obj: Instance of class:`VectorResult`.
+    """
+    if np is None:
+        raise ImportError("The vectorized engine requires NumPy.")
+
+    lanes = len(inputs)
+    # Extra cell fetched by lanes whose counter ran past the memory.
+    image = np.zeros(MEMORY_SIZE + 1, dtype=np.int16)
+    image[:len(opcodes)] = opcodes
+    image[MEMORY_SIZE] = KIND_COUNTER * 100
+
+    # Final state of all lanes, filled in as lanes are dropped from the stepped arrays.
+    final_memory = np.tile(image, (lanes, 1))
+    final_counter = np.zeros(lanes, dtype=np.int64)
+    final_accumulator = np.zeros(lanes, dtype=np.int64)
+    final_minus_flag = np.zeros(lanes, dtype=bool)
+    final_cycles = np.zeros(lanes, dtype=np.int64)
+    final_halted = np.zeros(lanes, dtype=bool)
+    final_error = np.zeros(lanes, dtype=np.int8)
+    outputs = [[] for _ in range(lanes)]
+
+    # State of lanes being stepped, `ids` are their indexes among all lanes.
+    ids = np.arange(lanes)
+    memory = final_memory.copy()
+    counter = final_counter.copy()
+    accumulator = final_accumulator.copy()
+    minus_flag = final_minus_flag.copy()
+    cycles = final_cycles.copy()
+    halted = final_halted.copy()
+    error = final_error.copy()
+    live = np.ones(lanes, dtype=np.int8)
+    stopped = 0
+
+    in_buffer, in_length = _input_buffer(inputs)
+    in_position = np.zeros(lanes, dtype=np.int64)
+    out_buffer = np.zeros((lanes, 16), dtype=np.int16)
+    out_position = np.zeros(lanes, dtype=np.int64)
+
+    def stop(selected):
+        nonlocal stopped
+        stopped += len(selected)
+        live[selected] = 0
+
+    def fail(selected, code):
+        error[selected] = code
+        stop(selected)
+
+    def store(selected):
+        lane = ids[selected]
+        final_memory[lane] = memory[selected]
+        final_counter[lane] = counter[selected]
+        final_accumulator[lane] = accumulator[selected]
+        final_minus_flag[lane] = minus_flag[selected]
+        final_cycles[lane] = cycles[selected]
+        final_halted[lane] = halted[selected]
+        final_error[lane] = error[selected]
+
+        for index, original in zip(selected.tolist(), lane.tolist()):
+            outputs[original] = out_buffer[index, :out_position[index]].tolist()
+
+    # Decoding of opcodes including the one fetched past the memory.
+    kinds = np.arange(KIND_COUNTER * 100 + 1) // 100
+    operands = np.arange(KIND_COUNTER * 100 + 1) % 100
+    # Memory is indexed flat, one row of MEMORY_SIZE + 1 cells per lane.
+    cells, row = memory.reshape(-1), np.arange(0, memory.size, memory.shape[1])
+    step = 0
+
+    while max_cycles is None or step < max_cycles:
+        if stopped and stopped * 8 >= len(ids):
+            done = live == 0
+            store(np.flatnonzero(done))
+            keep = ~done
+            ids, memory, counter, accumulator, minus_flag, cycles, halted, error, live = (
+                array[keep] for array in (ids, memory, counter, accumulator, minus_flag, cycles, halted, error, live)
+            )
+            in_buffer, in_length, in_position, out_buffer, out_position = (
+                array[keep] for array in (in_buffer, in_length, in_position, out_buffer, out_position)
+            )
+            cells, row = memory.reshape(-1), np.arange(0, memory.size, memory.shape[1])
+            stopped = 0
+
+        if not len(ids):
+            break
+
+        step += 1
+        opcode = cells.take(row + counter).astype(np.intp)
+        kind, operand = kinds.take(opcode), operands.take(opcode)
+
+        if stopped:
+            kind[live == 0] = KIND_STOPPED
+
+        present = np.bincount(kind, minlength=KIND_STOPPED + 1)
+        counter += live
+        cycles += live
+
+        if present[1] or present[2] or present[5]:
+            value = cells.take(row + operand)
+
+        if present[1] or present[2]:
+            if not present[2]:
+                arithmetic = kind == 1
+                result = np.where(minus_flag, -accumulator, accumulator) + value
+            elif not present[1]:
+                arithmetic = kind == 2
+                result = np.where(minus_flag, -accumulator, accumulator) - value
+            else:
+                arithmetic = (kind == 1) | (kind == 2)
+                result = np.where(minus_flag, -accumulator, accumulator) + np.where(kind == 2, -value, value)
+
+            minus_flag = np.where(arithmetic, result < 0, minus_flag)
+            result = np.abs(result)
+            overflow = arithmetic & (result > 999)
+            accumulator = np.where(arithmetic & ~overflow, result, accumulator)
+
+            if overflow.any():
+                fail(np.flatnonzero(overflow), ERROR_OVERFLOW)
+
+        if present[5]:
+            load = kind == 5
+            accumulator = np.where(load, value, accumulator)
+            minus_flag &= ~load
+
+        if present[3]:
+            lane = np.flatnonzero(kind == 3)
+            cells[row[lane] + operand[lane]] = accumulator[lane]
+
+        if present[6] or present[7] or present[8]:
+            taken = kind == 6
+            if present[7]:
+                taken |= (kind == 7) & (accumulator == 0)
+            if present[8]:
+                taken |= (kind == 8) & ~minus_flag
+            counter = np.where(taken, operand, counter)
+
+        if present[0]:
+            lane = np.flatnonzero(kind == 0)
+            halted[lane] = True
+            stop(lane)
+
+        if present[4]:
+            fail(np.flatnonzero(kind == 4), ERROR_UNKNOWN_OPCODE)
+
+        if present[KIND_COUNTER]:
+            # Lanes fail before the fetch from outside the memory counts as a cycle.
+            lane = np.flatnonzero(kind == KIND_COUNTER)
+            counter[lane] -= 1
+            cycles[lane] -= 1
+            fail(lane, ERROR_COUNTER)
+
+        if present[9]:
+            lane = np.flatnonzero(kind == 9)
+            value = operand[lane]
+            inp, out = value == 1, value == 2
+            fail(lane[~(inp | out)], ERROR_UNKNOWN_OPCODE)
+
+            lane_in = lane[inp]
+            exhausted = in_position[lane_in] >= in_length[lane_in]
+            fail(lane_in[exhausted], ERROR_INPUT_EXHAUSTED)
+            lane_in = lane_in[~exhausted]
+            read = in_buffer[lane_in, in_position[lane_in]]
+            in_position[lane_in] += 1
+            invalid = (read < 0) | (read > 999)
+            fail(lane_in[invalid], ERROR_INVALID_INPUT)
+            accumulator[lane_in[~invalid]] = read[~invalid]
+
+            lane_out = lane[out]
+            if len(lane_out) and out_position[lane_out].max() >= out_buffer.shape[1]:
+                out_buffer = np.concatenate([out_buffer, np.zeros_like(out_buffer)], axis=1)
+            out_buffer[lane_out, out_position[lane_out]] = accumulator[lane_out]
+            out_position[lane_out] += 1
+
+    store(np.arange(len(ids)))
+
+    return VectorResult(final_counter, final_accumulator, final_minus_flag, final_memory[:, :MEMORY_SIZE],
+                        final_cycles, final_halted, final_error, outputs)
@@ -0,0 +1,65 @@
+#! /usr/bin/env python
+
+"""
+Helpers shared by the test modules, imported as ``from conftest import ...``.
+"""
+
+import os
+
+from lmcipy.channels import IterableInput, ListOutput
+from lmcipy.interpret import assemble, load_opcodes
+from lmcipy.machine import MachineState
+from lmcipy.util import load_program
+
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+EXAMPLES = os.path.join(ROOT, 'examples')
+
+
+def load(path):
+    """
+    Load program from file at `path` relative to the repository root.
+    """
+    with open(os.path.join(ROOT, path)) as f:
+        return load_program(f.readlines())
+
+
+def load_example(name):
+    """
+    Load program `name` from the examples directory.
+    """
+    return load(os.path.join('examples', name))
+
+
+def load_machine(opcodes, inputs=(), outputs=None):
+    """
+    Return machine with `opcodes` loaded, reading `inputs` and appending to list `outputs`.
+    """
+    machine = MachineState(inputs=IterableInput(inputs), outputs=ListOutput(outputs))
+
+    return load_opcodes(machine=machine, opcodes=opcodes, copy=False)
+
+
+def start(program, inputs=(), outputs=None):
+    """
+    Return machine with assembled `program` loaded, see func:`load_machine`.
+    """
+    opcodes, labels = assemble(program)
+    machine = load_machine(opcodes, inputs, outputs)
+    machine.labels = labels
+
+    return machine
+
+
+def registers(machine):
+    """
+    Return registers and memory of `machine` for comparison.
+    """
+    return machine.counter, machine.accumulator, machine.minus_flag, machine.memory[:]
+
+
+def state(machine):
+    """
+    Return registers, memory and outputs of `machine` for comparison.
+    """
+    return registers(machine) + (list(machine.outputs.values),)
@@ -0,0 +1,105 @@
+#! /usr/bin/env python
+
+import pytest
+
+from lmcipy.accelerate import LinearExpression, first_change, first_negative, summarize_loop
+from lmcipy.interpret import assemble, run_engine
+from lmcipy.machine import InvalidMachineOperationError
+from lmcipy.optimize import FusedProgram
+
+from conftest import load, start, state
+
+
+PROGRAMS = [
+    ('examples/countdown.lmc', [20]),
+    ('examples/fib.lmc', [600]),
+    ('examples/square.lmc', [3, 12, 31, 0]),
+    ('examples/quine.lmc', []),
+    ('examples/test.lmc', [7, 3]),
+    ('benchmarks/workloads/nested.lmc', [5, 7]),
+    ('benchmarks/workloads/nested.lmc', [30, 999]),
+    ('benchmarks/workloads/selfmod.lmc', [3]),
+]
+
+# Counts up from 0 by STEP until reaching LIMIT, overflows when LIMIT is not reachable.
+COUNT_UP = [['LOOP', 'LDA', 'X'], ['ADD', 'STEP'], ['STA', 'X'], ['SUB', 'LIMIT'], ['BRZ', 'END'],
+            ['BRA', 'LOOP'], ['END', 'HLT'], ['X', 'DAT'], ['STEP', 'DAT', '3'], ['LIMIT', 'DAT', '900']]
+
+
+@pytest.mark.parametrize('path,inputs', PROGRAMS)
+def test_accelerated_matches_interpreter(path, inputs):
+    program = load(path)
+
+    expected_machine = start(program, inputs)
+    expected = run_engine(expected_machine)
+    machine = start(program, inputs)
+    result = run_engine(machine, engine='accelerated')
+
+    assert (result.cycles, result.halted) == (expected.cycles, expected.halted)
+    assert state(machine) == state(expected_machine)
+
+
+@pytest.mark.parametrize('max_cycles', [0, 1, 5, 17, 100, 1001, 5000, 12345])
+def test_accelerated_max_cycles_exact(max_cycles):
+    program = load('benchmarks/workloads/nested.lmc')
+
+    expected_machine = start(program, [10, 500])
+    expected = run_engine(expected_machine, max_cycles=max_cycles)
+    machine = start(program, [10, 500])
+    result = run_engine(machine, engine='accelerated', max_cycles=max_cycles)
+
+    assert (result.cycles, result.halted) == (expected.cycles, expected.halted)
+    assert state(machine) == state(expected_machine)
+
+
+def test_counted_loop_is_skipped():
+    machine = start(load('benchmarks/workloads/nested.lmc'), [1, 999])
+    program = FusedProgram(machine, accelerate=True)
+
+    result = program.run()
+
+    assert result.halted
+    assert program.accelerator.accelerated > 990
+
+
+@pytest.mark.parametrize('limit,error', [(900, False), (901, True)])
+def test_accelerated_overflow(limit, error):
+    program = [line if line[0] != 'LIMIT' else ['LIMIT', 'DAT', str(limit)] for line in COUNT_UP]
+
+    results = []
+    for engine in ('interpreter', 'accelerated'):
+        machine = start(program, [])
+        try:
+            results.append((run_engine(machine, engine=engine).cycles, state(machine)))
+        except InvalidMachineOperationError as e:
+            assert error
+            results.append((str(e), state(machine)))
+
+    assert results[0] == results[1]
+
+
+def test_summarize_loop():
+    opcodes, labels = assemble(COUNT_UP)
+    cells = opcodes + [0] * (100 - len(opcodes))
+    summary = summarize_loop(cells, labels['LOOP'])
+
+    assert summary.length == 6
+    assert summary.steps(cells) == {labels['X']: 3}
+    # The 300th iteration leaves the loop through BRZ END.
+    assert summary.iterations(cells) == 299
+
+    # Loops with I/O are not summarized.
+    opcodes, labels = assemble(load('examples/countdown.lmc'))
+    assert summarize_loop(opcodes + [0] * (100 - len(opcodes)), labels['LOOP']) is None
+
+
+def test_closed_form_helpers():
+    assert first_negative(10, -3) == 4
+    assert first_negative(10, 0) == float('inf')
+    assert first_negative(-1, 5) == 0
+    assert first_change(10, -2, zero=False) == 5
+    assert first_change(10, -3, zero=False) == float('inf')
+    assert first_change(0, 1, zero=True) == 1
+
+    expression = LinearExpression.cell(3).combine(LinearExpression(5), -1)
+    assert expression.at([0, 0, 0, 20], {3: 2}, 4) == (23, 2)
@@ -0,0 +1,81 @@
+#! /usr/bin/env python
+
+from lmcipy.analysis import CODE, DATA, UNUSED, analyze, predecode, successors
+from lmcipy.interpret import assemble, interpret
+from lmcipy.machine import EXTENDED
+from lmcipy.optimize import FusedProgram
+
+from conftest import load_example, load_machine
+
+
+def test_successors():
+    assert successors(4, 105) == (5,)
+    assert successors(4, 610) == (10,)
+    assert successors(4, 710) == (5, 10)
+    assert successors(4, 805) == (5,)
+    assert successors(4, 902) == (5,)
+    assert successors(4, 0) == successors(4, 903) == successors(4, 400) == ()
+
+
+def test_analyze_countdown():
+    opcodes, labels = assemble(load_example('countdown.lmc'))
+    analysis = analyze(opcodes)
+
+    assert not analysis.self_modifying
+    assert analysis.kind(0) == CODE
+    assert all(analysis.kind(address) == DATA for address in analysis.stored)
+    assert analysis.kind(99) == UNUSED
+    assert analysis.blocks()[0][0] == 0
+
+
+def test_analyze_quine():
+    opcodes, labels = assemble(load_example('quine.lmc'))
+    analysis = analyze(opcodes)
+
+    assert analysis.self_modifying
+    assert labels['LOAD'] in analysis.code & analysis.stored
+    assert labels['ONE'] in analysis.code and labels['ONE'] in analysis.loaded
+
+
+def test_blocks():
+    # 0: INP, 1: BRZ 4, 2: OUT, 3: BRA 0, 4: HLT
+    analysis = analyze([901, 704, 902, 600, 0])
+
+    assert analysis.blocks() == [(0, 1), (2, 3), (4, 4)]
+    assert analysis.edges[1] == (2, 4)
+
+
+def test_unreachable_stores_are_not_code():
+    # Stores into cell 5, which is never executed, and halts.
+    opcodes = [503, 305, 0, 7, 0, 600]
+
+    assert not analyze(opcodes).self_modifying
+    assert analyze(opcodes, entry=5).self_modifying
+    assert predecode(load_machine(opcodes)) is not None
+
+
+def test_predecode():
+    assert predecode(load_machine(assemble(load_example('quine.lmc'))[0])) is None
+    assert predecode(EXTENDED.new_machine()) is None
+
+    machine = load_machine([0])
+    machine.counter = 100
+    assert predecode(machine) is None
+
+
+def test_fused_program_immutable():
+    assert FusedProgram(load_machine(assemble(load_example('countdown.lmc'))[0])).immutable
+    assert not FusedProgram(load_machine(assemble(load_example('quine.lmc'))[0])).immutable
+
+
+def test_self_modifying_program_still_correct():
+    program = load_example('quine.lmc')
+
+    expected = interpret(program, inputs=[], outputs=[])
+
+    for engine in ('interpreter', 'fused', 'accelerated'):
+        outputs = []
+        result = interpret(program, inputs=[], outputs=outputs, engine=engine)
+
+        assert outputs == assemble(load_example('quine.lmc'))[0]
+        assert result.cycles == expected.cycles
@@ -0,0 +1,169 @@
+#! /usr/bin/env python
+
+import glob
+import os
+import random
+
+import pytest
+
+from lmcipy.assembler import SyntaxError, IncrementalAssembler, assemble_stream, assemble_tokens, tokenize_lines
+from lmcipy.interpret import generate_opcodes, process_labels
+from lmcipy.machine import MachineState
+from lmcipy.util import load_program
+
+from conftest import EXAMPLES
+
+
+@pytest.mark.parametrize('path', sorted(glob.glob(os.path.join(EXAMPLES, '*.lmc'))))
+def test_assemble_stream_matches_multipass(path):
+    with open(path) as f:
+        lines = f.readlines()
+
+    machine, program = process_labels(machine=MachineState(), program=load_program(lines))
+    expected = generate_opcodes(machine=machine, program=program), machine.labels
+
+    assert assemble_stream(iter(lines)) == expected
+
+
+def test_tokenize_lines():
+    assert list(tokenize_lines(['  LDA X // load\n', '// only comment', 'OUT//attached'])) == [
+        ['LDA', 'X'], [], ['OUT']
+    ]
+
+
+def test_assemble_forward_references():
+    opcodes, labels = assemble_stream(line for line in [
+        'BRA END', 'LDA ONE', 'END HLT', 'ONE DAT 1', 'SUB ONE'
+    ])
+
+    assert opcodes == [602, 503, 0, 1, 203]
+    assert labels == {'END': 2, 'ONE': 3}
+
+
+def test_assemble_unknown_label():
+    with pytest.raises(SyntaxError) as e:
+        assemble_tokens([['LDA', 'X'], ['HLT'], ['BRA', 'Y']])
+
+    assert e.value.line_num in (0, 2)
+
+
+def test_assemble_number_like_label():
+    with pytest.raises(SyntaxError):
+        assemble_tokens([['LDA', '12'], ['12', 'DAT', '5']])
+
+
+def test_assemble_duplicate_label():
+    with pytest.raises(SyntaxError):
+        assemble_tokens([['X', 'DAT'], ['X', 'DAT']])
+
+
+def test_assemble_invalid_forward_reference():
+    with pytest.raises(SyntaxError):
+        assemble_tokens([['INP', 'X'], ['X', 'DAT']])
+
+
+def test_assemble_unknown_mnemonic():
+    with pytest.raises(SyntaxError):
+        assemble_tokens([['X', 'FOO', '1']])
+
+
+def test_generate_opcodes_unknown_label():
+    with pytest.raises(SyntaxError):
+        generate_opcodes(machine=MachineState(), program=[['LDA', 'NOWHERE']])
+
+
+def full_assembly(lines):
+    try:
+        return assemble_tokens(tokenize_lines(lines))
+    except SyntaxError as e:
+        return e.line_num, e.msg
+
+
+def incremental_assembly(assembler):
+    try:
+        return assembler.assemble()
+    except SyntaxError as e:
+        assert (e.line_num, e.msg) in [(error.line_num, error.msg) for error in assembler.diagnostics()]
+        return e.line_num, e.msg
+
+
+@pytest.mark.parametrize('path', sorted(glob.glob(os.path.join(EXAMPLES, '*.lmc'))))
+def test_incremental_assembler_matches_full(path):
+    with open(path) as f:
+        lines = f.read().splitlines()
+
+    assembler = IncrementalAssembler(lines)
+
+    assert assembler.assemble() == assemble_stream(lines)
+    assert assembler.diagnostics() == []
+
+
+def test_incremental_assembler_random_edits():
+    rng = random.Random(4)
+    pool = ['LOOP LDA X', 'SUB ONE', 'STA X', 'BRP LOOP', 'BRZ END', 'OUT', 'END HLT', 'X DAT 5',
+            'ONE DAT 1', 'LDA Y', 'Y DAT', 'LOOP OUT', '', '12 DAT', 'ADD 1 2', 'FOO BAR']
+    lines = ['LOOP LDA X', 'OUT', 'SUB ONE', 'BRP LOOP', 'HLT', 'X DAT 3', 'ONE DAT 1']
+    assembler = IncrementalAssembler(lines)
+
+    for _ in range(500):
+        action = rng.randrange(3)
+        index = rng.randrange(len(lines) + (action == 1)) if lines else 0
+        text = rng.choice(pool)
+
+        if action == 0 and lines:
+            lines[index] = text
+            assembler.set_line(index, text)
+        elif action == 1 or not lines:
+            lines.insert(index, text)
+            assembler.insert_line(index, text)
+        else:
+            del lines[index]
+            assembler.delete_line(index)
+
+        assert incremental_assembly(assembler) == full_assembly(lines)
+
+
+@pytest.mark.parametrize('lines', [
+    ['DAT LOOP', 'BRA'],
+    ['INP X', 'LDA Y', 'X DAT', 'Y DAT 1 2'],
+    ['LDA MISSING', 'BRA LOOP', 'LOOP FOO 1'],
+    ['BRA LATER', 'X DAT', 'X DAT', 'LATER INP LATER'],
+])
+def test_incremental_assembler_error_order(lines):
+    assert incremental_assembly(IncrementalAssembler(lines)) == full_assembly(lines)
+
+
+def test_incremental_assembler_diagnostics():
+    assembler = IncrementalAssembler(['LDA X', 'X DAT', 'X DAT', 'BRA MISSING'])
+
+    assert [(e.line_num, e.msg) for e in assembler.diagnostics()] == [
+        (2, 'Label defined twice. Label: X'),
+        (3, 'Unknown label. Label: MISSING'),
+    ]
+
+    assembler.delete_line(1)
+    assembler.set_line(2, 'MISSING BRA MISSING')
+
+    assert assembler.diagnostics() == []
+    assert assembler.assemble() == ([501, 0, 602], {'X': 1, 'MISSING': 2})
+
+
+def test_incremental_assembler_updates_only_dependents(monkeypatch):
+    lines = ['LDA X'] + ['OUT'] * 50 + ['X DAT 7', 'Y DAT', 'LDA Y']
+    assembler = IncrementalAssembler(lines)
+    encoded = []
+    encode = assembler._encode
+    monkeypatch.setattr(assembler, '_encode', lambda line: encoded.append(line.address) or encode(line))
+
+    assembler.set_line(20, 'ADD X')
+    assert sorted(encoded) == [20]
+
+    encoded.clear()
+    assembler.set_line(51, 'Z DAT 7')
+    assert sorted(encoded) == [0, 20, 51]
+
+    encoded.clear()
+    assembler.insert_line(52, 'OUT')
+    assert sorted(encoded) == [52, 53, 54]
+    assert assembler.labels == {'Z': 51, 'Y': 53}
+    assert [e.line_num for e in assembler.diagnostics()] == [0, 20]
@@ -0,0 +1,40 @@
+#! /usr/bin/env python
+
+from lmcipy.batch import run_batch
+
+
+PROGRAMS = {
+    'sub': ['INP', 'STA FIRST', 'INP', 'STA SECOND', 'LDA FIRST', 'SUB SECOND', 'OUT', 'HLT',
+            'FIRST DAT', 'SECOND DAT'],
+    'loop': ['LOOP BRA LOOP'],
+}
+
+
+def test_run_batch():
+    jobs = [(num, 'sub', [num, 1]) for num in range(1, 50)]
+
+    results = sorted(run_batch(PROGRAMS, jobs, workers=2, chunksize=8), key=lambda r: r['id'])
+
+    assert [r['outputs'] for r in results] == [[num - 1] for num in range(1, 50)]
+    assert all(r['halted'] and r['cycles'] == 8 and r['error'] is None for r in results)
+
+
+def test_run_batch_errors():
+    jobs = [('short', 'sub', [1]), ('loop', 'loop', [])]
+
+    results = {r['id']: r for r in run_batch(PROGRAMS, jobs, workers=1, max_cycles=1000)}
+
+    assert results['short']['error'] == 'EOFError: Input exhausted.'
+    assert results['loop']['error'] is None
+    assert not results['loop']['halted']
+    assert results['loop']['cycles'] == 1000
+
+
+def test_run_batch_memoize(tmpdir):
+    jobs = [(num, 'sub', [num % 3, 1]) for num in range(20)] + [('short', 'sub', [1])]
+
+    results = {r['id']: r for r in run_batch(PROGRAMS, jobs, workers=1, cache_dir=str(tmpdir), memoize=True)}
+
+    assert [results[num]['outputs'] for num in range(20)] == [[num % 3 - 1 if num % 3 else 1] for num in range(20)]
+    assert all(results[num]['cycles'] == 8 for num in range(20))
+    assert results['short']['error'] == 'EOFError: Input exhausted.'
@@ -0,0 +1,131 @@
+#! /usr/bin/env python
+
+import importlib
+
+import pytest
+
+from lmcipy.batch import run_batch
+from lmcipy.budget import Budget, BudgetExceeded, InfiniteLoopError
+from lmcipy.interpret import interpret
+
+from conftest import load_example
+
+
+# The package exports function of the same name.
+interpret_module = importlib.import_module('lmcipy.interpret')
+
+
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_budget_allows_halting_run(engine):
+    outputs = []
+    expected = interpret(program=load_example('fib.lmc'), inputs=[300], outputs=[])
+    budget = Budget(cycles=expected.cycles, seconds=10, outputs=100, check_interval=7)
+
+    result = interpret(program=load_example('fib.lmc'), inputs=[300], outputs=outputs, engine=engine,
+                       budget=budget)
+
+    assert result.halted
+    assert result.cycles == expected.cycles
+    assert outputs[-1] == 233
+
+
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_cycle_budget(engine):
+    with pytest.raises(BudgetExceeded) as e:
+        interpret(program=[['LOOP', 'BRA', 'LOOP']], engine=engine, budget=Budget(cycles=1000))
+
+    assert e.value.resource == 'cycles'
+
+
+@pytest.mark.parametrize('engine,name', [
+    ('compiled', 'CompiledProgram'),
+    ('fused', 'FusedProgram'),
+    ('accelerated', 'FusedProgram'),
+    ('interpreter', 'predecode'),
+])
+def test_budget_resumes_engine(monkeypatch, engine, name):
+    created = []
+    setup = getattr(interpret_module, name)
+
+    def counting_setup(*args, **kwargs):
+        created.append(name)
+        return setup(*args, **kwargs)
+
+    monkeypatch.setattr(interpret_module, name, counting_setup)
+    expected = interpret(program=load_example('fib.lmc'), inputs=[600], outputs=[])
+    created.clear()
+
+    result = interpret(program=load_example('fib.lmc'), inputs=[600], outputs=[], engine=engine,
+                       budget=Budget(cycles=expected.cycles, check_interval=7))
+
+    assert result.halted
+    assert result.cycles == expected.cycles
+    assert created == [name]
+
+
+def test_time_budget():
+    with pytest.raises(BudgetExceeded) as e:
+        interpret(program=[['LOOP', 'BRA', 'LOOP']], budget=Budget(seconds=0.01, check_interval=100))
+
+    assert e.value.resource == 'seconds'
+
+
+def test_output_budget():
+    outputs = []
+
+    with pytest.raises(BudgetExceeded) as e:
+        interpret(program=load_example('countdown.lmc'), inputs=[50], outputs=outputs, budget=Budget(outputs=10))
+
+    assert e.value.resource == 'outputs'
+    assert outputs == list(range(50, 40, -1))
+
+
+@pytest.mark.parametrize('program', [
+    [['LOOP', 'BRA', 'LOOP']],
+    [['LOOP', 'LDA', 'ONE'], ['OUT'], ['BRA', 'LOOP'], ['ONE', 'DAT', '1']],
+    # Counter cycling through 0 - 9 forever, memory changes within the loop.
+    [['LOOP', 'LDA', 'X'], ['ADD', 'ONE'], ['STA', 'X'], ['SUB', 'TEN'], ['BRZ', 'RESET'], ['BRA', 'LOOP'],
+     ['RESET', 'STA', 'X'], ['BRA', 'LOOP'], ['X', 'DAT'], ['ONE', 'DAT', '1'], ['TEN', 'DAT', '10']],
+])
+def test_detect_infinite_loop(program):
+    with pytest.raises(InfiniteLoopError):
+        interpret(program=program, outputs=[], budget=Budget(cycles=100000, detect_loops=True))
+
+
+def test_detect_loops_does_not_stop_halting_programs():
+    outputs = []
+    expected = interpret(program=load_example('square.lmc'), inputs=[3, 12, 31, 0], outputs=[])
+
+    result = interpret(program=load_example('square.lmc'), inputs=[3, 12, 31, 0], outputs=outputs,
+                       budget=Budget(detect_loops=True, check_interval=13))
+
+    assert result.halted
+    assert result.cycles == expected.cycles
+    assert outputs == [9, 144, 961]
+
+
+def test_detect_loops_resets_on_input():
+    # Same state is reached before every INP, but the program halts once input is 0.
+    program = [['LOOP', 'INP'], ['BRZ', 'END'], ['LDA', 'ZERO'], ['BRA', 'LOOP'], ['END', 'HLT'], ['ZERO', 'DAT']]
+
+    result = interpret(program=program, inputs=[1] * 100 + [0], budget=Budget(detect_loops=True))
+
+    assert result.halted
+
+
+def test_budget_invalid_combinations():
+    with pytest.raises(ValueError):
+        interpret(program=[['HLT']], engine='compiled', budget=Budget(detect_loops=True))
+
+    with pytest.raises(ValueError):
+        interpret(program=[['HLT']], max_cycles=10, budget=Budget(cycles=10))
+
+
+def test_batch_budget():
+    programs = {'loop': ['LOOP BRA LOOP'], 'halt': ['HLT']}
+    jobs = [('loop', 'loop', []), ('halt', 'halt', [])]
+
+    results = {r['id']: r for r in run_batch(programs, jobs, workers=1, budget=Budget(detect_loops=True))}
+
+    assert results['loop']['error'].startswith('InfiniteLoopError')
+    assert results['halt']['halted'] and results['halt']['error'] is None
@@ -0,0 +1,191 @@
+#! /usr/bin/env python
+
+import itertools
+import json
+import os
+
+import pytest
+
+from lmcipy import cache as cache_module
+from lmcipy.budget import Budget, BudgetExceeded
+from lmcipy.cache import AssemblyCache, ResultCache, program_key, run_key
+from lmcipy.channels import IterableInput
+from lmcipy.interpret import assemble, interpret
+
+
+PROGRAM = [
+    ['LDA', 'ONE'],
+    ['ADD', 'ONE'],
+    ['HLT'],
+    ['ONE', 'DAT', '1'],
+]
+
+ECHO = [
+    ['LOOP', 'INP'],
+    ['BRZ', 'END'],
+    ['OUT'],
+    ['STA', 'LAST'],
+    ['BRA', 'LOOP'],
+    ['END', 'HLT'],
+    ['LAST', 'DAT'],
+]
+
+
+def test_program_key():
+    assert program_key(PROGRAM) == program_key([list(line) for line in PROGRAM])
+    assert program_key(PROGRAM) != program_key(PROGRAM[:3])
+    assert program_key([['A', 'B']]) != program_key([['AB']])
+
+
+def test_assembly_cache_memory():
+    cache = AssemblyCache(maxsize=1)
+
+    assert cache.assemble(PROGRAM) == assemble(PROGRAM)
+    assert cache.assemble(PROGRAM) == assemble(PROGRAM)
+    cache.assemble([['HLT']])
+
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(cache) == 1
+
+
+def test_assembly_cache_generator():
+    cache = AssemblyCache()
+
+    assert cache.assemble(line for line in PROGRAM) == assemble(PROGRAM)
+    assert cache.assemble(iter(PROGRAM)) == assemble(PROGRAM)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_assembly_cache_disk(tmpdir):
+    AssemblyCache(directory=str(tmpdir)).assemble(PROGRAM)
+    cache = AssemblyCache(directory=str(tmpdir))
+
+    assert cache.assemble(PROGRAM) == assemble(PROGRAM)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_assembly_cache_stale_entry(tmpdir, monkeypatch):
+    AssemblyCache(directory=str(tmpdir)).assemble(PROGRAM)
+    path = os.path.join(str(tmpdir), program_key(PROGRAM)[:2], program_key(PROGRAM) + '.json')
+
+    with open(path) as f:
+        entry = json.load(f)
+    entry['version'] = cache_module.CACHE_VERSION - 1
+    entry['opcodes'] = [0]
+    with open(path, 'w') as f:
+        json.dump(entry, f)
+
+    cache = AssemblyCache(directory=str(tmpdir))
+
+    assert cache.assemble(PROGRAM) == assemble(PROGRAM)
+    assert cache.misses == 1
+
+
+def test_interpret_with_cache():
+    cache = AssemblyCache()
+
+    interpret(program=PROGRAM, cache=cache)
+    result = interpret(program=PROGRAM, cache=cache)
+
+    assert result.machine.accumulator == 2
+    assert cache.hits == 1
+
+
+def test_run_key():
+    assert run_key([901, 0], [1, 2]) == run_key((901, 0), (1, 2))
+    assert run_key([901, 0], [1, 2]) != run_key([901, 0], [12])
+    assert run_key([901, 0], [1]) != run_key([901, 0], [1], max_cycles=10)
+
+
+def test_result_cache_memory():
+    cache = ResultCache(maxsize=1)
+    opcodes, labels = assemble(ECHO)
+    first, second = [], []
+
+    expected = cache.run(opcodes, labels, inputs=[5, 7, 0], outputs=first)
+    result = cache.run(opcodes, labels, inputs=[5, 7, 0], outputs=second)
+
+    assert first == second == [5, 7]
+    assert (result.cycles, result.halted) == (expected.cycles, True)
+    assert result.machine.memory[:] == expected.machine.memory[:]
+    assert result.machine.counter == expected.machine.counter
+    assert result.machine.labels == labels
+    assert result.machine.inputs.position == 3
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.run(opcodes, labels, inputs=[0], outputs=[])
+    cache.run(opcodes, labels, inputs=[5, 7, 0], outputs=[])
+
+    assert (cache.hits, cache.misses, len(cache)) == (1, 3, 1)
+
+
+def test_result_cache_disk(tmpdir):
+    opcodes, labels = assemble(ECHO)
+    ResultCache(directory=str(tmpdir)).run(opcodes, labels, inputs=['3 0'], outputs=[])
+    cache = ResultCache(directory=str(tmpdir))
+    outputs = []
+
+    result = cache.run(opcodes, labels, inputs=[3, 0], outputs=outputs)
+
+    assert outputs == [3]
+    assert result.machine.memory[labels['LAST']] == 3
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_result_cache_budget():
+    cache = ResultCache()
+    opcodes, labels = assemble(ECHO)
+    cache.run(opcodes, labels, inputs=[1, 2, 0], outputs=[])
+
+    with pytest.raises(BudgetExceeded):
+        cache.run(opcodes, labels, inputs=[1, 2, 0], outputs=[], budget=Budget(outputs=1))
+
+    cache.run(opcodes, labels, inputs=[1, 2, 0], outputs=[], budget=Budget(cycles=100))
+
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_result_cache_errors_not_cached():
+    cache = ResultCache()
+    opcodes, labels = assemble(ECHO)
+
+    for _ in range(2):
+        outputs = []
+        with pytest.raises(EOFError):
+            cache.run(opcodes, labels, inputs=[4], outputs=outputs)
+        assert outputs == [4]
+
+    assert (cache.hits, cache.misses, len(cache)) == (0, 2, 0)
+
+
+def test_result_cache_channel_input():
+    cache = ResultCache()
+    opcodes, labels = assemble(ECHO)
+
+    cache.run(opcodes, labels, inputs=IterableInput([0]), outputs=[])
+    cache.run(opcodes, labels, inputs=IterableInput([0]), outputs=[])
+
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
+
+
+def test_result_cache_uncached_inputs():
+    cache = ResultCache()
+    opcodes, labels = assemble(ECHO)
+    outputs = []
+
+    endless = cache.run(opcodes, labels, inputs=itertools.chain([3], itertools.repeat(0)), outputs=outputs)
+    unread = cache.run(opcodes, labels, inputs=[4, 0, 'foo'], outputs=outputs)
+
+    assert endless.halted and unread.halted
+    assert outputs == [3, 4]
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
+
+
+def test_interpret_with_result_cache():
+    cache = ResultCache()
+
+    interpret(program=ECHO, inputs=[9, 0], outputs=[], result_cache=cache, engine='fused')
+    result = interpret(program=ECHO, inputs=[9, 0], outputs=[], result_cache=cache)
+
+    assert result.halted
+    assert cache.hits == 1
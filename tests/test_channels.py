@@ -0,0 +1,72 @@
+#! /usr/bin/env python
+
+import io
+
+import pytest
+
+from lmcipy.channels import (
+    CallbackOutput,
+    IterableInput,
+    ListOutput,
+    StreamOutput,
+    make_input,
+    make_output,
+)
+from lmcipy.interpret import interpret
+
+
+def test_iterable_input():
+    channel = IterableInput(['1 2\n', '3\n', 4])
+
+    assert [channel.read() for _ in range(4)] == [1, 2, 3, 4]
+    assert channel.position == 4
+
+    with pytest.raises(EOFError):
+        channel.read()
+
+
+def test_stream_output_batches():
+    stream = io.StringIO()
+    channel = StreamOutput(stream, buffer_size=3)
+
+    for value in range(4):
+        channel.write(value)
+
+    assert stream.getvalue() == "0\n1\n2\n"
+
+    channel.flush()
+    assert stream.getvalue() == "0\n1\n2\n3\n"
+
+
+def test_callback_output_batches():
+    batches = []
+    channel = CallbackOutput(batches.append, buffer_size=2)
+
+    for value in range(3):
+        channel.write(value)
+    channel.flush()
+
+    assert batches == [[0, 1], [2]]
+
+
+def test_make_channels():
+    assert isinstance(make_input([1, 2]), IterableInput)
+    assert isinstance(make_output([]), ListOutput)
+    assert isinstance(make_output(io.StringIO()), StreamOutput)
+    assert isinstance(make_output(print), CallbackOutput)
+
+
+def test_interpret_with_channels():
+    program = [
+        ['LOOP', 'INP'],
+        ['BRZ', 'END'],
+        ['OUT'],
+        ['BRA', 'LOOP'],
+        ['END', 'HLT'],
+    ]
+    stream = io.StringIO()
+
+    result = interpret(program=program, inputs=list(range(100, 0, -1)) + [0], outputs=stream)
+
+    assert result.halted
+    assert stream.getvalue() == ''.join("{}\n".format(value) for value in range(100, 0, -1))
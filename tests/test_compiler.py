@@ -0,0 +1,159 @@
+#! /usr/bin/env python
+
+import pytest
+
+from lmcipy import compiler
+from lmcipy.compiler import find_leaders, run_compiled
+from lmcipy.interpret import interpret, run_engine
+from lmcipy.machine import InvalidMachineOperationError
+
+from conftest import load, load_example, start, state
+
+
+def run_with_io(program, inputs, engine):
+    outputs = []
+
+    return interpret(program=program, engine=engine, inputs=inputs, outputs=outputs), outputs
+
+
+@pytest.mark.parametrize('name,inputs', [
+    ('countdown.lmc', [20]),
+    ('fib.lmc', [200]),
+    ('square.lmc', [3, 12, 31, 0]),
+    ('quine.lmc', []),
+    ('test.lmc', [7, 3]),
+])
+def test_compiled_matches_interpreter(name, inputs):
+    program = load_example(name)
+
+    expected, expected_outputs = run_with_io(program, inputs, 'interpreter')
+    result, outputs = run_with_io(program, inputs, 'compiled')
+
+    assert outputs == expected_outputs
+    assert result.cycles == expected.cycles
+    assert result.halted
+    assert result.machine.counter == expected.machine.counter
+    assert result.machine.accumulator == expected.machine.accumulator
+    assert result.machine.minus_flag == expected.machine.minus_flag
+    assert result.machine.memory[0:99] == expected.machine.memory[0:99]
+
+
+def test_find_leaders():
+    cells = [901, 710, 201, 605, 0, 0]
+
+    assert find_leaders(cells) == {0, 2, 4, 5, 6, 10}
+
+
+def test_compiled_self_modifying_block():
+    program = [
+        ['LDA', 'NEW'],
+        ['STA', 'NEXT'],
+        ['NEXT', 'LDA', 'ONE'],
+        ['HLT'],
+        ['NEW', 'LDA', 'TWO'],
+        ['ONE', 'DAT', '1'],
+        ['TWO', 'DAT', '2'],
+    ]
+
+    result = interpret(program=program, engine='compiled')
+
+    assert result.machine.accumulator == 2
+    assert result.cycles == 4
+
+
+def test_compiled_max_cycles():
+    program = [
+        ['LOOP', 'LDA', 'ONE'],
+        ['ADD', 'ONE'],
+        ['BRA', 'LOOP'],
+        ['ONE', 'DAT', '1'],
+    ]
+
+    result = interpret(program=program, engine='compiled', max_cycles=1001)
+
+    assert not result.halted
+    assert result.cycles == 1001
+    assert result.machine.counter == 2
+    assert result.machine.accumulator == 2
+
+
+def test_run_compiled_in_place():
+    machine = start(load_example('countdown.lmc'), [5])
+
+    first = run_compiled(machine, max_cycles=10)
+
+    assert first.machine is machine
+    assert not first.halted
+    assert first.cycles == 10
+
+    second = run_compiled(machine)
+
+    assert second.halted
+    assert machine.outputs.values == [5, 4, 3, 2, 1, 0]
+
+
+@pytest.mark.parametrize('double', [
+    [['LDA', 'X'], ['ADD', 'X']],
+    [['LDA', 'ZERO'], ['SUB', 'X'], ['SUB', 'X']],
+])
+def test_compiled_overflow_matches_interpreter(double):
+    # Doubled X overflows only after the loop was compiled.
+    program = [
+        ['LOOP', 'LDA', 'X'],
+        ['ADD', 'SEVEN'],
+        ['STA', 'X'],
+    ] + double + [
+        ['OUT'],
+        ['BRA', 'LOOP'],
+        ['X', 'DAT', '0'],
+        ['SEVEN', 'DAT', '7'],
+        ['ZERO', 'DAT', '0'],
+    ]
+
+    expected_machine = start(program, [])
+    machine = start(program, [])
+
+    for runner, engine in ((expected_machine, 'interpreter'), (machine, 'compiled')):
+        with pytest.raises(InvalidMachineOperationError):
+            run_engine(runner, engine=engine)
+
+    assert state(machine) == state(expected_machine)
+
+
+def test_compiled_reuses_rewritten_blocks(monkeypatch):
+    program = load('benchmarks/workloads/selfmod.lmc')
+
+    generated = []
+    generate = compiler.generate_block_source
+
+    def counting_generate(cells, start, leaders):
+        generated.append(start)
+        return generate(cells, start, leaders)
+
+    monkeypatch.setattr(compiler, 'generate_block_source', counting_generate)
+
+    expected, expected_outputs = run_with_io(program, [50], 'interpreter')
+    result, outputs = run_with_io(program, [50], 'compiled')
+
+    assert outputs == expected_outputs
+    assert result.cycles == expected.cycles
+    # Every pass over the table rewrites the inner loop into the same ten versions.
+    assert len(generated) <= 2 * compiler.MAX_BLOCK_VERSIONS
+
+
+def test_compiled_steps_unstable_blocks(monkeypatch):
+    monkeypatch.setattr(compiler, 'MAX_BLOCK_VERSIONS', 2)
+
+    program = load('benchmarks/workloads/selfmod.lmc')
+
+    expected, expected_outputs = run_with_io(program, [5], 'interpreter')
+    result, outputs = run_with_io(program, [5], 'compiled')
+
+    assert outputs == expected_outputs
+    assert result.cycles == expected.cycles
+    assert result.machine.memory[0:99] == expected.machine.memory[0:99]
+
+
+def test_interpret_unknown_engine():
+    with pytest.raises(ValueError):
+        interpret(program=[['HLT']], engine='jit')
@@ -0,0 +1,163 @@
+#! /usr/bin/env python
+
+import io
+
+import pytest
+
+from lmcipy.debugger import Debugger, DebuggerShell, resolve
+from lmcipy.interpret import assemble, interpret_opcodes
+from lmcipy.machine import InvalidMachineOperationError
+
+from conftest import registers, start
+
+
+COUNTDOWN = [
+    ['INP'],
+    ['LOOP', 'OUT'],
+    ['STA', 'COUNT'],
+    ['SUB', 'ONE'],
+    ['BRP', 'LOOP'],
+    ['HLT'],
+    ['ONE', 'DAT', '1'],
+    ['COUNT', 'DAT'],
+]
+
+
+def test_resolve():
+    assert resolve('LOOP', {'LOOP': 4}) == 4
+    assert resolve('12', {}) == resolve(12, {}) == 12
+
+    with pytest.raises(ValueError):
+        resolve('MISSING', {})
+
+    with pytest.raises(ValueError):
+        resolve(100, {})
+
+
+def test_step_back_restores_every_state():
+    debugger = Debugger(start(COUNTDOWN, [3], []))
+    states = [registers(debugger.machine)]
+
+    while debugger.step():
+        states.append(registers(debugger.machine))
+
+    assert debugger.halted
+    assert debugger.cycles == len(states) - 1
+
+    for expected in reversed(states[:-1]):
+        assert debugger.step_back() == 1
+        assert registers(debugger.machine) == expected
+
+    assert debugger.step_back() == 0
+    assert not debugger.halted
+
+
+def test_replay_inputs_and_outputs():
+    outputs = []
+    debugger = Debugger(start(COUNTDOWN, [2], outputs))
+
+    debugger.resume()
+    debugger.step_back(debugger.cycles)
+    debugger.resume()
+
+    assert outputs == [2, 1, 0]
+    assert debugger.halted
+    assert debugger.machine.memory[debugger.machine.labels['COUNT']] == 0
+
+
+def test_matches_interpreter():
+    expected = interpret_opcodes(assemble(COUNTDOWN)[0], inputs=[20], outputs=[])
+    debugger = Debugger(start(COUNTDOWN, [20], []))
+
+    debugger.resume()
+    debugger.step_back(17)
+    debugger.step(100)
+
+    assert debugger.cycles == expected.cycles
+    assert registers(debugger.machine) == registers(expected.machine)
+
+
+def test_breakpoints_and_reverse():
+    debugger = Debugger(start(COUNTDOWN, [5], []))
+    debugger.add_breakpoint('LOOP')
+
+    debugger.resume()
+    assert (debugger.machine.counter, debugger.cycles) == (1, 1)
+
+    debugger.resume()
+    debugger.resume()
+    assert (debugger.machine.counter, debugger.cycles) == (1, 9)
+
+    debugger.reverse()
+    assert (debugger.machine.counter, debugger.cycles) == (1, 5)
+
+    debugger.remove_breakpoint('LOOP')
+    debugger.reverse()
+    assert debugger.cycles == 0
+
+
+def test_run_to_and_reverse_to():
+    debugger = Debugger(start(COUNTDOWN, [5], []))
+
+    debugger.run_to('ONE', max_cycles=1000)
+    assert debugger.halted and debugger.cycles == 26
+
+    debugger.reverse_to(4)
+    assert (debugger.machine.counter, debugger.cycles) == (4, 24)
+
+
+def test_failed_cycle_leaves_state():
+    debugger = Debugger(start(COUNTDOWN, [], []))
+
+    with pytest.raises(EOFError):
+        debugger.step()
+
+    assert debugger.cycles == 0
+    assert debugger.machine.counter == 0
+
+    debugger = Debugger(start([['LDA', 'BIG'], ['ADD', 'BIG'], ['BIG', 'DAT', '999']], [], []))
+    debugger.step()
+
+    with pytest.raises(InvalidMachineOperationError):
+        debugger.step()
+
+    assert (debugger.cycles, debugger.machine.counter, debugger.machine.accumulator) == (1, 1, 999)
+
+
+def test_step_past_last_cell():
+    debugger = Debugger(start([['LDA', '0']] * 100, [], []))
+    debugger.step(100)
+
+    with pytest.raises(InvalidMachineOperationError) as e:
+        debugger.step()
+
+    assert str(e.value) == 'Cannot access memory cell number 100'
+    assert (debugger.cycles, debugger.machine.counter) == (100, 100)
+
+    stdout = io.StringIO()
+    DebuggerShell(debugger, stdin=io.StringIO('step\nback\nquit\n'), stdout=stdout).cmdloop()
+
+    assert '*** Cannot access memory cell number 100' in stdout.getvalue()
+    assert debugger.machine.counter == 99
+
+
+def test_history_is_compact():
+    debugger = Debugger(start([['LOOP', 'STA', 'LOOP'], ['BRA', 'LOOP']], [], []))
+
+    debugger.step(100000)
+
+    assert debugger.history_bytes <= 8 * 100000
+    debugger.step_back(100000)
+    assert debugger.machine.memory[0] == 300
+
+
+def test_shell():
+    commands = io.StringIO('break LOOP\ncontinue\ncontinue\nback 2\nrc\nx COUNT 1\n\nbogus\nquit\n')
+    stdout = io.StringIO()
+    debugger = Debugger(start(COUNTDOWN, [3], []))
+
+    DebuggerShell(debugger, stdin=commands, stdout=stdout).cmdloop()
+
+    assert debugger.cycles == 1
+    assert '  7 COUNT        000' in stdout.getvalue()
+    assert 'Unknown syntax: bogus' in stdout.getvalue()
@@ -9,9 +9,11 @@ from lmcipy.interpret import (
     load_opcodes,
     eval_opcode,
     interpret,
-    SyntaxError
+    run,
+    SyntaxError,
+    UnknownOpcodeError
 )
-from lmcipy.machine import MachineState
+from lmcipy.machine import EXTENDED, MachineState, InvalidMachineOperationError
 
 
 @pytest.fixture
@@ -158,5 +160,121 @@ def test_minus_flag_unset(empty_machine):
     assert res_machine.accumulator == 5
 
 
+def test_interpret_result():
+    test_program = [
+        ['LDA', 'FIVE'],
+        ['HLT'],
+        ['FIVE', 'DAT', '5'],
+    ]
+
+    result = interpret(program=test_program)
+
+    assert result.halted
+    assert result.cycles == 2
+    assert result.machine.accumulator == 5
+    assert result.machine.counter == 2
+
+
+def test_interpret_long_running():
+    test_program = [
+        ['LOOP', 'LDA', 'COUNT'],
+        ['SUB', 'ONE'],
+        ['STA', 'COUNT'],
+        ['BRZ', 'END'],
+        ['BRA', 'LOOP'],
+        ['END', 'HLT'],
+        ['ONE', 'DAT', '1'],
+        ['COUNT', 'DAT', '999'],
+    ]
+
+    result = interpret(program=test_program)
+
+    assert result.halted
+    assert result.cycles == 999 * 5
+    assert result.machine.memory[7] == 0
+
+
+def test_interpret_max_cycles():
+    test_program = [
+        ['LOOP', 'BRA', 'LOOP'],
+    ]
+
+    result = interpret(program=test_program, max_cycles=5000)
+
+    assert not result.halted
+    assert result.cycles == 5000
+
+
+def test_run_in_place(empty_machine):
+    empty_machine.memory[0:2] = [510, 0]
+    empty_machine.memory[10] = 7
+
+    result = run(machine=empty_machine, copy=False)
+
+    assert result.machine is empty_machine
+    assert empty_machine.accumulator == 7
+
 
+def test_run_positional_machine(empty_machine):
+    empty_machine.memory[0:2] = [510, 0]
+    empty_machine.memory[10] = 7
+
+    result = run(empty_machine)
+
+    assert result.halted
+    assert result.machine.accumulator == 7
+    assert empty_machine.accumulator == 0
+
+
+def test_run_unknown_opcode(empty_machine):
+    empty_machine.memory[0] = 405
+
+    with pytest.raises(UnknownOpcodeError):
+        run(machine=empty_machine)
+
+
+def test_run_counter_out_of_memory(empty_machine):
+    empty_machine.memory[99] = 510
+    empty_machine.counter = 99
+
+    with pytest.raises(InvalidMachineOperationError):
+        run(machine=empty_machine)
+
+
+def test_run_keeps_attribute_checks(empty_machine):
+    empty_machine.memory[0] = 405
+
+    with pytest.raises(UnknownOpcodeError):
+        run(machine=empty_machine, copy=False)
+
+    assert type(empty_machine) is MachineState
+
+    with pytest.raises(InvalidMachineOperationError):
+        empty_machine.test = 1
+
+
+def test_interpret_extended_profile():
+    program = [
+        ['INP'],
+        ['STA', '999'],
+        ['LOOP', 'LDA', '999'],
+        ['OUT'],
+        ['SUB', 'STEP'],
+        ['STA', '999'],
+        ['BRP', 'LOOP'],
+        ['HLT'],
+        ['STEP', 'DAT', '2500'],
+    ]
+    outputs = []
+
+    result = interpret(program, inputs=[9000], outputs=outputs, machine_profile=EXTENDED)
+
+    assert result.halted
+    assert outputs == [9000, 6500, 4000, 1500]
+    assert result.machine.memory.pages == 2
+
+    with pytest.raises(SyntaxError):
+        interpret(program, inputs=[9000], outputs=[])
 
+    with pytest.raises(ValueError):
+        interpret(program, inputs=[9000], outputs=[], machine_profile=EXTENDED, engine='fused')
@@ -2,6 +2,7 @@
 
 import pytest
 
+from lmcipy.channels import IterableInput
 from lmcipy.machine import *
 
 
@@ -53,6 +54,23 @@ class TestOpcodeFunctions:
         assert empty_machine.minus_flag == True
 
 
+    def test_opc_add_overflow(self, empty_machine):
+        empty_machine.accumulator = 999
+        empty_machine.memory[1] = 1
+
+        with pytest.raises(InvalidMachineOperationError):
+            opc_add(empty_machine, 1)
+
+        assert empty_machine.accumulator == 999
+
+
+    def test_opc_inp_out_of_range(self, empty_machine):
+        empty_machine.inputs = IterableInput([1000])
+
+        with pytest.raises(InvalidMachineOperationError):
+            opc_inp(empty_machine)
+
+
     def test_opc_sta(self, empty_machine):
         empty_machine.accumulator = 10
 
@@ -114,6 +132,25 @@ class TestOpcodeFunctions:
         assert empty_machine.counter == 1
 
 
+class TestDecodeTable:
+
+    def test_decode_table_with_arg(self, empty_machine):
+        func = empty_machine.decode_table[342]
+
+        assert func.func is opc_sta
+        assert func.keywords['value'] == 42
+
+
+    def test_decode_table_halt(self, empty_machine):
+        assert empty_machine.decode_table[0] is opc_halt
+        assert empty_machine.decode_table[57] is opc_halt
+
+
+    def test_decode_table_unknown(self, empty_machine):
+        with pytest.raises(UnknownOpcodeError):
+            empty_machine.decode_table[903](empty_machine)
+
+
 class TestMachine:
 
     def test_restricted_attribute(self):
@@ -145,6 +182,24 @@ class TestMachine:
         assert test_memory[33] == 11
 
 
+    def test_machine_memory_last_cell(self):
+        test_memory = MachineMemory()
+        test_memory[99] = 11
+
+        assert len(test_memory) == 100
+        assert test_memory[99] == 11
+
+
+    def test_machine_memory_slice_fails(self):
+        test_memory = MachineMemory()
+
+        with pytest.raises(InvalidMachineOperationError):
+            test_memory[0:101] = [0] * 101
+
+        with pytest.raises(InvalidMachineOperationError):
+            test_memory[0:2] = [1, 1000]
+
+
     def test_machine_memory_fails(self):
         test_memory = MachineMemory()
 
@@ -168,7 +223,116 @@ class TestMachine:
         with pytest.raises(InvalidMachineOperationError):
             test_machine.test = 1
 
+        with pytest.raises(AttributeError):
+            test_machine.test = 1
+
+
+    def test_machine_memory_fork(self):
+        test_memory = MachineMemory()
+        test_memory[1] = 5
+        fork = test_memory.fork()
+
+        fork[1] = 6
+        test_memory[2] = 7
 
+        assert test_memory[1] == 5
+        assert fork[1] == 6
+        assert fork[2] == 0
 
 
+    def test_machine_state_snapshot(self):
+        test_machine = MachineState()
+        test_machine.accumulator = 10
+        test_machine.labels['X'] = 1
+
+        snapshot = test_machine.snapshot()
+        test_machine.accumulator = 11
+        test_machine.memory[1] = 3
+        test_machine.labels['Y'] = 2
+
+        assert snapshot.accumulator == 10
+        assert snapshot.memory[1] == 0
+        assert snapshot.labels == {'X': 1}
+
+
+class TestMachineProfile:
+
+    def test_paged_memory(self):
+        memory = PagedMemory(10000, 9999, page_size=100)
+
+        memory[5000] = 9999
+        memory[5001] = 7
+
+        assert memory[5000] == 9999
+        assert memory[0] == 0
+        assert memory[4999:5002] == [0, 9999, 7]
+        assert memory.pages == 1
+        assert len(memory) == 10000
+
+        with pytest.raises(InvalidMachineOperationError):
+            memory[10000] = 1
+
+        with pytest.raises(InvalidMachineOperationError):
+            memory[1] = 10000
+
+        with pytest.raises(IndexError):
+            memory[10000]
+
+
+    def test_paged_memory_fork(self):
+        memory = PagedMemory(1000, 9999, page_size=10)
+        memory[1] = 5
+        fork = memory.fork()
+
+        fork[1] = 6
+        memory[2] = 7
+        fork[500] = 8
+
+        assert (memory[1], memory[2], memory[500]) == (5, 7, 0)
+        assert (fork[1], fork[2], fork[500]) == (6, 0, 8)
+
+
+    def test_profiles(self):
+        assert CLASSIC.classic and CLASSIC.size == 100 and CLASSIC.max_value == 999
+        assert (EXTENDED.size, EXTENDED.max_value, EXTENDED.opcode_base) == (1000, 9999, 1000)
+        assert PROFILES['extended'] is EXTENDED
+
+        with pytest.raises(ValueError):
+            MachineProfile('invalid', word_digits=3, address_digits=3)
+
+
+    def test_classic_machine(self):
+        machine = CLASSIC.new_machine()
+
+        assert type(machine) is MachineState
+        assert isinstance(machine.memory, MachineMemory)
+
+
+    def test_extended_machine(self):
+        machine = EXTENDED.new_machine(inputs=IterableInput([9999]))
+
+        assert isinstance(machine, MachineState)
+        assert machine.profile is EXTENDED
+        assert isinstance(machine.memory, PagedMemory)
+        assert machine.snapshot().profile is EXTENDED
+
+        machine.decode_table[9001](machine)
+        machine.decode_table[3999](machine)
+        machine.decode_table[2999](machine)
+        machine.decode_table[2999](machine)
+
+        assert machine.memory[999] == 9999
+        assert machine.accumulator == 9999 and machine.minus_flag is True
+
+        machine.decode_table[1999](machine)
+        assert machine.accumulator == 0 and machine.minus_flag is False
+
+        machine.decode_table[2999](machine)
+        with pytest.raises(InvalidMachineOperationError):
+            machine.decode_table[2999](machine)
+
+        with pytest.raises(HaltSignal):
+            machine.decode_table[999](machine)
 
+        with pytest.raises(UnknownOpcodeError):
+            machine.decode_table[9003](machine)
@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+
+import pytest
+
+from lmcipy.interpret import assemble, interpret_opcodes
+from lmcipy.objfile import (
+    ObjectArchive,
+    ObjectFormatError,
+    ObjectImage,
+    encode_image,
+    write_archive,
+    write_object,
+)
+
+
+PROGRAM = [
+    ['INP'],
+    ['ADD', 'ONE'],
+    ['OUT'],
+    ['HLT'],
+    ['ONE', 'DAT', '1'],
+]
+
+
+def test_encode_image():
+    opcodes, labels = assemble(PROGRAM)
+
+    image = ObjectImage(encode_image(opcodes, labels, name='inc'))
+
+    assert image.opcodes == opcodes + [0] * 95
+    assert image.labels == {'ONE': 4}
+    assert image.line_map == [0, 1, 2, 3, 4]
+    assert image.name == 'inc'
+
+
+def test_encode_image_too_large():
+    with pytest.raises(ObjectFormatError):
+        encode_image([0] * 101, {})
+
+
+def test_archive(tmpdir):
+    path = str(tmpdir.join('programs.lmco'))
+    opcodes, labels = assemble(PROGRAM)
+
+    count = write_archive(path, (encode_image(opcodes, {'ONE': 4}, name=str(num)) for num in range(1000)))
+
+    with ObjectArchive(path) as archive:
+        assert count == len(archive) == 1000
+        assert archive[-1].name == '999'
+        assert archive.find('500').opcodes[:5] == opcodes
+
+        outputs = []
+        image = archive[7]
+        interpret_opcodes(image.cells, image.labels, inputs=[41], outputs=outputs)
+        assert outputs == [42]
+
+
+def test_single_object(tmpdir):
+    path = str(tmpdir.join('inc.lmco'))
+    opcodes, labels = assemble(PROGRAM)
+    write_object(path, opcodes, labels)
+
+    with ObjectArchive(path) as archive:
+        assert len(archive) == 1
+        assert archive[0].labels == labels
+
+
+def test_invalid_object(tmpdir):
+    path = tmpdir.join('bad.lmco')
+    path.write('INP\nOUT\n')
+
+    with pytest.raises(ObjectFormatError):
+        ObjectArchive(str(path))
@@ -0,0 +1,99 @@
+#! /usr/bin/env python
+
+import pytest
+
+from lmcipy.interpret import interpret, run_engine
+from lmcipy.machine import InvalidMachineOperationError
+from lmcipy.optimize import FusedProgram, find_superinstructions
+
+from conftest import load, start, state
+
+
+PROGRAMS = [
+    ('examples/countdown.lmc', [20]),
+    ('examples/fib.lmc', [600]),
+    ('examples/square.lmc', [3, 12, 31, 0]),
+    ('examples/quine.lmc', []),
+    ('examples/test.lmc', [7, 3]),
+    ('benchmarks/workloads/nested.lmc', [5, 7]),
+    ('benchmarks/workloads/selfmod.lmc', [3]),
+]
+
+
+@pytest.mark.parametrize('path,inputs', PROGRAMS)
+def test_fused_matches_interpreter(path, inputs):
+    program = load(path)
+
+    expected_machine = start(program, inputs)
+    expected = run_engine(expected_machine)
+    machine = start(program, inputs)
+    result = run_engine(machine, engine='fused')
+
+    assert result.halted == expected.halted
+    assert result.cycles == expected.cycles
+    assert state(machine) == state(expected_machine)
+
+
+@pytest.mark.parametrize('path,inputs', PROGRAMS)
+def test_fused_max_cycles_exact(path, inputs):
+    program = load(path)
+
+    for max_cycles in range(0, 60):
+        expected_machine = start(program, inputs)
+        expected = run_engine(expected_machine, max_cycles=max_cycles)
+        machine = start(program, inputs)
+        result = run_engine(machine, engine='fused', max_cycles=max_cycles)
+
+        assert (result.cycles, result.halted) == (expected.cycles, expected.halted)
+        assert state(machine) == state(expected_machine)
+
+
+def test_find_superinstructions():
+    cells = [510, 111, 312, 510, 211, 705, 112, 313, 510, 704, 0]
+
+    assert find_superinstructions(cells) == [
+        (0, 'LDA_ADD_STA', (10, 11, 12)),
+        (3, 'LDA_SUB_BRZ', (10, 11, 5)),
+        (6, 'ADD_STA', (12, 13)),
+        (8, 'LDA_BRZ', (10, 4)),
+    ]
+
+
+def test_store_unfuses_sequence():
+    # The first STA turns fused SUB into ADD.
+    program = [['LDA', 'NEW'], ['STA', 'OP'], ['LDA', 'X'], ['OP', 'SUB', 'Y'], ['STA', 'Z'], ['HLT'],
+               ['NEW', 'ADD', 'Y'], ['X', 'DAT', '5'], ['Y', 'DAT', '3'], ['Z', 'DAT']]
+    machine = start(program, [])
+    fused = FusedProgram(machine)
+
+    assert fused.fused == {2: 3}
+
+    result = fused.run()
+
+    assert result.halted
+    assert fused.fused == {}
+    assert machine.memory[machine.labels['Z']] == 8
+
+
+def test_fused_overflow_matches_interpreter():
+    program = [['LDA', 'X'], ['ADD', 'X'], ['STA', 'Z'], ['HLT'], ['X', 'DAT', '600'], ['Z', 'DAT']]
+
+    for engine in ('interpreter', 'fused'):
+        with pytest.raises(InvalidMachineOperationError):
+            interpret(program=program, engine=engine)
+
+    expected_machine = start(program, [])
+    machine = start(program, [])
+
+    for runner, engine in ((expected_machine, 'interpreter'), (machine, 'fused')):
+        with pytest.raises(InvalidMachineOperationError):
+            run_engine(runner, engine=engine)
+
+    assert state(machine) == state(expected_machine)
+
+
+def test_fused_counter_out_of_memory():
+    with pytest.raises(InvalidMachineOperationError) as e:
+        interpret(program=[['LDA', '0']] * 100, engine='fused')
+
+    assert str(e.value) == 'Cannot access memory cell number 100'
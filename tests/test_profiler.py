@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+
+import pytest
+
+from lmcipy.interpret import interpret
+from lmcipy.profiler import Profile, locate, opcode_class
+
+from conftest import load_example
+
+
+def test_profile_matches_plain_run():
+    program = load_example('fib.lmc')
+    expected_outputs, outputs = [], []
+    profile = Profile()
+
+    expected = interpret(program=program, inputs=[300], outputs=expected_outputs)
+    result = interpret(program=program, inputs=[300], outputs=outputs, profile=profile)
+
+    assert outputs == expected_outputs
+    assert result.cycles == expected.cycles
+    assert result.halted
+    assert profile.cycles == result.cycles
+    assert sum(profile.hits) == result.cycles
+    assert sum(profile.opcodes) == result.cycles
+    assert profile.wall_time > 0
+
+
+def test_profile_branches_and_loops():
+    program = load_example('fib.lmc')
+    profile = Profile()
+
+    result = interpret(program=program, inputs=[300], outputs=[], profile=profile)
+    labels = result.machine.labels
+
+    # BRP ENDLOOP is taken once, when the loop ends.
+    assert profile.taken[4] == 1
+    assert profile.not_taken[4] == profile.hits[4] - 1
+    assert profile.hot_spots(labels, limit=1) == [(2, 'LOOP', 15, 15 / result.cycles)]
+    assert profile.loops(labels) == [('LOOP', 'LOOP+12', 14, result.cycles - 3)]
+    assert dict(profile.classes())['OUT'] == 14
+
+
+def test_profile_branch_to_next_cell():
+    program = [['LDA', 'ZERO'], ['BRZ', 'NEXT'], ['NEXT', 'BRP', 'END'], ['END', 'HLT'], ['ZERO', 'DAT', '0']]
+    profile = Profile()
+
+    interpret(program=program, outputs=[], profile=profile)
+
+    assert (profile.taken[1], profile.not_taken[1]) == (1, 0)
+    assert (profile.taken[2], profile.not_taken[2]) == (1, 0)
+    assert profile.edges[1, 2] == 1
+
+
+def test_profile_report():
+    program = load_example('countdown.lmc')
+    profile = Profile()
+
+    result = interpret(program=program, inputs=[5], outputs=[], profile=profile)
+    report = profile.report(result.machine.labels)
+
+    assert 'Cycles: {}'.format(result.cycles) in report
+    assert 'LOOP' in report
+    assert 'BRZ' in report
+
+
+def test_profile_requires_interpreter():
+    with pytest.raises(ValueError):
+        interpret(program=load_example('countdown.lmc'), inputs=[5], outputs=[], engine='compiled',
+                  profile=Profile())
+
+
+def test_locate():
+    labels = {'START': 0, 'LOOP': 4}
+
+    assert locate(4, labels) == 'LOOP'
+    assert locate(6, labels) == 'LOOP+2'
+    assert locate(2, labels) == 'START+2'
+    assert locate(2, {}) == '2'
+
+
+def test_opcode_class():
+    assert opcode_class(901) == 'INP'
+    assert opcode_class(902) == 'OUT'
+    assert opcode_class(512) == 'LDA'
+    assert opcode_class(450) == '???'
@@ -0,0 +1,103 @@
+#! /usr/bin/env python
+
+import os
+import subprocess
+import sys
+import threading
+
+from lmcipy.budget import Budget
+from lmcipy.client import Client, connect
+from lmcipy import server as server_module
+from lmcipy.server import Server
+
+
+SUB = 'INP\nSTA FIRST\nINP\nSUB FIRST\nOUT\nHLT\nFIRST DAT\n'
+LMC = os.path.join(os.path.dirname(__file__), '..', 'bin', 'lmc.py')
+
+
+def test_handle_source_and_key():
+    server = Server()
+
+    first = server.handle({'source': SUB, 'inputs': [3, 10]})
+    second = server.handle({'program': first['program'], 'inputs': [1, 1], 'engine': 'fused'})
+
+    assert (first['outputs'], first['cycles'], first['halted'], first['error']) == ([7], 6, True, None)
+    assert not first['warm']
+    assert second['outputs'] == [0] and second['warm']
+    assert server.handle({'source': SUB.replace('HLT', 'HLT // done'), 'inputs': [1, 2]})['warm']
+    assert server.requests == 3
+
+
+def test_handle_errors():
+    server = Server(budget=Budget(cycles=1000))
+
+    assert server.handle({'program': 'missing'})['error'].startswith('ValueError: Unknown program')
+    assert server.handle({'source': 'FOO BAR BAZ'})['error'].startswith('SyntaxError')
+    assert server.handle({'source': SUB, 'inputs': [1]})['error'] == 'EOFError: Input exhausted.'
+    assert server.handle({'source': 'LOOP BRA LOOP'})['error'] == 'BudgetExceeded: Budget of 1000 cycles exceeded.'
+
+    response = server.handle({'source': 'LOOP BRA LOOP', 'detect_loops': True})
+    assert response['error'].startswith('InfiniteLoopError')
+
+
+def test_default_budget(monkeypatch):
+    monkeypatch.setattr(server_module, 'DEFAULT_TIMEOUT', 0.05)
+
+    for server in (Server(), Server(budget=Budget(outputs=5))):
+        assert server.handle({'source': 'LOOP BRA LOOP'})['error'] == 'BudgetExceeded: Budget of 0.05 seconds exceeded.'
+
+    response = Server(budget=Budget(cycles=1000)).handle({'source': 'LOOP BRA LOOP', 'max_outputs': 1})
+    assert response['error'] == 'BudgetExceeded: Budget of 1000 cycles exceeded.'
+
+
+def test_serve(tmpdir):
+    path = os.path.join(str(tmpdir), 'lmc.sock')
+    server = Server(path)
+    server.listen()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    try:
+        with Client(path, timeout=5) as client:
+            first = client.run(source=SUB, inputs=[2, 5])
+            second = client.run(program=first['program'], inputs=[5, 5])
+            invalid = client.request({'inputs': []})
+
+        assert first['outputs'] == [3]
+        assert second['outputs'] == [0] and second['warm']
+        assert invalid['error'].startswith('ValueError: Unknown program')
+    finally:
+        server.close()
+        thread.join(5)
+
+    assert not thread.is_alive()
+    assert not os.path.exists(path)
+    assert connect(path) is None
+
+
+def test_forward_unbounded_run(tmpdir):
+    path = os.path.join(str(tmpdir), 'lmc.sock')
+    program, inputs = tmpdir.join('countdown.lmc'), tmpdir.join('inputs.txt')
+    program.write('INP\nLOOP SUB ONE\nOUT\nBRP LOOP\nHLT\nONE DAT 1\n')
+    inputs.write('50\n')
+    # Unbounded runs must not stop after the cycles of the server budget.
+    server = Server(path, budget=Budget(cycles=20))
+    server.listen()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    def lmc(*args):
+        return subprocess.run([sys.executable, LMC, str(program), '-i', str(inputs), '-s', path] + list(args),
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+    try:
+        local, unbounded = lmc('--local'), lmc()
+        bounded = lmc('--max-cycles', '1000')
+    finally:
+        server.close()
+        thread.join(5)
+
+    assert unbounded.returncode == local.returncode == 0
+    assert unbounded.stdout == local.stdout == bounded.stdout
+    assert local.stdout.splitlines()[0] == 'Output: 49' and len(local.stdout.splitlines()) > 20
+    assert server.requests == 1
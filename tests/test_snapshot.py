@@ -0,0 +1,140 @@
+#! /usr/bin/env python
+
+import pytest
+
+from lmcipy.channels import IterableInput
+from lmcipy.compiler import CompiledProgram
+from lmcipy.interpret import interpret, load_opcodes, run_engine
+from lmcipy.machine import EXTENDED, MachineState
+from lmcipy.snapshot import Snapshot, SnapshotFormatError
+
+from conftest import load_example, start
+
+
+def test_restore_continues_run(tmpdir):
+    inputs = [3, 12, 31, 0]
+    expected_outputs = []
+    expected = interpret(program=load_example('square.lmc'), inputs=inputs, outputs=expected_outputs)
+
+    outputs = []
+    machine = start(load_example('square.lmc'), inputs, outputs)
+    first = run_engine(machine, max_cycles=50)
+    assert not first.halted
+
+    path = str(tmpdir.join('square.snap'))
+    Snapshot.capture(machine, cycles=first.cycles).save(path)
+    snapshot = Snapshot.load(path)
+
+    assert snapshot.cycles == 50
+    assert snapshot.input_position == machine.inputs.position
+    assert snapshot.labels == machine.labels
+
+    restored = snapshot.restore(inputs=inputs, outputs=outputs)
+    second = run_engine(restored, engine='compiled')
+
+    assert second.halted
+    assert outputs == expected_outputs
+    assert snapshot.cycles + second.cycles == expected.cycles
+
+
+def test_snapshot_roundtrip_registers():
+    machine = MachineState(inputs=IterableInput([1, 2]))
+    machine.counter = 42
+    machine.accumulator = 17
+    machine.minus_flag = True
+    machine.memory[99] = 999
+    machine.labels = {'END': 99}
+    machine.inputs.read()
+
+    snapshot = Snapshot.from_bytes(Snapshot.capture(machine, cycles=7).to_bytes())
+    restored = snapshot.restore(inputs=[1, 2])
+
+    assert (restored.counter, restored.accumulator, restored.minus_flag) == (42, 17, True)
+    assert restored.memory[:] == machine.memory[:]
+    assert restored.labels == {'END': 99}
+    assert restored.inputs.read() == 2
+    assert snapshot.cycles == 7
+
+
+def test_fork_explores_continuations():
+    machine = start(load_example('square.lmc'), [5], [])
+    cycles = 0
+
+    # Run past the first squaring, up to the second INP.
+    while not (machine.inputs.position == 1 and machine.memory[machine.counter] == 901):
+        cycles += run_engine(machine, max_cycles=1).cycles
+
+    snapshot = Snapshot.capture(machine, cycles=cycles)
+    outputs = {}
+
+    for value in (2, 7, 31):
+        outputs[value] = []
+        child = snapshot.fork(inputs=[value, 0], outputs=outputs[value])
+        run_engine(child)
+
+    # Output of the shared prefix (25) was written before the snapshot.
+    assert outputs == {value: [value * value] for value in (2, 7, 31)}
+
+
+def test_fork_is_copy_on_write():
+    machine = MachineState()
+    machine.memory[10] = 5
+    snapshot = Snapshot.capture(machine)
+
+    first, second = snapshot.fork(inputs=[]), snapshot.fork(inputs=[])
+    assert first.memory._data is second.memory._data
+
+    first.memory.store(10, 6)
+    assert first.memory[10] == 6
+    assert second.memory[10] == 5
+    assert snapshot.memory[10] == 5
+
+    machine.memory.store(10, 7)
+    assert snapshot.memory[10] == 5
+
+
+def test_capture_while_engine_holds_memory():
+    machine = start(load_example('square.lmc'), [3, 12, 31, 0], [])
+    program = CompiledProgram(machine)
+    first = program.run(max_cycles=50)
+
+    snapshot = Snapshot.capture(machine, cycles=first.cycles)
+    memory = snapshot.memory[:]
+
+    assert program.run().halted
+    assert machine.memory[:] != memory
+    assert snapshot.memory[:] == memory
+
+
+def test_fork_keeps_input_position():
+    machine = MachineState(inputs=IterableInput([1, 2, 3]))
+    machine.inputs.skip(2)
+
+    child = Snapshot.capture(machine).fork(inputs=[9])
+
+    assert child.inputs.position == 2
+    assert child.inputs.read() == 9
+    assert child.inputs.position == 3
+
+
+def test_restore_missing_inputs():
+    machine = MachineState(inputs=IterableInput([1, 2]))
+    machine.inputs.skip(2)
+
+    with pytest.raises(EOFError):
+        Snapshot.capture(machine).restore(inputs=[1])
+
+
+def test_invalid_snapshot():
+    with pytest.raises(SnapshotFormatError):
+        Snapshot.from_bytes(b'LMCO' + bytes(40))
+
+    with pytest.raises(SnapshotFormatError):
+        Snapshot.from_bytes(b'LMCS')
+
+
+def test_capture_rejects_extended_machine():
+    machine = load_opcodes(machine=EXTENDED.new_machine(), opcodes=[9001, 9002, 0], copy=False)
+
+    with pytest.raises(ValueError):
+        Snapshot.capture(machine)
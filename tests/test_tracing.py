@@ -0,0 +1,179 @@
+#! /usr/bin/env python
+
+import pytest
+
+from lmcipy.interpret import interpret
+from lmcipy.tracing import (
+    TraceFormatError,
+    NO_STORE,
+    TraceRecorder,
+    export_npz,
+    format_record,
+    iter_trace_arrays,
+    parse_trigger,
+    read_trace,
+    read_trace_arrays,
+)
+
+from conftest import load_example
+
+
+def test_trace_records_every_cycle():
+    recorder = TraceRecorder()
+    result = interpret(program=load_example('countdown.lmc'), inputs=[3], outputs=[], trace=recorder)
+    records = recorder.records()
+
+    assert len(records) == result.cycles
+    assert [record.cycle for record in records] == list(range(1, result.cycles + 1))
+    assert records[0].counter == 0 and records[0].opcode == 901 and records[0].accumulator == 3
+    assert records[-1].opcode == 0
+
+
+def test_trace_store_delta():
+    recorder = TraceRecorder()
+    interpret(program=load_example('fib.lmc'), inputs=[5], outputs=[], trace=recorder)
+    stores = [record for record in recorder.records() if record.address is not None]
+
+    # STA N stores the input into cell 18, which was empty.
+    assert stores[0].address == 18 and stores[0].old_value == 0 and stores[0].accumulator == 5
+    assert all(record.opcode == 300 + record.address for record in stores)
+
+
+def test_trace_ring_buffer_keeps_last_records():
+    recorder = TraceRecorder(capacity=4)
+    result = interpret(program=load_example('countdown.lmc'), inputs=[3], outputs=[], trace=recorder)
+
+    assert recorder.recorded == result.cycles
+    assert [record.cycle for record in recorder.records()] == list(range(result.cycles - 3, result.cycles + 1))
+
+
+def test_trace_sampling_and_triggers():
+    program = load_example('countdown.lmc')
+
+    recorder = TraceRecorder(sample=3)
+    result = interpret(program=program, inputs=[3], outputs=[], trace=recorder)
+    assert [record.cycle for record in recorder.records()] == list(range(1, result.cycles + 1, 3))
+
+    recorder = TraceRecorder(start=('cycle', 4), stop=('cycle', 6))
+    interpret(program=program, inputs=[3], outputs=[], trace=recorder)
+    assert [record.cycle for record in recorder.records()] == [4, 5, 6]
+
+    recorder = TraceRecorder(start=('address', 2), stop=('address', 5))
+    interpret(program=program, inputs=[3], outputs=[], trace=recorder)
+    assert [record.counter for record in recorder.records()] == [2, 3, 4, 5]
+
+
+def test_trace_file_roundtrip(tmpdir):
+    path = str(tmpdir.join('trace.bin'))
+    memory = TraceRecorder()
+    program = load_example('fib.lmc')
+
+    with TraceRecorder(path, capacity=7) as recorder:
+        interpret(program=program, inputs=[100], outputs=[], trace=recorder)
+    interpret(program=program, inputs=[100], outputs=[], trace=memory)
+
+    assert list(read_trace(path)) == memory.records()
+
+    saved = str(tmpdir.join('saved.bin'))
+    memory.save(saved)
+    assert list(read_trace(saved)) == memory.records()
+
+
+def test_read_trace_invalid(tmpdir):
+    path = tmpdir.join('bad.bin')
+    path.write_binary(b'LMCO\x01\x00\x14\x00')
+
+    with pytest.raises(TraceFormatError):
+        list(read_trace(str(path)))
+
+
+def test_trace_requires_interpreter():
+    with pytest.raises(ValueError):
+        interpret(program=load_example('countdown.lmc'), inputs=[3], outputs=[], engine='compiled',
+                  trace=TraceRecorder())
+
+
+def test_parse_trigger():
+    assert parse_trigger('100') == ('cycle', 100)
+    assert parse_trigger('@12') == ('address', 12)
+    assert parse_trigger('@LOOP', {'LOOP': 2}) == ('address', 2)
+
+    with pytest.raises(ValueError):
+        parse_trigger('@LOOP')
+
+
+def test_format_record():
+    recorder = TraceRecorder()
+    result = interpret(program=load_example('fib.lmc'), inputs=[5], outputs=[], trace=recorder)
+    line = format_record(recorder.records()[1], result.machine.labels)
+
+    assert 'STA N' in line
+    assert '[18] 0 -> 5' in line
+
+
+def assert_columns_match(arrays, records):
+    np = pytest.importorskip('numpy')
+
+    assert arrays['cycle'].dtype == np.uint64 and arrays['minus_flag'].dtype == bool
+    assert arrays['cycle'].tolist() == [record.cycle for record in records]
+    assert arrays['counter'].tolist() == [record.counter for record in records]
+    assert arrays['opcode'].tolist() == [record.opcode for record in records]
+    assert arrays['accumulator'].tolist() == [record.accumulator for record in records]
+    assert arrays['minus_flag'].tolist() == [record.minus_flag for record in records]
+    assert arrays['address'].tolist() == [
+        NO_STORE if record.address is None else record.address for record in records
+    ]
+    assert arrays['value'].tolist() == [
+        0 if record.address is None else record.accumulator for record in records
+    ]
+    assert arrays['old_value'].tolist() == [record.old_value or 0 for record in records]
+
+
+def test_trace_arrays():
+    pytest.importorskip('numpy')
+    recorder = TraceRecorder(capacity=50)
+    interpret(program=load_example('fib.lmc'), inputs=[100], outputs=[], trace=recorder)
+
+    assert recorder.recorded > 50
+    assert_columns_match(recorder.arrays(), recorder.records())
+
+
+def test_trace_sink_streams_chunks():
+    np = pytest.importorskip('numpy')
+    program = load_example('fib.lmc')
+    memory = TraceRecorder()
+    chunks = []
+
+    with TraceRecorder(capacity=16, sink=chunks.append) as recorder:
+        interpret(program=program, inputs=[100], outputs=[], trace=recorder)
+    interpret(program=program, inputs=[100], outputs=[], trace=memory)
+
+    assert all(len(chunk['cycle']) == 16 for chunk in chunks[:-1])
+    assert_columns_match({name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]},
+                         memory.records())
+
+    with pytest.raises(ValueError):
+        recorder.arrays()
+
+
+def test_trace_file_arrays_and_npz(tmpdir):
+    np = pytest.importorskip('numpy')
+    path = str(tmpdir.join('trace.bin'))
+    output = str(tmpdir.join('trace.npz'))
+
+    with TraceRecorder(path, capacity=7) as recorder:
+        interpret(program=load_example('fib.lmc'), inputs=[100], outputs=[], trace=recorder)
+    records = list(read_trace(path))
+
+    assert_columns_match(read_trace_arrays(path), records)
+    assert [len(chunk['cycle']) for chunk in iter_trace_arrays(path, chunk_records=40)][:-1] == [40] * (len(records) // 40)
+
+    for compress in (False, True):
+        assert export_npz(path, output, chunk_records=13, compress=compress) == len(records)
+
+        with np.load(output) as arrays:
+            assert_columns_match(dict(arrays), records)
+
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 5)
+    assert export_npz(path, output) == len(records)
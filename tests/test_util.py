@@ -71,3 +71,18 @@ def test_copy_args_with_decorator_no_kwargs_fail():
 
     with pytest.raises(TypeError):
         cloned_dict, cloned_dict2 = test_func(orig_dict, dict_arg2=orig_dict2)
+
+
+def test_copy_args_copy_disabled():
+
+    orig_dict = {1: 1, 2: 2, 3: 3}
+
+    @copy_args("dict_arg")
+    def test_func(dict_arg):
+        dict_arg[4] = 4
+        return dict_arg
+
+    same_dict = test_func(dict_arg=orig_dict, copy=False)
+
+    assert same_dict is orig_dict
+    assert orig_dict == {1: 1, 2: 2, 3: 3, 4: 4}
@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+
+import pytest
+
+from lmcipy.channels import IterableInput, ListOutput
+from lmcipy.interpret import assemble, interpret_opcodes
+from lmcipy.vector import run_vectorized, ERROR_COUNTER, ERROR_OVERFLOW, ERROR_INPUT_EXHAUSTED
+
+from conftest import load_example
+
+np = pytest.importorskip('numpy')
+
+
+def test_vectorized_square():
+    opcodes = assemble(load_example('square.lmc'))[0]
+    inputs = [[value, 0] for value in range(32)]
+
+    result = run_vectorized(opcodes, inputs)
+
+    assert result.outputs == [[]] + [[value * value] for value in range(1, 32)]
+    assert result.halted.all()
+
+
+def test_vectorized_sign_handling():
+    opcodes = assemble(load_example('test.lmc'))[0]
+    inputs = [[first, second] for first in (0, 5, 999) for second in (0, 7, 999)]
+
+    result = run_vectorized(opcodes, inputs)
+
+    assert result.outputs == [[abs(first - second)] for first, second in inputs]
+    assert result.minus_flag.tolist() == [first < second for first, second in inputs]
+    assert (result.cycles == 8).all()
+
+
+def test_vectorized_divergent_lanes():
+    opcodes = assemble(load_example('countdown.lmc'))[0]
+
+    result = run_vectorized(opcodes, [[3], [0], [10], []])
+
+    assert result.outputs[:3] == [[3, 2, 1, 0], [0], list(range(10, -1, -1))]
+    assert result.cycles.tolist()[:3] == [2 + 3 * 4 + 2, 2 + 2, 2 + 10 * 4 + 2]
+    assert result.error[3] == ERROR_INPUT_EXHAUSTED
+    assert not result.halted[3]
+
+
+def test_vectorized_overflow():
+    opcodes = assemble(load_example('square.lmc'))[0]
+
+    result = run_vectorized(opcodes, [[32, 0], [2, 0]])
+
+    assert result.error.tolist() == [ERROR_OVERFLOW, 0]
+    assert result.error_message(0) is not None
+
+
+def test_vectorized_max_cycles():
+    result = run_vectorized([600], [[]] * 3, max_cycles=50)
+
+    assert (result.cycles == 50).all()
+    assert not result.halted.any()
+
+
+def test_vectorized_matches_interpreter():
+    opcodes = assemble(load_example('square.lmc'))[0]
+    # Lanes stop at many different cycles, so stopped lanes are dropped several times.
+    inputs = [[(lane * 7 + step) % 31 + 1 for step in range(lane % 5)] + [0] for lane in range(200)]
+
+    result = run_vectorized(opcodes, inputs)
+
+    for lane, values in enumerate(inputs):
+        outputs = ListOutput()
+        expected = interpret_opcodes(opcodes, inputs=IterableInput(values), outputs=outputs)
+
+        assert result.outputs[lane] == outputs.values
+        assert result.cycles[lane] == expected.cycles
+        assert result.counter[lane] == expected.machine.counter
+        assert result.memory[lane].tolist() == expected.machine.memory[:]
+
+
+def test_vectorized_counter_out_of_memory():
+    result = run_vectorized([500] * 100, [[]] * 2)
+
+    assert result.error.tolist() == [ERROR_COUNTER] * 2
+    assert result.counter.tolist() == [100] * 2
+    assert result.cycles.tolist() == [100] * 2